@@ -0,0 +1,246 @@
+"""
+Stateless bearer tokens for the API.
+
+A token is the id of its user and a random token id, signed with the
+`SECRET_KEY` together with its issue time (`django.core.signing`), e.g.::
+
+    Authorization: Bearer 42.Xk3v9QmZp1aT0Q2b:1tQ2bC:4e0fQ...
+
+`SignedTokenAuthentication` verifies the signature and the age of a token
+(`AUTH_TOKEN_MAX_AGE`) without touching the database. The users behind the
+tokens are kept in a small in-process LRU (`AUTH_USER_CACHE_SIZE` users, each
+refetched after `AUTH_USER_CACHE_TTL` seconds and dropped as soon as it is
+saved or deleted in this process), and revoked tokens in an in-process set
+loaded from the `RevokedToken` table. A revocation reaches the other
+processes through a generation token in the Django cache named by
+`AUTH_TOKEN_CACHE`, which must then be shared by them (see `CACHES`).
+"""
+import secrets
+import threading
+import time
+import uuid
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import signing
+from django.core.cache import caches
+from django.utils import timezone
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+
+from .models import RevokedToken
+
+_SALT = 'api.authentication'
+_GENERATION_KEY = 'api-auth-revocation-generation'
+
+SignedToken = namedtuple('SignedToken', ['user_id', 'token_id', 'expires_at'])
+
+
+def _max_age():
+    return getattr(settings, 'AUTH_TOKEN_MAX_AGE', 24 * 60 * 60)
+
+
+def issue_token(user):
+    """
+    Issues a token authenticating `user`.
+
+    Args:
+        user (User): The token's user.
+
+    Returns:
+        tuple: The token and its expiry time.
+    """
+    token = signing.TimestampSigner(salt=_SALT).sign(f'{user.pk}.{secrets.token_urlsafe(12)}')
+    return token, read_token(token).expires_at
+
+
+def read_token(token):
+    """
+    Verifies a token's signature and age.
+
+    Args:
+        token (str): The token.
+
+    Returns:
+        SignedToken: The token's contents.
+
+    Raises:
+        AuthenticationFailed: The token is malformed, forged or expired.
+    """
+    signer = signing.TimestampSigner(salt=_SALT)
+    try:
+        value = signer.unsign(token, max_age=_max_age())
+    except signing.SignatureExpired:
+        raise exceptions.AuthenticationFailed('Token expired.')
+    except signing.BadSignature:
+        raise exceptions.AuthenticationFailed('Invalid token.')
+    # The issue time was just verified along with the value
+    issued_at = signing.b62_decode(token[len(value) + 1:].split(signer.sep, 1)[0])
+    user_id, _, token_id = value.partition('.')
+    if not user_id.isdigit() or not token_id:
+        raise exceptions.AuthenticationFailed('Invalid token.')
+    expires_at = datetime.fromtimestamp(issued_at + _max_age(), tz=dt_timezone.utc)
+    return SignedToken(int(user_id), token_id, expires_at)
+
+
+class RevocationList:
+    """
+    The ids of the revoked, unexpired tokens.
+
+    The ids are loaded from `RevokedToken` into a set in each process, and
+    reloaded when the generation token kept in a Django cache changes. Every
+    revocation draws a new one.
+
+    Args:
+        alias (str): The alias of the cache in `CACHES`.
+    """
+
+    def __init__(self, alias):
+        self.alias = alias
+        self._lock = threading.Lock()
+        self._generation = None
+        self._revoked = frozenset()
+
+    def __contains__(self, token_id):
+        cache = caches[self.alias]
+        generation = cache.get(_GENERATION_KEY)
+        if generation is None:
+            # Never drawn or evicted: the table is the record
+            cache.add(_GENERATION_KEY, uuid.uuid4().hex, timeout=None)
+            generation = cache.get(_GENERATION_KEY)
+        if generation != self._generation:
+            revoked = frozenset(
+                RevokedToken.objects.filter(expires_at__gt=timezone.now()).values_list('token_id', flat=True)
+            )
+            with self._lock:
+                self._revoked, self._generation = revoked, generation
+        return token_id in self._revoked
+
+    def revoke(self, token):
+        """
+        Revokes a token until it expires.
+
+        Args:
+            token (SignedToken): The token's contents.
+        """
+        RevokedToken.objects.filter(expires_at__lte=timezone.now()).delete()
+        RevokedToken.objects.update_or_create(token_id=token.token_id, defaults={'expires_at': token.expires_at})
+        caches[self.alias].set(_GENERATION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+class UserCache:
+    """
+    The most recently authenticated users, by id.
+
+    Args:
+        max_users (int): The maximum number of users kept; the least recently
+            used is dropped first.
+        ttl (float): Seconds after which a user is fetched again, so changes
+            made by other processes are picked up.
+    """
+
+    def __init__(self, max_users=1024, ttl=300):
+        self.max_users = max_users
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._users = OrderedDict()
+
+    def get(self, user_id):
+        """
+        Returns the active user with id `user_id`, or None.
+        """
+        now = time.monotonic()
+        with self._lock:
+            cached = self._users.get(user_id)
+            if cached is not None and now - cached[1] < self.ttl:
+                self._users.move_to_end(user_id)
+                return cached[0]
+        user = User.objects.filter(pk=user_id, is_active=True).first()
+        if user is not None:
+            with self._lock:
+                self._users[user_id] = (user, now)
+                self._users.move_to_end(user_id)
+                if len(self._users) > self.max_users:
+                    self._users.popitem(last=False)
+        return user
+
+    def forget(self, user_id):
+        """
+        Drops a user, e.g. after it changed.
+        """
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def clear(self):
+        """
+        Drops every user.
+        """
+        with self._lock:
+            self._users.clear()
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """
+    Authenticates ``Authorization: Bearer <token>`` requests.
+
+    See the module documentation. `request.auth` is the `SignedToken`.
+    """
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed('Invalid token header.')
+        try:
+            token = read_token(auth[1].decode())
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed('Invalid token.')
+        if token.token_id in revoked_tokens:
+            raise exceptions.AuthenticationFailed('Token revoked.')
+        user = user_cache.get(token.user_id)
+        if user is None:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        return user, token
+
+    def authenticate_header(self, request):
+        return self.keyword
+
+
+def get_acting_user(request):
+    """
+    Returns the user a request acts for.
+
+    Args:
+        request (Request): The DRF request.
+
+    Returns:
+        User: The authenticated user, or for anonymous requests the first
+        user, a default user being created if none exist.
+    """
+    if request.user.is_authenticated:
+        return request.user
+    # Get the first user or create a default user if none exists
+    user = User.objects.first()
+    if not user:
+        user = User.objects.create_user(
+            username='default_user',
+            email='default@example.com',
+            password='defaultpass123'
+        )
+    return user
+
+
+def _user_cache_from_settings():
+    return UserCache(
+        max_users=getattr(settings, 'AUTH_USER_CACHE_SIZE', 1024),
+        ttl=getattr(settings, 'AUTH_USER_CACHE_TTL', 300),
+    )
+
+
+user_cache = _user_cache_from_settings()
+
+revoked_tokens = RevocationList(getattr(settings, 'AUTH_TOKEN_CACHE', 'default'))
@@ -0,0 +1,179 @@
+"""
+Bulk import of catalog objects from newline-delimited JSON.
+
+`BulkImportMixin` adds ``POST <endpoint>/import/`` to a viewset. The body
+holds one JSON object per line (``Content-Type: application/x-ndjson``), in
+the shape the endpoint's create accepts. A row with the ``id`` of an existing
+object updates it with the fields the row has; any other row is created,
+under its ``id`` if it has one.
+
+The body is read one line at a time and written in batches of
+`BULK_IMPORT_BATCH_SIZE` rows (or ``?batch_size=``, up to
+`BULK_IMPORT_MAX_BATCH_SIZE`): each batch is validated with the viewset's
+serializer, its existing objects fetched with a single query, and written
+with a single upsert in its own transaction. Memory use does not depend on
+the size of the body, and a failing row only rejects itself.
+"""
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, transaction
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ParseError
+from rest_framework.response import Response
+
+from .parsers import NDJSONParser
+from .signals import model_changed, reindex_objects
+
+
+class _ImportReport:
+    """
+    The outcome of an import, with at most `max_errors` row errors kept.
+    """
+
+    def __init__(self, max_errors):
+        self.max_errors = max_errors
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+
+    def reject(self, line, errors):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'line': line, 'errors': errors})
+
+    def as_response(self):
+        imported = self.created + self.updated
+        return Response({
+            'status': 'success' if not self.failed else ('partial' if imported else 'error'),
+            'message': f'Import completed. {imported} rows imported, {self.failed} rejected.',
+            'created': self.created,
+            'updated': self.updated,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors)
+        }, status=status.HTTP_200_OK)
+
+
+class BulkImportMixin:
+    """
+    Viewset mixin adding the NDJSON `import/` action.
+
+    See the module documentation.
+    """
+
+    def get_import_values(self):
+        """
+        Returns the values of the fields created objects need but rows cannot
+        set (e.g. read-only relations), by field name.
+        """
+        return {}
+
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[NDJSONParser])
+    def bulk_import(self, request):
+        """
+        Creates and updates objects from the NDJSON body.
+
+        Returns:
+            Response: The numbers of created, updated and rejected rows, and
+            the errors of the rejected rows by line number.
+        """
+        max_batch_size = getattr(settings, 'BULK_IMPORT_MAX_BATCH_SIZE', 5000)
+        try:
+            batch_size = int(request.query_params.get('batch_size', getattr(settings, 'BULK_IMPORT_BATCH_SIZE', 500)))
+        except ValueError:
+            return Response({
+                'status': 'error',
+                'message': 'batch_size must be an integer'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        batch_size = min(max(batch_size, 1), max_batch_size)
+
+        report = _ImportReport(getattr(settings, 'BULK_IMPORT_MAX_ERRORS', 100))
+        pk_field = self.get_queryset().model._meta.pk
+        batch = {}
+        for line, row in request.data:
+            if isinstance(row, ParseError):
+                report.reject(line, {'non_field_errors': [str(row.detail)]})
+                continue
+            if not isinstance(row, dict):
+                report.reject(line, {'non_field_errors': ['Expected a JSON object.']})
+                continue
+            try:
+                pk = pk_field.to_python(row['id']) if row.get('id') is not None else None
+            except DjangoValidationError as e:
+                report.reject(line, {'id': e.messages})
+                continue
+            # An object written twice in one upsert would conflict with itself
+            if len(batch) == batch_size or (pk is not None and pk in batch):
+                self._import_batch(batch, report)
+                batch = {}
+            batch[pk if pk is not None else ('line', line)] = (line, pk, row)
+        if batch:
+            self._import_batch(batch, report)
+
+        if report.created or report.updated:
+            model_changed(self.get_queryset().model)
+        return report.as_response()
+
+    def _import_batch(self, batch, report):
+        model = self.get_queryset().model
+        existing = model._default_manager.order_by().in_bulk(
+            [pk for line, pk, row in batch.values() if pk is not None]
+        )
+        values = self.get_import_values()
+
+        rows = []
+        update_fields = None
+        for line, pk, row in batch.values():
+            instance = existing.get(pk)
+            serializer = self.get_serializer(instance, data=row, partial=instance is not None)
+            if not serializer.is_valid():
+                report.reject(line, serializer.errors)
+                continue
+            if update_fields is None:
+                update_fields = self._upsert_fields(serializer)
+            if instance is None:
+                instance = model(**values)
+                if pk is not None:
+                    instance.pk = pk
+            for name, value in serializer.validated_data.items():
+                setattr(instance, name, value)
+            rows.append((line, instance, pk in existing))
+        if not rows:
+            return
+
+        try:
+            with transaction.atomic():
+                self._upsert(model, [instance for line, instance, updated in rows], update_fields)
+            written = rows
+        except IntegrityError:
+            # Attributes the failure to its rows, keeping the others
+            written = []
+            for line, instance, updated in rows:
+                try:
+                    with transaction.atomic():
+                        self._upsert(model, [instance], update_fields)
+                    written.append((line, instance, updated))
+                except IntegrityError as e:
+                    report.reject(line, {'non_field_errors': [str(e)]})
+        for line, instance, updated in written:
+            if updated:
+                report.updated += 1
+            else:
+                report.created += 1
+
+    def _upsert_fields(self, serializer):
+        model = serializer.Meta.model
+        writable = {field.source for field in serializer.fields.values() if not field.read_only}
+        return [
+            field.name for field in model._meta.concrete_fields
+            if not field.primary_key and (field.name in writable or getattr(field, 'auto_now', False))
+        ]
+
+    def _upsert(self, model, instances, update_fields):
+        model._default_manager.bulk_create(
+            instances, update_conflicts=True,
+            unique_fields=[model._meta.pk.name], update_fields=update_fields
+        )
+        reindex_objects(model, instances)
@@ -0,0 +1,107 @@
+"""
+Conditional GET for the router-registered endpoints.
+
+Every `list` and `retrieve` response carries an `ETag` and, once the data has
+changed, a `Last-Modified` header. Both are derived from the
+`ModelVersion` rows of the models the response renders: the viewset's own
+model and every model its serializer nests (e.g. users and microcontrollers
+for projects). A request repeating the validators (`If-None-Match`,
+`If-Modified-Since`) is answered with an empty 304 after that single lookup,
+before any queryset is evaluated or serializer instantiated.
+
+Responses are sent with ``Cache-Control: no-cache``, so browsers keep them but
+revalidate them on every use; the frontend gets the 304s without any change.
+"""
+import hashlib
+from functools import lru_cache
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .models import ModelVersion
+from .query_planning import plan_queryset
+
+
+@lru_cache(maxsize=None)
+def rendered_models(serializer_class):
+    """
+    Returns the labels of the models a serializer's output is read from.
+
+    Args:
+        serializer_class (type): A `ModelSerializer` subclass.
+
+    Returns:
+        tuple: The sorted model labels.
+    """
+    model = serializer_class.Meta.model
+    models = {model}
+    plan = plan_queryset(serializer_class)
+    for path in plan.select_related + plan.prefetch_related:
+        related = model
+        for name in path.split('__'):
+            related = related._meta.get_field(name).related_model
+        models.add(related)
+    return tuple(sorted(related._meta.concrete_model._meta.label for related in models))
+
+
+def response_validators(request, labels):
+    """
+    Computes the validators of a response.
+
+    Args:
+        request (Request): The request; its full path (query string included)
+            and `Accept` header are part of the ETag.
+        labels (tuple): The labels of the models the response renders.
+
+    Returns:
+        tuple: The ETag and the last modification time as a UNIX timestamp
+        in whole seconds (HTTP dates have no fractions), or None if none of
+        the models has changed yet.
+    """
+    versions = dict.fromkeys(labels)
+    for label, version, changed_at in ModelVersion.objects.filter(label__in=labels).values_list(
+        'label', 'version', 'changed_at'
+    ):
+        versions[label] = (version, changed_at)
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(request.get_full_path().encode('utf-8'))
+    digest.update(b'\0' + request.headers.get('Accept', '').encode('utf-8'))
+    for label in labels:
+        version = versions[label][0] if versions[label] else 0
+        digest.update(f'\0{label}={version}'.encode('utf-8'))
+
+    # A model without a row has not changed since versions were introduced,
+    # so before any validator was handed out
+    changes = [version[1] for version in versions.values() if version]
+    last_modified = int(max(changes).timestamp()) if changes else None
+    return f'"{digest.hexdigest()}"', last_modified
+
+
+class ConditionalGetMixin:
+    """
+    Viewset mixin answering `list` and `retrieve` requests conditionally.
+
+    See the module documentation.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self._respond_conditionally(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._respond_conditionally(super().retrieve, request, *args, **kwargs)
+
+    def _respond_conditionally(self, handler, request, *args, **kwargs):
+        # Read before rendering: a change committed meanwhile then only makes
+        # the validators older than the body, never newer
+        etag, last_modified = response_validators(request, rendered_models(self.get_serializer_class()))
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, no_cache=True)
+        return response
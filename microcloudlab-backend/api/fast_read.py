@@ -0,0 +1,273 @@
+"""
+A read path for list endpoints that bypasses `ModelSerializer`.
+
+Rendering a list through a `ModelSerializer` builds a model instance per row
+(and per joined or prefetched row), then resolves every field through
+`get_attribute` and `to_representation` one call at a time. For the lists the
+frontend fetches on every page this dominates the request's CPU time.
+
+`RowProjection` compiles a serializer once into a flat plan: the columns to
+fetch with `.values()` (joined relations included), a converter per field,
+and one extra query per to-many relation. Rendering a page is then a loop over
+plain dicts. The output is the same as the serializer's, byte for byte once
+rendered; serializers using anything the plan cannot express (method fields,
+file fields, dotted sources, ...) are simply not compiled, and the viewset
+keeps using them.
+"""
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import F
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .sparse_fields import SparseFieldsMixin
+
+_VALUE, _NATIVE, _DATETIME, _ONE, _MANY = range(5)
+
+# Fields whose `to_representation` returns values of these types unchanged
+_NATIVE_FIELDS = {
+    serializers.CharField: str,
+    serializers.EmailField: str,
+    serializers.URLField: str,
+    serializers.SlugField: str,
+    serializers.IntegerField: int,
+    serializers.BooleanField: bool,
+}
+
+_UNSUPPORTED_FIELDS = (
+    serializers.FileField,
+    serializers.SerializerMethodField,
+    serializers.HiddenField,
+)
+
+
+class Unsupported(Exception):
+    """
+    Raised when a serializer cannot be compiled into a `RowProjection`.
+    """
+
+
+def _compile_value(field):
+    """
+    Returns the `(kind, payload)` rendering a non-null column value of `field`.
+    """
+    native = _NATIVE_FIELDS.get(type(field))
+    if native is not None:
+        return _NATIVE, (native, field.to_representation)
+    if type(field) is serializers.JSONField and not field.binary:
+        return _VALUE, None
+    if type(field) is serializers.UUIDField and field.uuid_format == 'hex_verbose':
+        return _VALUE, str
+    if type(field) is serializers.ChoiceField:
+        choices = field.choice_strings_to_values
+        return _VALUE, lambda value: choices.get(str(value), value)
+    if (type(field) is serializers.DateTimeField and not hasattr(field, 'timezone')
+            and getattr(field, 'format', api_settings.DATETIME_FORMAT) == ISO_8601):
+        return _DATETIME, field.to_representation
+    return _VALUE, field.to_representation
+
+
+class _ManyFetch:
+    """
+    Loads the items of a to-many relation for a set of owner rows.
+    """
+
+    def __init__(self, model_field, owner_lookup, child, convert):
+        self.owner_lookup = owner_lookup
+        self.queryset = model_field.related_model._default_manager.all()
+        self.owner_query_name = model_field.related_query_name()
+        self.child = child
+        self.convert = convert
+
+    def load(self, owners):
+        """
+        Args:
+            owners (set): The primary keys of the owners.
+
+        Returns:
+            dict: Maps an owner's primary key to its rendered items, in the
+            related model's default order.
+        """
+        items = {}
+        if not owners:
+            return items
+        queryset = self.queryset.filter(**{f'{self.owner_query_name}__in': owners})
+        if self.child is None:
+            convert = self.convert
+            for owner, pk in queryset.values_list(F(self.owner_query_name), 'pk'):
+                items.setdefault(owner, []).append(pk if convert is None else convert(pk))
+            return items
+        rows = list(queryset.values(*self.child.columns, _owner=F(self.owner_query_name)))
+        for row, item in zip(rows, self.child.render(rows)):
+            items.setdefault(row['_owner'], []).append(item)
+        return items
+
+
+class RowProjection:
+    """
+    A serializer compiled into a `.values()` projection.
+
+    Args:
+        serializer (ModelSerializer): The serializer to reproduce, with its
+            fields as they are rendered.
+
+    Raises:
+        Unsupported: If the serializer renders something the projection
+            cannot express.
+    """
+
+    def __init__(self, serializer):
+        self.model = serializer.Meta.model
+        self.columns = []
+        self._fetches = []
+        self._fields = self._compile(serializer, '')
+
+    def _add_column(self, lookup):
+        if lookup not in self.columns:
+            self.columns.append(lookup)
+
+    def _compile(self, serializer, prefix):
+        model = serializer.Meta.model
+        pk_lookup = prefix + model._meta.pk.name
+        self._add_column(pk_lookup)
+        plan = []
+        for field in serializer._readable_fields:
+            if field.source == '*' or '.' in field.source or isinstance(field, _UNSUPPORTED_FIELDS):
+                raise Unsupported(f'{serializer.__class__.__name__}.{field.field_name}')
+            try:
+                model_field = model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                raise Unsupported(f'{serializer.__class__.__name__}.{field.field_name}')
+            lookup = prefix + field.source
+
+            if not model_field.is_relation:
+                self._add_column(lookup)
+                kind, payload = _compile_value(field)
+                plan.append((field.field_name, kind, lookup, payload))
+            elif model_field.many_to_many and model_field.concrete:
+                if isinstance(field, serializers.ListSerializer):
+                    fetch = _ManyFetch(model_field, pk_lookup, RowProjection(field.child), None)
+                elif isinstance(field, ManyRelatedField) and isinstance(field.child_relation, PrimaryKeyRelatedField):
+                    pk_field = field.child_relation.pk_field
+                    fetch = _ManyFetch(model_field, pk_lookup, None, pk_field and pk_field.to_representation)
+                else:
+                    raise Unsupported(f'{serializer.__class__.__name__}.{field.field_name}')
+                self._fetches.append(fetch)
+                plan.append((field.field_name, _MANY, pk_lookup, fetch))
+            elif (model_field.many_to_one or model_field.one_to_one) and model_field.concrete:
+                self._add_column(lookup)
+                if isinstance(field, serializers.BaseSerializer) and not isinstance(field, serializers.ListSerializer):
+                    plan.append((field.field_name, _ONE, lookup, self._compile(field, lookup + '__')))
+                elif isinstance(field, PrimaryKeyRelatedField):
+                    plan.append((field.field_name, _VALUE, lookup, field.pk_field and field.pk_field.to_representation))
+                else:
+                    raise Unsupported(f'{serializer.__class__.__name__}.{field.field_name}')
+            else:
+                raise Unsupported(f'{serializer.__class__.__name__}.{field.field_name}')
+        return plan
+
+    def values(self, queryset, *extra):
+        """
+        Turns a queryset of the serializer's model into the `.values()`
+        queryset of the projection's columns (plus `extra` ones).
+        """
+        return queryset.prefetch_related(None).values(*self.columns, *[c for c in extra if c not in self.columns])
+
+    def render(self, rows):
+        """
+        Renders rows fetched with `values`.
+
+        Args:
+            rows (list): The row dicts.
+
+        Returns:
+            list: The rendered objects, as the serializer would return them.
+        """
+        related = {}
+        for fetch in self._fetches:
+            owners = {row[fetch.owner_lookup] for row in rows}
+            owners.discard(None)
+            related[fetch] = fetch.load(owners)
+        # Resolved once per render instead of once per datetime value
+        tz = timezone.get_current_timezone() if settings.USE_TZ else None
+        fields = self._fields
+        return [_render_row(fields, row, related, tz) for row in rows]
+
+
+def _render_row(plan, row, related, tz):
+    item = {}
+    for name, kind, lookup, payload in plan:
+        value = row[lookup]
+        if value is None:
+            item[name] = None
+        elif kind == _VALUE:
+            item[name] = value if payload is None else payload(value)
+        elif kind == _NATIVE:
+            item[name] = value if type(value) is payload[0] else payload[1](value)
+        elif kind == _DATETIME:
+            if tz is None or value.tzinfo is None:
+                item[name] = payload(value)
+            else:
+                # What `DateTimeField.to_representation` does for aware values
+                value = value.astimezone(tz).isoformat()
+                item[name] = value[:-6] + 'Z' if value.endswith('+00:00') else value
+        elif kind == _ONE:
+            item[name] = _render_row(payload, row, related, tz)
+        else:
+            item[name] = related[payload].get(value, [])
+    return item
+
+
+@lru_cache(maxsize=None)
+def projection_for(serializer_class):
+    """
+    Compiles a default instance of a serializer class.
+
+    Returns:
+        RowProjection | None: The projection, or None if the serializer
+        cannot be compiled.
+    """
+    try:
+        return RowProjection(serializer_class())
+    except Unsupported:
+        return None
+
+
+class FastReadMixin(SparseFieldsMixin):
+    """
+    Viewset mixin rendering `list` responses through a `RowProjection`.
+
+    Falls back to the serializer when it cannot be compiled.
+    """
+
+    def get_row_projection(self):
+        """
+        Returns the projection of the serializer the response is rendered
+        with, or None to render it with the serializer.
+        """
+        if self.get_field_selection() is None:
+            return projection_for(self.get_serializer_class())
+        try:
+            return RowProjection(self.get_serializer())
+        except Unsupported:
+            return None
+
+    def list(self, request, *args, **kwargs):
+        projection = self.get_row_projection()
+        if projection is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        queryset = projection.values(
+            queryset, *[field.lstrip('-') for field in ordering if isinstance(field, str) and field != '?'], 'pk'
+        )
+        rows = self.paginate_queryset(queryset)
+        if rows is None:
+            return Response(projection.render(list(queryset)))
+        return self.get_paginated_response(projection.render(rows))
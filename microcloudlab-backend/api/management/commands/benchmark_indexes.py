@@ -0,0 +1,211 @@
+"""
+Shows how the query indexes change the plans of the API's queries.
+
+Usage::
+
+    python manage.py benchmark_indexes             # 1,000,000 executions
+    python manage.py benchmark_indexes --seed 0    # the rows already there
+
+Every access path covered by an index (the first page of each list endpoint,
+in `KeysetPagination` order, and the filtered lookups) is run twice, first
+with the indexes dropped and then with them in place, and its query plan
+(`EXPLAIN`) and timing are printed. Everything, seeded rows and dropped
+indexes included, happens in a transaction that is rolled back at the end, so
+the database is left as it was.
+"""
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from api.models import (
+    CaseStudy, CodeExecution, ContactInquiry, Microcontroller, Project, Resource, Tutorial
+)
+from api.pagination import KeysetPagination
+
+INDEXED_MODELS = [Microcontroller, Project, CodeExecution, Tutorial, CaseStudy, ContactInquiry, Resource]
+
+BATCH_SIZE = 10000
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compares query plans and timings of the API access paths with and without their indexes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed', type=int, default=1_000_000,
+            help='Number of code executions to insert first (other tables get one row per thousand); 0 uses the rows already there.'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Number of times each query is timed; the best time is reported.'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                if options['seed']:
+                    self._seed(options['seed'])
+                self._report(options['repeat'])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _access_paths(self):
+        """
+        Returns `(label, index name, queryset)` for every indexed access path.
+        """
+        project = Project.objects.order_by('-updated_at').first()
+        return [
+            ('Project listing', 'api_project_updated_idx', self._listing(Project)),
+            ('Execution listing', 'api_codeexec_created_idx', self._listing(CodeExecution)),
+            ('Tutorial listing', 'api_tutorial_listing_idx', self._listing(Tutorial)),
+            ('Case study listing', 'api_casestudy_created_idx', self._listing(CaseStudy)),
+            ('Inquiry listing', 'api_inquiry_created_idx', self._listing(ContactInquiry)),
+            ('Resource listing', 'api_resource_created_idx', self._listing(Resource)),
+            ('Project executions', 'api_codeexec_project_idx',
+                CodeExecution.objects.filter(project=project).order_by('-created_at')[:100]),
+            ('Pending executions', 'api_codeexec_status_idx',
+                CodeExecution.objects.filter(execution_status__in=['PENDING', 'RUNNING'])
+                .order_by('execution_status', 'created_at')[:100]),
+            ('Available ESP32 boards', 'api_mcu_available_idx',
+                Microcontroller.objects.filter(type='ESP32', is_available=True).order_by('name')),
+            ('Published tutorials', 'api_tutorial_published_idx',
+                Tutorial.objects.filter(is_published=True).order_by('difficulty', 'title')),
+            ('Featured case studies', 'api_casestudy_featured_idx',
+                CaseStudy.objects.filter(is_featured=True).order_by('-created_at')),
+            ('Videos', 'api_resource_type_idx',
+                Resource.objects.filter(resource_type='VIDEO').order_by('-created_at')[:100]),
+            ('Featured videos', 'api_resource_featured_idx',
+                Resource.objects.filter(resource_type='VIDEO', is_featured=True).order_by('-created_at')),
+            ('Unread inquiries', 'api_inquiry_unread_idx',
+                ContactInquiry.objects.filter(is_read=False).order_by('-created_at')[:100]),
+        ]
+
+    def _listing(self, model):
+        queryset = model.objects.all()
+        pagination = KeysetPagination()
+        return queryset.order_by(*pagination.get_ordering(queryset))[:pagination.page_size]
+
+    def _report(self, repeat):
+        if connection.vendor in ('sqlite', 'postgresql'):
+            # Give the planner statistics, as a long-lived database would have
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+        without = {}
+        try:
+            with transaction.atomic():
+                self._drop_indexes()
+                without = self._measure(repeat)
+                raise _Rollback
+        except _Rollback:
+            pass
+        with_indexes = self._measure(repeat)
+
+        for (label, index_name), (plan, seconds) in with_indexes.items():
+            old_plan, old_seconds = without[(label, index_name)]
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{label} ({index_name})'))
+            self.stdout.write(f'  without indexes ({old_seconds * 1000:.2f} ms):')
+            self.stdout.write(self._indent(old_plan))
+            self.stdout.write(f'  with indexes ({seconds * 1000:.2f} ms):')
+            self.stdout.write(self._indent(plan))
+
+    def _measure(self, repeat):
+        results = {}
+        for label, index_name, queryset in self._access_paths():
+            best = None
+            for _ in range(max(repeat, 1)):
+                started = time.perf_counter()
+                list(queryset.all())
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            results[(label, index_name)] = (queryset.explain(), best)
+        return results
+
+    def _drop_indexes(self):
+        template = connection.schema_editor().sql_delete_index
+        quote_name = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            for model in INDEXED_MODELS:
+                existing = connection.introspection.get_constraints(cursor, model._meta.db_table)
+                for index in model._meta.indexes:
+                    if index.name not in existing:
+                        self.stderr.write(f'Index {index.name} does not exist; have the migrations been applied?')
+                        continue
+                    cursor.execute(template % {
+                        'name': quote_name(index.name),
+                        'table': quote_name(model._meta.db_table),
+                    })
+
+    def _indent(self, plan):
+        return '\n'.join(f'    {line}' for line in plan.splitlines())
+
+    def _seed(self, executions):
+        others = max(executions // 1000, 50)
+        self.stdout.write(f'Seeding {executions} executions and {others} rows per other table...')
+        rng = random.Random(0)
+        user, _ = User.objects.get_or_create(username='benchmark_user')
+
+        boards = Microcontroller.objects.bulk_create([
+            Microcontroller(
+                name=f'Board {index}', type=rng.choice(Microcontroller.MICROCONTROLLER_TYPES)[0],
+                description='Benchmark board', is_available=rng.random() < 0.3
+            )
+            for index in range(others)
+        ], batch_size=BATCH_SIZE)
+        projects = Project.objects.bulk_create([
+            Project(
+                title=f'Project {index}', description='Benchmark project', owner=user,
+                project_type=rng.choice(Project.PROJECT_TYPES)[0], microcontroller=rng.choice(boards)
+            )
+            for index in range(others)
+        ], batch_size=BATCH_SIZE)
+
+        # Most executions are finished; about 1% are still queued or running
+        statuses = ['SUCCESS', 'FAILED', 'TIMEOUT']
+        for start in range(0, executions, BATCH_SIZE):
+            CodeExecution.objects.bulk_create([
+                CodeExecution(
+                    project=rng.choice(projects), user=user, code_content='',
+                    execution_status=rng.choice(['PENDING', 'RUNNING']) if rng.random() < 0.01
+                    else rng.choice(statuses)
+                )
+                for _ in range(min(BATCH_SIZE, executions - start))
+            ])
+
+        Tutorial.objects.bulk_create([
+            Tutorial(
+                title=f'Tutorial {index}', description='', content='', author=user,
+                difficulty=rng.choice(Tutorial.DIFFICULTY_LEVELS)[0], estimated_time=10,
+                is_published=rng.random() < 0.5
+            )
+            for index in range(others)
+        ], batch_size=BATCH_SIZE)
+        CaseStudy.objects.bulk_create([
+            CaseStudy(
+                title=f'Case study {index}', subtitle='', description='', challenge='', solution='',
+                results='', industry='', is_featured=rng.random() < 0.02
+            )
+            for index in range(others)
+        ], batch_size=BATCH_SIZE)
+        Resource.objects.bulk_create([
+            Resource(
+                title=f'Resource {index}', description='', url='https://example.com',
+                resource_type=rng.choice(Resource.RESOURCE_TYPES)[0], is_featured=rng.random() < 0.05
+            )
+            for index in range(others)
+        ], batch_size=BATCH_SIZE)
+        ContactInquiry.objects.bulk_create([
+            ContactInquiry(
+                name='Benchmark', email='benchmark@example.com', subject='', message='',
+                inquiry_type=rng.choice(ContactInquiry.INQUIRY_TYPES)[0], is_read=rng.random() < 0.9
+            )
+            for _ in range(others)
+        ], batch_size=BATCH_SIZE)
@@ -0,0 +1,131 @@
+"""
+Compares the serializer and `RowProjection` read paths of the hot list endpoints.
+
+Usage::
+
+    python manage.py benchmark_serializers --rows 10000
+
+Each endpoint's queryset is rendered to JSON both ways, queries included, and
+the best time of each is printed along with whether the two outputs are byte
+for byte identical. Seeded rows are inserted in a transaction that is rolled
+back at the end, so the database is left as it was.
+"""
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from api.fast_read import projection_for
+from api.models import Microcontroller, Project
+from api.query_planning import optimize_queryset
+from api.renderers import FastJSONRenderer
+from api.serializers import MicrocontrollerSerializer, ProjectSerializer
+
+ENDPOINTS = [
+    ('/api/microcontrollers/', Microcontroller, MicrocontrollerSerializer),
+    ('/api/projects/', Project, ProjectSerializer),
+]
+
+BATCH_SIZE = 5000
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compares the serializer and row projection read paths of the hot list endpoints.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows', type=int, default=10000,
+            help='Number of rows rendered per endpoint; missing rows are seeded first.'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=3,
+            help='Number of times each path is timed; the best time is reported.'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._seed(options['rows'])
+                for label, model, serializer_class in ENDPOINTS:
+                    self._compare(label, model, serializer_class, options['rows'], options['repeat'])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _compare(self, label, model, serializer_class, rows, repeat):
+        queryset = model.objects.order_by(*model._meta.ordering, 'pk')
+        projection = projection_for(serializer_class)
+
+        def serializer_path():
+            objects = list(optimize_queryset(queryset, serializer_class)[:rows])
+            return JSONRenderer().render(serializer_class(objects, many=True).data)
+
+        def projection_path():
+            data = projection.render(list(projection.values(queryset)[:rows]))
+            return FastJSONRenderer().render(data)
+
+        slow, slow_output = self._time(serializer_path, repeat)
+        fast, fast_output = self._time(projection_path, repeat)
+        self.stdout.write(self.style.MIGRATE_HEADING(f'{label} ({rows} rows, {len(fast_output)} bytes)'))
+        self.stdout.write(f'  serializer: {slow * 1000:.1f} ms')
+        self.stdout.write(f'  projection: {fast * 1000:.1f} ms ({slow / fast:.1f}x)')
+        if fast_output == slow_output:
+            self.stdout.write(self.style.SUCCESS('  outputs are identical'))
+        else:
+            self.stdout.write(self.style.ERROR('  outputs differ'))
+
+    def _time(self, render, repeat):
+        best = output = None
+        for _ in range(max(repeat, 1)):
+            started = time.perf_counter()
+            output = render()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, output
+
+    def _seed(self, rows):
+        rng = random.Random(0)
+        users = list(User.objects.all()[:50])
+        if len(users) < 50:
+            users += User.objects.bulk_create([
+                User(username=f'benchmark_user_{index}', email=f'user{index}@example.com')
+                for index in range(len(users), 50)
+            ])
+
+        missing = rows - Microcontroller.objects.count()
+        if missing > 0:
+            self.stdout.write(f'Seeding {missing} microcontrollers...')
+            Microcontroller.objects.bulk_create([
+                Microcontroller(
+                    name=f'Board {index}', type=rng.choice(Microcontroller.MICROCONTROLLER_TYPES)[0],
+                    description='Benchmark board', specifications={'ram_kb': 520, 'flash_mb': 4},
+                    current_user=rng.choice(users) if rng.random() < 0.3 else None
+                )
+                for index in range(missing)
+            ], batch_size=BATCH_SIZE)
+        boards = list(Microcontroller.objects.values_list('pk', flat=True)[:1000])
+
+        missing = rows - Project.objects.count()
+        if missing > 0:
+            self.stdout.write(f'Seeding {missing} projects...')
+            projects = Project.objects.bulk_create([
+                Project(
+                    title=f'Project {index}', description='Benchmark project', owner=rng.choice(users),
+                    project_type=rng.choice(Project.PROJECT_TYPES)[0], microcontroller_id=rng.choice(boards),
+                    code_content='void setup() {}\nvoid loop() {}\n' * 20
+                )
+                for index in range(missing)
+            ], batch_size=BATCH_SIZE)
+            Through = Project.collaborators.through
+            Through.objects.bulk_create([
+                Through(project_id=project.pk, user_id=user.pk)
+                for project in projects
+                for user in rng.sample(users, 2)
+            ], batch_size=BATCH_SIZE)
@@ -0,0 +1,37 @@
+"""
+Rebuilds the full-text search index of tutorials, resources and case studies.
+
+Usage::
+
+    python manage.py rebuild_search_index
+
+The index follows saves and deletes by itself; a rebuild is only needed
+after writes that bypass model signals (`QuerySet.update`, `bulk_create`,
+raw SQL) or a restore of the database without its ``api_search`` table.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from api.search import rebuild_search_index, search_supported
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text search index from the tutorials, resources and case studies.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='The database whose index is rebuilt.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of objects indexed per batch.'
+        )
+
+    def handle(self, *args, **options):
+        if not search_supported(options['database']):
+            raise CommandError('Full-text search requires the SQLite database.')
+        counts = rebuild_search_index(options['database'], options['batch_size'])
+        for label, count in counts.items():
+            self.stdout.write(f'{label}: {count} indexed')
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt.'))
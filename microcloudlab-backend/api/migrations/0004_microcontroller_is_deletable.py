@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_casestudy_company_logo_casestudy_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='microcontroller',
+            name='is_deletable',
+            field=models.BooleanField(default=True, help_text='Whether this microcontroller can be deleted by admins'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_microcontroller_is_deletable'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='casestudy',
+            index=models.Index(condition=models.Q(('is_featured', True)), fields=['-created_at'], name='api_casestudy_featured_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='codeexecution',
+            index=models.Index(fields=['-created_at', 'id'], name='api_codeexec_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='codeexecution',
+            index=models.Index(fields=['project', '-created_at'], name='api_codeexec_project_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='codeexecution',
+            index=models.Index(fields=['execution_status', 'created_at'], name='api_codeexec_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contactinquiry',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['-created_at'], name='api_inquiry_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='microcontroller',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['type', 'name'], name='api_mcu_available_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['-updated_at', 'id'], name='api_project_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resource',
+            index=models.Index(fields=['resource_type', '-created_at'], name='api_resource_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resource',
+            index=models.Index(condition=models.Q(('is_featured', True)), fields=['resource_type', '-created_at'], name='api_resource_featured_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tutorial',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['difficulty', 'title'], name='api_tutorial_published_idx'),
+        ),
+    ]
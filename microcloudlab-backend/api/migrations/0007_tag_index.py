@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-16 21:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_model_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TagIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=100)),
+                ('object_id', models.UUIDField()),
+                ('tag', models.CharField(max_length=100)),
+                ('tag_key', models.CharField(max_length=100)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['model', 'object_id'], name='api_tagindex_object_idx')],
+                'constraints': [models.UniqueConstraint(fields=('model', 'tag_key', 'object_id'), name='api_tagindex_unique')],
+            },
+        ),
+    ]
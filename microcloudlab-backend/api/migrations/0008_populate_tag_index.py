@@ -0,0 +1,44 @@
+from django.db import migrations
+
+TAGGED_FIELDS = {
+    'Tutorial': 'tags',
+    'Resource': 'tags',
+    'CaseStudy': 'technologies_used',
+}
+
+MAX_TAG_LENGTH = 100
+
+
+def populate_tag_index(apps, schema_editor):
+    # Mirrors api.tags.normalize_tags as of this migration
+    TagIndex = apps.get_model('api', 'TagIndex')
+    db_alias = schema_editor.connection.alias
+    for model_name, field in TAGGED_FIELDS.items():
+        model = apps.get_model('api', model_name)
+        rows = []
+        for pk, values in model.objects.using(db_alias).values_list('pk', field).iterator():
+            tags = {}
+            for value in values if isinstance(values, list) else []:
+                if isinstance(value, str) and value.strip():
+                    tag = value.strip()[:MAX_TAG_LENGTH]
+                    tags.setdefault(tag.casefold()[:MAX_TAG_LENGTH], tag)
+            rows.extend(
+                TagIndex(model=f'api.{model_name}', object_id=pk, tag=tag, tag_key=key)
+                for key, tag in tags.items()
+            )
+        TagIndex.objects.using(db_alias).bulk_create(rows, batch_size=1000)
+
+
+def clear_tag_index(apps, schema_editor):
+    apps.get_model('api', 'TagIndex').objects.using(schema_editor.connection.alias).all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_tag_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_tag_index, clear_tag_index),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-16 21:06
+
+from django.db import migrations, models
+
+# Mirrors api.search as of this migration
+SEARCHED_FIELDS = {
+    'Tutorial': ('title', ('description', 'content')),
+    'Resource': ('title', ('description',)),
+    'CaseStudy': ('title', ('subtitle', 'description', 'challenge', 'solution', 'results')),
+}
+
+
+def create_search_table(apps, schema_editor):
+    # FTS5 is SQLite's; elsewhere search is unavailable
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE api_search USING fts5("
+        "title, body, kind, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS api_search')
+
+
+def populate_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    SearchDocument = apps.get_model('api', 'SearchDocument')
+    db_alias = schema_editor.connection.alias
+    rows = []
+    for model_name, (title_field, body_fields) in SEARCHED_FIELDS.items():
+        model = apps.get_model('api', model_name)
+        for values in model.objects.using(db_alias).values_list('pk', title_field, *body_fields).iterator():
+            document = SearchDocument.objects.using(db_alias).create(model=f'api.{model_name}', object_id=values[0])
+            body = '\n'.join(value or '' for value in values[2:])
+            rows.append((document.pk, values[1] or '', body, model_name.lower()))
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany('INSERT INTO api_search (rowid, title, body, kind) VALUES (%s, %s, %s, %s)', rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_populate_tag_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=100)),
+                ('object_id', models.UUIDField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('model', 'object_id'), name='api_searchdocument_unique')],
+            },
+        ),
+        migrations.RunPython(create_search_table, drop_search_table),
+        migrations.RunPython(populate_search_table, migrations.RunPython.noop),
+    ]
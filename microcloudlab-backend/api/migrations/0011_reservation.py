@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-16 21:17
+
+import datetime
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Mirrors api.reservations as of this migration
+LEASE_SECONDS = 60
+
+
+def lease_held_boards(apps, schema_editor):
+    # Boards marked in use before reservations existed get a lease of their
+    # holder, which lapses unless the holder starts renewing it
+    Microcontroller = apps.get_model('api', 'Microcontroller')
+    Reservation = apps.get_model('api', 'Reservation')
+    db_alias = schema_editor.connection.alias
+    now = django.utils.timezone.now()
+    Reservation.objects.using(db_alias).bulk_create([
+        Reservation(
+            user_id=user_id, microcontroller_type=mcu_type, microcontroller_id=board_id, status='ACTIVE',
+            granted_at=now, lease_expires_at=now + datetime.timedelta(seconds=LEASE_SECONDS)
+        )
+        for board_id, mcu_type, user_id in Microcontroller.objects.using(db_alias)
+        .filter(is_available=False, current_user__isnull=False)
+        .values_list('id', 'type', 'current_user_id')
+    ], ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_revoked_token'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Reservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('microcontroller_type', models.CharField(choices=[('ESP32', 'ESP32'), ('ESP8266', 'ESP8266'), ('ARDUINO_UNO', 'Arduino Uno'), ('ARDUINO_NANO', 'Arduino Nano'), ('RASPBERRY_PI_PICO', 'Raspberry Pi Pico'), ('STM32', 'STM32'), ('PIC', 'PIC'), ('AVR', 'AVR')], max_length=50)),
+                ('status', models.CharField(choices=[('WAITING', 'Waiting'), ('ACTIVE', 'Active'), ('RELEASED', 'Released'), ('EXPIRED', 'Expired'), ('CANCELLED', 'Cancelled')], default='WAITING', max_length=20)),
+                ('lease_expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('granted_at', models.DateTimeField(blank=True, null=True)),
+                ('ended_at', models.DateTimeField(blank=True, null=True)),
+                ('microcontroller', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='api.microcontroller')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('status', 'WAITING')), fields=['microcontroller_type', 'id'], name='api_reservation_queue_idx'), models.Index(fields=['status', 'lease_expires_at'], name='api_reservation_lease_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status', 'ACTIVE')), fields=('microcontroller',), name='api_reservation_active_board'), models.UniqueConstraint(condition=models.Q(('status__in', ['WAITING', 'ACTIVE'])), fields=('user', 'microcontroller_type'), name='api_reservation_open_unique')],
+            },
+        ),
+        migrations.RunPython(lease_held_boards, migrations.RunPython.noop),
+    ]
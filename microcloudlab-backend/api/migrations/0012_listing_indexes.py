@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_reservation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='casestudy',
+            index=models.Index(fields=['-created_at', 'id'], name='api_casestudy_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contactinquiry',
+            index=models.Index(fields=['-created_at', 'id'], name='api_inquiry_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resource',
+            index=models.Index(fields=['-created_at', 'id'], name='api_resource_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tutorial',
+            index=models.Index(fields=['difficulty', 'title', 'id'], name='api_tutorial_listing_idx'),
+        ),
+    ]
@@ -21,8 +21,10 @@ class Microcontroller(models.Model):
         description (TextField): A detailed description of the microcontroller.
         specifications (JSONField): Technical specifications like RAM, Flash, etc.
         is_available (BooleanField): Whether the microcontroller is currently available for use.
+            Set by the reservations in `api.reservations`.
         is_deletable (BooleanField): Whether this instance can be deleted by admins.
         current_user (ForeignKey): The user currently using this microcontroller, if any.
+            Set by the reservations in `api.reservations`.
         created_at (DateTimeField): The timestamp when the record was created.
         updated_at (DateTimeField): The timestamp when the record was last updated.
     """
@@ -50,11 +52,94 @@ class Microcontroller(models.Model):
     
     class Meta:
         ordering = ['name']
+        indexes = [
+            # Available boards of a type, listed by name (as `reserve` tries
+            # them). Boolean filters are compiled to bare column tests, so
+            # flags are index conditions rather than index columns.
+            models.Index(
+                fields=['type', 'name'],
+                name='api_mcu_available_idx',
+                condition=models.Q(is_available=True),
+            ),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.type})"
 
 
+class Reservation(models.Model):
+    """
+    A user's claim on a microcontroller of some type, held under a lease.
+
+    A reservation is ``WAITING`` in its type's queue until a board is handed
+    to it, then ``ACTIVE`` until it is released or its lease runs out. Both
+    kinds of reservation must be renewed (heartbeat) before
+    `lease_expires_at`. Maintained by `api.reservations`, which also keeps
+    `Microcontroller.is_available` and `current_user` in step.
+
+    Attributes:
+        user (ForeignKey): The user holding or waiting for a board.
+        microcontroller_type (CharField): The type of board wanted.
+        microcontroller (ForeignKey): The board held, once handed over.
+        status (CharField): ``WAITING``, ``ACTIVE``, ``RELEASED``, ``EXPIRED``
+            or ``CANCELLED``.
+        lease_expires_at (DateTimeField): When the reservation lapses unless renewed.
+        created_at (DateTimeField): When the reservation was made.
+        granted_at (DateTimeField): When the board was handed over, if it was.
+        ended_at (DateTimeField): When the reservation ended, if it has.
+    """
+    WAITING = 'WAITING'
+    ACTIVE = 'ACTIVE'
+    RELEASED = 'RELEASED'
+    EXPIRED = 'EXPIRED'
+    CANCELLED = 'CANCELLED'
+    STATUSES = [
+        (WAITING, 'Waiting'),
+        (ACTIVE, 'Active'),
+        (RELEASED, 'Released'),
+        (EXPIRED, 'Expired'),
+        (CANCELLED, 'Cancelled'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    microcontroller_type = models.CharField(max_length=50, choices=Microcontroller.MICROCONTROLLER_TYPES)
+    microcontroller = models.ForeignKey(Microcontroller, on_delete=models.CASCADE, null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUSES, default=WAITING)
+    lease_expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    granted_at = models.DateTimeField(null=True, blank=True)
+    ended_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            # A board has a single holder
+            models.UniqueConstraint(
+                fields=['microcontroller'],
+                name='api_reservation_active_board',
+                condition=models.Q(status='ACTIVE'),
+            ),
+            # And a user a single place per type, holding or waiting
+            models.UniqueConstraint(
+                fields=['user', 'microcontroller_type'],
+                name='api_reservation_open_unique',
+                condition=models.Q(status__in=['WAITING', 'ACTIVE']),
+            ),
+        ]
+        indexes = [
+            # A type's queue, first come first served
+            models.Index(
+                fields=['microcontroller_type', 'id'],
+                name='api_reservation_queue_idx',
+                condition=models.Q(status='WAITING'),
+            ),
+            # Lapsed leases
+            models.Index(fields=['status', 'lease_expires_at'], name='api_reservation_lease_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.status.lower()} for {self.microcontroller_type}"
+
+
 class Project(models.Model):
     """
     Represents a user's project on the platform.
@@ -99,6 +184,10 @@ class Project(models.Model):
     
     class Meta:
         ordering = ['-updated_at']
+        indexes = [
+            # Default listing order, with the primary key as pagination tie-breaker
+            models.Index(fields=['-updated_at', 'id'], name='api_project_updated_idx'),
+        ]
     
     def __str__(self):
         return self.title
@@ -140,6 +229,14 @@ class CodeExecution(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Default listing order, with the primary key as pagination tie-breaker
+            models.Index(fields=['-created_at', 'id'], name='api_codeexec_created_idx'),
+            # A project's executions, newest first
+            models.Index(fields=['project', '-created_at'], name='api_codeexec_project_idx'),
+            # Executions in a given state (e.g. the pending queue), oldest first
+            models.Index(fields=['execution_status', 'created_at'], name='api_codeexec_status_idx'),
+        ]
     
     def __str__(self):
         return f"{self.project.title} - {self.execution_status}"
@@ -220,6 +317,16 @@ class Tutorial(models.Model):
     
     class Meta:
         ordering = ['difficulty', 'title']
+        indexes = [
+            # Default listing order, with the primary key as pagination tie-breaker
+            models.Index(fields=['difficulty', 'title', 'id'], name='api_tutorial_listing_idx'),
+            # Published tutorials in listing order
+            models.Index(
+                fields=['difficulty', 'title'],
+                name='api_tutorial_published_idx',
+                condition=models.Q(is_published=True),
+            ),
+        ]
     
     def __str__(self):
         return self.title
@@ -298,6 +405,16 @@ class CaseStudy(models.Model):
     class Meta:
         ordering = ['-created_at']
         verbose_name_plural = "Case Studies"
+        indexes = [
+            # Default listing order, with the primary key as pagination tie-breaker
+            models.Index(fields=['-created_at', 'id'], name='api_casestudy_created_idx'),
+            # Only the few featured case studies are indexed
+            models.Index(
+                fields=['-created_at'],
+                name='api_casestudy_featured_idx',
+                condition=models.Q(is_featured=True),
+            ),
+        ]
     
     def __str__(self):
         return self.title
@@ -339,6 +456,16 @@ class ContactInquiry(models.Model):
     class Meta:
         ordering = ['-created_at']
         verbose_name_plural = "Contact Inquiries"
+        indexes = [
+            # Default listing order, with the primary key as pagination tie-breaker
+            models.Index(fields=['-created_at', 'id'], name='api_inquiry_created_idx'),
+            # The unread inbox, newest first
+            models.Index(
+                fields=['-created_at'],
+                name='api_inquiry_unread_idx',
+                condition=models.Q(is_read=False),
+            ),
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.subject}"
@@ -453,6 +580,115 @@ class Resource(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Default listing order, with the primary key as pagination tie-breaker
+            models.Index(fields=['-created_at', 'id'], name='api_resource_created_idx'),
+            # Resources of one type, newest first, and the featured ones alone
+            models.Index(fields=['resource_type', '-created_at'], name='api_resource_type_idx'),
+            models.Index(
+                fields=['resource_type', '-created_at'],
+                name='api_resource_featured_idx',
+                condition=models.Q(is_featured=True),
+            ),
+        ]
     
     def __str__(self):
         return self.title
+
+
+class ModelVersion(models.Model):
+    """
+    Counts the changes made to the rows of a model.
+
+    Bumped by the signal handlers in `api.signals` whenever a row of the model
+    is saved or deleted, or one of its many-to-many relations changes, in the
+    same transaction as the change. The API derives the validators of its
+    conditional responses from it (see `api.conditional`).
+
+    Attributes:
+        label (CharField): The model's label, e.g. ``api.Project``.
+        version (PositiveBigIntegerField): The number of changes seen so far.
+        changed_at (DateTimeField): The time of the last change.
+    """
+    label = models.CharField(max_length=100, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    changed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.label} v{self.version}"
+
+
+class TagIndex(models.Model):
+    """
+    One tag of one tagged object, so tag filters can use an index instead of
+    scanning the JSON lists they are stored in.
+
+    Maintained from `Tutorial.tags`, `Resource.tags` and
+    `CaseStudy.technologies_used` by `api.tags`; never edited directly.
+
+    Attributes:
+        model (CharField): The label of the tagged object's model, e.g. ``api.Resource``.
+        object_id (UUIDField): The primary key of the tagged object.
+        tag (CharField): The tag as written.
+        tag_key (CharField): The tag case-folded, which filters match on.
+    """
+    model = models.CharField(max_length=100)
+    object_id = models.UUIDField()
+    tag = models.CharField(max_length=100)
+    tag_key = models.CharField(max_length=100)
+
+    class Meta:
+        constraints = [
+            # Also the index of tag lookups: the objects of a model with a tag
+            models.UniqueConstraint(fields=['model', 'tag_key', 'object_id'], name='api_tagindex_unique'),
+        ]
+        indexes = [
+            # The tags of given objects (facet counts, reindexing)
+            models.Index(fields=['model', 'object_id'], name='api_tagindex_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model} {self.object_id}: {self.tag}"
+
+
+class SearchDocument(models.Model):
+    """
+    One tutorial, resource or case study in the full-text search index.
+
+    The searchable text itself lives in the SQLite FTS5 table ``api_search``,
+    whose rowid is this row's id; this table maps it back to the object.
+    Maintained by `api.search`; never edited directly.
+
+    Attributes:
+        model (CharField): The label of the indexed object's model, e.g. ``api.Tutorial``.
+        object_id (UUIDField): The primary key of the indexed object.
+    """
+    model = models.CharField(max_length=100)
+    object_id = models.UUIDField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['model', 'object_id'], name='api_searchdocument_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.model} {self.object_id}"
+
+
+class RevokedToken(models.Model):
+    """
+    An API token revoked before its expiry.
+
+    Tokens are checked without querying this table: `api.authentication`
+    mirrors its rows into a cache. Rows are purged once their token has
+    expired, as it is rejected anyway.
+
+    Attributes:
+        token_id (CharField): The random identifier embedded in the token.
+        expires_at (DateTimeField): When the token expires.
+    """
+    token_id = models.CharField(max_length=32, primary_key=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.token_id} (expires {self.expires_at})"
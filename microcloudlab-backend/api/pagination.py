@@ -0,0 +1,194 @@
+"""
+Keyset pagination for the router-registered list endpoints.
+
+A page is requested with an opaque `cursor` holding the ordering values of
+the row it continues from, and fetched with a ``WHERE (ordering) > (cursor)``
+condition instead of an OFFSET, so a deep page costs as much as the first
+one and rows inserted meanwhile neither repeat nor go missing.
+
+The ordering is the queryset's (usually the model's `Meta.ordering`) with the
+primary key appended as a tie-breaker. Response bodies stay plain lists; the
+neighbouring pages are linked from the `Link` header (RFC 8288), e.g.::
+
+    Link: <http://host/api/projects/?cursor=eyJ2Ij...>; rel="next"
+"""
+import base64
+import binascii
+import datetime
+import json
+import uuid
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (uuid.UUID, Decimal)):
+        return str(value)
+    return value
+
+
+def encode_cursor(values, reverse=False):
+    """
+    Encodes a position as an opaque, URL-safe cursor.
+
+    Args:
+        values (list): The ordering values of the row the page continues from.
+        reverse (bool): Whether the page goes backwards from that row.
+
+    Returns:
+        str: The cursor.
+    """
+    payload = {'v': [_encode_value(value) for value in values]}
+    if reverse:
+        payload['r'] = 1
+    data = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    """
+    Decodes a cursor made by `encode_cursor`.
+
+    Args:
+        cursor (str): The cursor.
+        size (int): The number of ordering values the cursor must hold.
+
+    Returns:
+        tuple: The ordering values and the `reverse` flag.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(data)
+        values = payload['v']
+        reverse = bool(payload.get('r'))
+    except (binascii.Error, ValueError, TypeError, KeyError) as error:
+        raise ValueError(f'Malformed cursor: {error}')
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError('Cursor does not match the ordering')
+    return values, reverse
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over the queryset's ordering plus the primary key.
+
+    Query parameters:
+        cursor: Where the page starts, taken from a `Link` header.
+        page_size: The number of rows per page, up to `max_page_size`.
+    """
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def __init__(self):
+        self.page_size = getattr(settings, 'API_PAGE_SIZE', 100)
+        self.max_page_size = getattr(settings, 'API_MAX_PAGE_SIZE', 1000)
+        self.request = None
+        self.next_cursor = None
+        self.previous_cursor = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Fetches the page of `queryset` designated by the request's cursor.
+
+        Returns:
+            list: The rows of the page, in the queryset's order.
+        """
+        self.request = request
+        page_size = self.get_page_size(request)
+        ordering = self.get_ordering(queryset)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        values, reverse = None, False
+        if cursor:
+            try:
+                values, reverse = decode_cursor(cursor, len(ordering))
+            except ValueError as error:
+                raise ValidationError({self.cursor_query_param: [str(error)]})
+
+        if reverse:
+            queryset = queryset.order_by(*[_invert(field) for field in ordering])
+        else:
+            queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._after(ordering, values, reverse))
+
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        self.next_cursor = self.previous_cursor = None
+        if rows:
+            if has_more or reverse:
+                self.next_cursor = encode_cursor(self._values(rows[-1], ordering))
+            if values is not None and (has_more or not reverse):
+                self.previous_cursor = encode_cursor(self._values(rows[0], ordering), reverse=True)
+        return rows
+
+    def get_paginated_response(self, data):
+        links = []
+        if self.next_cursor is not None:
+            links.append(f'<{self._link(self.next_cursor)}>; rel="next"')
+        if self.previous_cursor is not None:
+            links.append(f'<{self._link(self.previous_cursor)}>; rel="prev"')
+        headers = {'Link': ', '.join(links)} if links else None
+        return Response(data, headers=headers)
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def get_ordering(self, queryset):
+        """
+        Returns the ordering of `queryset` with the primary key appended.
+        """
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+        ordering = [field for field in ordering if isinstance(field, str) and field.lstrip('-') != '?']
+        if not any(field.lstrip('-') in ('pk', queryset.model._meta.pk.name) for field in ordering):
+            ordering.append('pk')
+        return ordering
+
+    def _after(self, ordering, values, reverse):
+        """
+        Builds the condition selecting the rows after (or, when `reverse`,
+        before) the cursor position: the first ordering field that differs
+        from the cursor's value must be past it.
+        """
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, values):
+            name = field.lstrip('-')
+            descending = field.startswith('-') != reverse
+            condition |= equal & Q(**{f'{name}__{"lt" if descending else "gt"}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def _values(self, row, ordering):
+        # Rows are model instances, or dicts when paginating a `.values()` queryset
+        if isinstance(row, dict):
+            return [row[field.lstrip('-')] for field in ordering]
+        return [getattr(row, field.lstrip('-')) for field in ordering]
+
+    def _link(self, cursor):
+        url = self.request.build_absolute_uri()
+        return replace_query_param(remove_query_param(url, self.cursor_query_param), self.cursor_query_param, cursor)
+
+
+def _invert(field):
+    return field[1:] if field.startswith('-') else f'-{field}'
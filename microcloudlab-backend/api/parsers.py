@@ -0,0 +1,60 @@
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class OctetStreamParser(BaseParser):
+    """
+    Parser for raw `application/octet-stream` request bodies.
+
+    The body is returned unchanged as `bytes`, so `request.data` holds the raw
+    peripheral frame exactly as the frontend packed it.
+    """
+    media_type = 'application/octet-stream'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """
+        Reads the whole request body.
+
+        Returns:
+            bytes: The raw body, or an empty bytes object if there is none.
+        """
+        if stream is None:
+            return b''
+        return stream.read()
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parser for newline-delimited JSON (`application/x-ndjson`) request bodies.
+
+    The body is not read up front: `request.data` is an iterator reading it
+    one line at a time, so a request of any size is parsed in constant memory.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """
+        Returns an iterator over the JSON values of the body's lines.
+
+        Returns:
+            iterator: `(line_number, value)` pairs, numbered from 1, for every
+            non-blank line. A line that is not valid JSON yields a `ParseError`
+            as its value instead of ending the iteration.
+        """
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if stream is None:
+            return iter(())
+        return self._iter_values(stream, encoding)
+
+    def _iter_values(self, stream, encoding):
+        for number, line in enumerate(iter(stream.readline, b''), start=1):
+            if not line.strip():
+                continue
+            try:
+                yield number, json.loads(line.decode(encoding))
+            except ValueError as e:
+                yield number, ParseError(f'NDJSON parse error - {e}')
@@ -0,0 +1,7 @@
+"""
+Peripheral communication subsystem.
+
+This package holds the in-process machinery behind the `peripheral/*`
+endpoints in `api.views`: the storage of received peripheral traffic and the
+helpers used to process it.
+"""
@@ -0,0 +1,183 @@
+"""
+Typed decoding of peripheral frames.
+
+The data section of each frame has a peripheral-specific layout, defined by
+the `pack*Configuration` functions in `peripheralService.js`. This module
+mirrors those layouts as a registry of precompiled `struct.Struct` objects
+keyed by command code, so the backend can turn a frame back into a typed
+configuration once, when it is received, instead of every consumer parsing
+the raw bytes again.
+
+Multi-byte fields are big-endian, as packed by the frontend. Bytes after the
+declared fields are zero padding.
+"""
+import struct
+from collections import namedtuple
+from functools import lru_cache
+
+from django.conf import settings
+
+from .frames import PERIPHERAL_COMMANDS, FrameError, parse_frame
+
+FrameLayout = namedtuple('FrameLayout', ['command', 'peripheral_type', 'struct', 'build'])
+
+_layouts = {}
+
+# Marker used by the frontend for optional pins that are not assigned
+NO_PIN = 0xFF
+
+
+def register_decoder(peripheral_type, fmt):
+    """
+    Registers the data-section layout for a peripheral type.
+
+    Used as a decorator on a function that receives the unpacked field tuple
+    and returns the typed configuration as a dict.
+
+    Args:
+        peripheral_type (str): A key of `PERIPHERAL_COMMANDS`.
+        fmt (str): The `struct` format of the data section's leading fields.
+
+    Returns:
+        Callable: The decorator.
+    """
+    command = PERIPHERAL_COMMANDS[peripheral_type]
+
+    def decorator(build):
+        _layouts[command] = FrameLayout(command, peripheral_type, struct.Struct(fmt), build)
+        return build
+
+    return decorator
+
+
+def get_layout(command):
+    """
+    Returns the registered `FrameLayout` for a command code, or None.
+    """
+    return _layouts.get(command)
+
+
+def _decode_frame(frame_bytes):
+    try:
+        frame = parse_frame(frame_bytes)
+    except FrameError:
+        return None
+    layout = _layouts.get(frame.command)
+    if layout is None or len(frame.payload) < layout.struct.size:
+        return None
+    return {
+        'peripheral_type': layout.peripheral_type,
+        **layout.build(layout.struct.unpack_from(frame.payload)),
+    }
+
+
+_cached_decode_frame = lru_cache(maxsize=getattr(settings, 'PERIPHERAL_DECODER_CACHE_SIZE', 1024))(_decode_frame)
+
+
+def decode_frame(raw_bytes):
+    """
+    Decodes a raw frame into its typed configuration.
+
+    Results are kept in an LRU cache keyed by the frame bytes, since clients
+    tend to send the same configuration frames over and over. The returned
+    dict is shared between callers and must not be modified.
+
+    Args:
+        raw_bytes (bytes | memoryview): The whole frame, start and end bytes
+            included.
+
+    Returns:
+        dict | None: The typed configuration, or None if the frame is
+        malformed or its command has no registered layout.
+    """
+    return _cached_decode_frame(bytes(raw_bytes))
+
+
+def _pin(value):
+    return None if value == NO_PIN else value
+
+
+@register_decoder('UART', '>BIBBBBBBHHBBBB')
+def _decode_uart(fields):
+    (instance, baud_rate, data_bits, parity, stop_bits, flow_control, flags, oversampling,
+     tx_buffer_size, rx_buffer_size, tx_pin, rx_pin, rts_pin, cts_pin) = fields
+    return {
+        'instance': instance,
+        'baud_rate': baud_rate,
+        'data_bits': data_bits,
+        'parity': {0: 'none', 1: 'even'}.get(parity, 'odd'),
+        'stop_bits': stop_bits / 10,
+        'flow_control': {0: 'none', 1: 'rts', 2: 'cts'}.get(flow_control, 'rts_cts'),
+        'dma_enable': bool(flags & 0x80),
+        'interrupt_enable': bool(flags & 0x40),
+        'auto_baud': bool(flags & 0x20),
+        'oversampling': oversampling,
+        'tx_buffer_size': tx_buffer_size,
+        'rx_buffer_size': rx_buffer_size,
+        'tx_pin': tx_pin,
+        'rx_pin': rx_pin,
+        'rts_pin': _pin(rts_pin),
+        'cts_pin': _pin(cts_pin),
+    }
+
+
+@register_decoder('SPI', '>12B')
+def _decode_spi(fields):
+    (instance, mode, data_size, clock_polarity, clock_phase, baud_rate_prescaler, flags,
+     direction, mosi_pin, miso_pin, sck_pin, nss_pin) = fields
+    return {
+        'instance': instance,
+        'mode': 'master' if mode == 0 else 'slave',
+        'data_size': data_size,
+        'clock_polarity': 'low' if clock_polarity == 0 else 'high',
+        'clock_phase': 'first' if clock_phase == 0 else 'second',
+        'baud_rate_prescaler': baud_rate_prescaler,
+        'crc_enable': bool(flags & 0x80),
+        'nss_pulse': bool(flags & 0x40),
+        'dma_enable': bool(flags & 0x20),
+        'interrupt_enable': bool(flags & 0x10),
+        'direction': '2lines' if direction == 0 else '1line',
+        'mosi_pin': mosi_pin,
+        'miso_pin': miso_pin,
+        'sck_pin': sck_pin,
+        'nss_pin': nss_pin,
+    }
+
+
+@register_decoder('I2C', '>BBIBBBB')
+def _decode_i2c(fields):
+    instance, address, clock_speed, duty_cycle, flags, sda_pin, scl_pin = fields
+    return {
+        'instance': instance,
+        'address': address,
+        'clock_speed': clock_speed,
+        'duty_cycle': '2' if duty_cycle == 0 else '16_9',
+        'general_call': bool(flags & 0x80),
+        'no_stretch': bool(flags & 0x40),
+        'dma_enable': bool(flags & 0x20),
+        'interrupt_enable': bool(flags & 0x10),
+        'sda_pin': sda_pin,
+        'scl_pin': scl_pin,
+    }
+
+
+@register_decoder('PWM', '>BIHB')
+def _decode_pwm(fields):
+    instance, frequency, duty_cycle, output_pin = fields
+    return {
+        'instance': instance,
+        'frequency': frequency,
+        'duty_cycle': duty_cycle / 100,
+        'output_pin': output_pin,
+    }
+
+
+@register_decoder('GPIO', '>4B')
+def _decode_gpio(fields):
+    pin, direction, pull_up, pull_down = fields
+    return {
+        'pin': pin,
+        'direction': 'input' if direction == 0 else 'output',
+        'pull_up': bool(pull_up),
+        'pull_down': bool(pull_down),
+    }
@@ -0,0 +1,81 @@
+"""
+Detection of repeated peripheral frames.
+
+The configuration dashboard often re-sends the exact same frame for a
+peripheral instance. `FrameDeduplicator` remembers a content hash of the last
+frame seen for every `(mcu_id, peripheral_type, instance)`, so an unchanged
+frame can be recorded as a repeat of the previous entry instead of being
+stored, logged, published and dispatched again.
+
+Checking a frame and storing it happen under one lock per instance, so two
+identical frames arriving together are stored once. Instances are spread
+over independently locked stripes, as in `api.peripherals.throttle`.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def frame_digest(raw_bytes):
+    """
+    Returns the content hash used to compare frames.
+    """
+    return hashlib.blake2b(raw_bytes, digest_size=16).digest()
+
+
+class FrameDeduplicator:
+    """
+    Tracks the last frame of each peripheral instance.
+
+    The number of tracked instances is bounded; the least recently seen one
+    of a stripe is forgotten first.
+
+    Args:
+        max_keys (int): The approximate number of instances tracked.
+        stripes (int): The number of independently locked tables.
+    """
+
+    def __init__(self, max_keys=4096, stripes=16):
+        self.max_keys = max_keys
+        self._stripe_keys = max(1, max_keys // stripes)
+        self._stripes = [(threading.Lock(), OrderedDict()) for _ in range(stripes)]
+
+    def admit(self, key, digest, timestamp, store, build_entry):
+        """
+        Stores a frame, unless it repeats the last one seen for `key`.
+
+        A new frame's entry is built and appended to `store`; for a repeat,
+        the previous entry's `repeat_count` and `last_repeat_timestamp` are
+        updated through `store.record_repeat`, so every reader of the store
+        sees them.
+
+        Args:
+            key (tuple): The `(mcu_id, peripheral_type, instance)` key.
+            digest (bytes): The frame's `frame_digest`.
+            timestamp (str): The frame's timestamp.
+            store: The `PeripheralStore` (or shared store) to record into.
+            build_entry (Callable): Returns the entry of a new frame.
+
+        Returns:
+            tuple: The stored entry, and whether the frame was a repeat of it.
+        """
+        lock, last_frames = self._stripes[hash(key) % len(self._stripes)]
+        with lock:
+            last = last_frames.get(key)
+            if last is not None and last[0] == digest:
+                last_frames.move_to_end(key)
+                return store.record_repeat(last[1], timestamp), True
+            entry = store.append(build_entry())
+            last_frames[key] = (digest, entry)
+            last_frames.move_to_end(key)
+            if len(last_frames) > self._stripe_keys:
+                last_frames.popitem(last=False)
+            return entry, False
+
+    def clear(self):
+        """
+        Forgets every tracked frame.
+        """
+        for lock, last_frames in self._stripes:
+            with lock:
+                last_frames.clear()
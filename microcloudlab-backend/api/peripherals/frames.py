@@ -0,0 +1,186 @@
+"""
+Parsing of the binary peripheral configuration frames.
+
+The frontend (`peripheralService.js`) packs every peripheral configuration
+into a frame with the following layout::
+
+    +-------+---------+--------+-----------------+-----+
+    | 0xAA  | command | length | data (length B) | 0x55|
+    +-------+---------+--------+-----------------+-----+
+
+The helpers in this module parse such frames with `memoryview` slicing, so the
+payload is never copied while it is being validated and inspected.
+
+Batches of frames for several devices are sent as a stream of records, each
+record being a frame prefixed with its target `mcu_id` and `instance`::
+
+    +-----+--------+-----+----------+-------+
+    | len | mcu_id | len | instance | frame |
+    +-----+--------+-----+----------+-------+
+
+The prefix strings are UTF-8 and their lengths are single bytes. The frame
+itself is delimited by its own length byte.
+"""
+from collections import namedtuple
+
+PACKET_START = 0xAA
+PACKET_END = 0x55
+
+# Start, command, length and end bytes
+FRAME_OVERHEAD = 4
+
+# Command codes for the different peripheral types (mirrors PERIPHERAL_COMMANDS
+# in peripheralService.js)
+PERIPHERAL_COMMANDS = {
+    'UART': 0x01,
+    'SPI': 0x02,
+    'I2C': 0x03,
+    'PWM': 0x04,
+    'GPIO': 0x05,
+    'ADC': 0x06,
+    'DAC': 0x07,
+    'CAN': 0x08,
+    'USB': 0x09,
+    'WIFI': 0x0A,
+    'BLUETOOTH': 0x0B,
+    'CONFIG': 0x0C,
+}
+
+COMMAND_NAMES = {code: name for name, code in PERIPHERAL_COMMANDS.items()}
+
+
+class FrameError(ValueError):
+    """Raised when a buffer does not contain a well-formed peripheral frame."""
+
+
+FrameRecord = namedtuple('FrameRecord', ['offset', 'mcu_id', 'instance', 'frame', 'error'])
+FrameRecord.__doc__ = """
+A record read from a batch stream.
+
+Attributes:
+    offset (int): The offset of the frame's start byte within the stream.
+    mcu_id (str): The target microcontroller.
+    instance (str): The peripheral instance.
+    frame (Frame | None): The parsed frame, or None if it was malformed.
+    error (FrameError | None): Why the frame was rejected, if it was.
+"""
+
+
+class Frame(namedtuple('Frame', ['command', 'length', 'payload', 'raw'])):
+    """
+    A parsed peripheral frame.
+
+    Attributes:
+        command (int): The command code (0x01 UART ... 0x0C CONFIG).
+        length (int): The value of the frame's length byte.
+        payload (memoryview): A view of the data section of the frame.
+        raw (memoryview): A view of the whole frame, start and end bytes included.
+    """
+    __slots__ = ()
+
+    @property
+    def peripheral_type(self):
+        """The peripheral type name for the frame's command code."""
+        return COMMAND_NAMES.get(self.command, 'UNKNOWN')
+
+    @property
+    def hex(self):
+        """The frame rendered as space-separated upper-case hex bytes."""
+        return hex_bytes(self.raw)
+
+
+def hex_bytes(data):
+    """
+    Renders a byte sequence as space-separated, upper-case hex pairs.
+
+    Args:
+        data (bytes | bytearray | memoryview): The bytes to render.
+
+    Returns:
+        str: The hex string, e.g. ``'AA 01 20 ... 55'``.
+    """
+    return data.hex(' ').upper()
+
+
+def parse_frame(buffer):
+    """
+    Parses and validates a single peripheral frame.
+
+    The returned `Frame` holds views into `buffer`; no bytes are copied.
+
+    Args:
+        buffer (bytes | bytearray | memoryview): The raw frame.
+
+    Returns:
+        Frame: The parsed frame.
+
+    Raises:
+        FrameError: If the buffer is too short, the start or end byte is
+            wrong, or the length byte does not match the data section.
+    """
+    view = memoryview(buffer)
+    size = len(view)
+    if size < FRAME_OVERHEAD:
+        raise FrameError(f'Frame too short: {size} bytes, expected at least {FRAME_OVERHEAD}')
+    if view[0] != PACKET_START:
+        raise FrameError(f'Invalid start byte 0x{view[0]:02X}, expected 0x{PACKET_START:02X}')
+    if view[-1] != PACKET_END:
+        raise FrameError(f'Invalid end byte 0x{view[-1]:02X}, expected 0x{PACKET_END:02X}')
+    length = view[2]
+    if length != size - FRAME_OVERHEAD:
+        raise FrameError(
+            f'Length byte 0x{length:02X} ({length}) does not match the '
+            f'{size - FRAME_OVERHEAD}-byte data section'
+        )
+    return Frame(view[1], length, view[3:-1], view)
+
+
+def iter_frame_records(buffer):
+    """
+    Splits a batch stream into its records.
+
+    A malformed frame whose extent is still known from its length byte is
+    reported through the record's `error` and the scan continues with the
+    next record. A truncated record makes the rest of the stream unreadable.
+
+    Args:
+        buffer (bytes | bytearray | memoryview): The batch stream.
+
+    Yields:
+        FrameRecord: One record per frame, in stream order.
+
+    Raises:
+        FrameError: If the stream ends in the middle of a record.
+    """
+    view = memoryview(buffer)
+    size = len(view)
+    offset = 0
+    while offset < size:
+        mcu_id, offset = _read_prefix(view, offset, 'mcu_id')
+        instance, offset = _read_prefix(view, offset, 'instance')
+        if offset + FRAME_OVERHEAD > size:
+            raise FrameError(f'Truncated frame at offset {offset}')
+        end = offset + view[offset + 2] + FRAME_OVERHEAD
+        if end > size:
+            raise FrameError(f'Truncated frame at offset {offset}')
+        try:
+            record = FrameRecord(offset, mcu_id, instance, parse_frame(view[offset:end]), None)
+        except FrameError as error:
+            record = FrameRecord(offset, mcu_id, instance, None, error)
+        yield record
+        offset = end
+
+
+def _read_prefix(view, offset, name):
+    """
+    Reads one length-prefixed UTF-8 string of a batch record.
+    """
+    if offset >= len(view):
+        raise FrameError(f'Truncated {name} at offset {offset}')
+    end = offset + 1 + view[offset]
+    if end > len(view):
+        raise FrameError(f'Truncated {name} at offset {offset}')
+    try:
+        return str(view[offset + 1:end], 'utf-8'), end
+    except UnicodeDecodeError as error:
+        raise FrameError(f'Invalid {name} at offset {offset}: {error}')
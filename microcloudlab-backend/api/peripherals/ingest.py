@@ -0,0 +1,164 @@
+"""
+The ingestion path shared by the peripheral send endpoints.
+
+`peripheral_send` and `peripheral_send_batch` both decode their request into
+one or more frames and hand each of them to `ingest_frame`, which builds the
+history entry, records it (in memory and, when enabled, in the durable
+history log), logs it through the `api.peripherals` logger,
+publishes it to streaming subscribers and queues it for delivery to the
+device (see `api.peripherals.transport`). Frames that repeat the previous frame
+of the same peripheral instance are only counted on that entry, through the
+store so that every reader sees the count (see `api.peripherals.dedup`). With
+the shared store, a repeat is only recognized by the worker that received
+the previous frame; another worker records it as a new entry.
+"""
+import json
+import logging
+
+from django.conf import settings
+
+from .decoders import decode_frame
+from .dedup import FrameDeduplicator, frame_digest
+from .frames import FRAME_OVERHEAD, PERIPHERAL_COMMANDS, hex_bytes
+from .segment_log import peripheral_history_log
+from .store import peripheral_store
+from .streaming import peripheral_hub
+from .transport import device_dispatcher
+
+logger = logging.getLogger('api.peripherals')
+
+frame_deduplicator = (
+    FrameDeduplicator(getattr(settings, 'PERIPHERAL_DEDUP_MAX_KEYS', 4096))
+    if getattr(settings, 'PERIPHERAL_DEDUPLICATE', True) else None
+)
+
+
+def ingest_frame(peripheral_type, instance, mcu_id, configuration, raw_bytes,
+                 timestamp='unknown', hex_data=None):
+    """
+    Records a single peripheral communication.
+
+    The entry carries the frame's typed configuration under `decoded` (see
+    `api.peripherals.decoders`), or None if the frame could not be decoded.
+
+    A frame identical to the last one received for the same MCU, peripheral
+    type and instance is not recorded again: the previous entry's
+    `repeat_count` is incremented instead, and the frame is neither logged,
+    persisted, published nor sent to the device again.
+
+    Args:
+        peripheral_type (str): The upper-cased peripheral type.
+        instance (str): The peripheral instance (e.g. 'UART1').
+        mcu_id (str): The identifier of the target microcontroller.
+        configuration (dict): The configuration the frame was packed from.
+        raw_bytes (bytes | memoryview): The raw frame.
+        timestamp: The client-supplied timestamp.
+        hex_data (str, optional): The frame already rendered as hex, when the
+            caller rendered a whole batch at once.
+
+    Returns:
+        tuple: The history entry, and whether the frame was a repeat of it.
+    """
+    data_length = len(raw_bytes)
+    timestamp = json.dumps(timestamp)
+
+    def build_entry():
+        frame_hex = hex_data
+        if frame_hex is None:
+            frame_hex = hex_bytes(raw_bytes) if data_length else 'No raw data'
+        return {
+            'peripheral_type': peripheral_type,
+            'instance': instance,
+            'mcu_id': mcu_id,
+            'configuration': configuration,
+            'raw_data': list(raw_bytes),
+            'hex_data': frame_hex,
+            'decoded': decode_frame(raw_bytes) if data_length else None,
+            'timestamp': timestamp,
+            'data_length': data_length,
+            'repeat_count': 0
+        }
+
+    # Record the communication; the store's ring buffers drop the oldest entries
+    if frame_deduplicator is not None and data_length:
+        peripheral_data, repeated = frame_deduplicator.admit(
+            (mcu_id, peripheral_type, instance), frame_digest(raw_bytes), timestamp, peripheral_store, build_entry
+        )
+        if repeated:
+            return peripheral_data, True
+    else:
+        peripheral_data = peripheral_store.append(build_entry())
+
+    if peripheral_history_log is not None:
+        peripheral_history_log.append(mcu_id, PERIPHERAL_COMMANDS.get(peripheral_type, 0), raw_bytes)
+
+    _log_frame(peripheral_data, raw_bytes)
+
+    # Push the frame to live `peripheral/stream/` subscribers
+    peripheral_hub.publish(peripheral_data)
+
+    # Queue the frame for delivery to the board, if it has a route
+    if device_dispatcher is not None and data_length:
+        device_dispatcher.dispatch(mcu_id, raw_bytes)
+
+    return peripheral_data, False
+
+
+def frame_response(peripheral_data, repeated=False):
+    """
+    Builds the response body describing an accepted frame.
+
+    Args:
+        peripheral_data (dict): The entry returned by `ingest_frame`.
+        repeated (bool): Whether the frame was a repeat of that entry.
+
+    Returns:
+        dict: The response fields for the frame.
+    """
+    peripheral_type = peripheral_data['peripheral_type']
+    mcu_id = peripheral_data['mcu_id']
+    if repeated:
+        message = f'{peripheral_type} configuration for {mcu_id} unchanged (repeat #{peripheral_data["repeat_count"]})'
+    else:
+        message = f'{peripheral_type} configuration sent to {mcu_id}'
+    return {
+        'status': 'success',
+        'message': message,
+        'peripheral_type': peripheral_type,
+        'instance': peripheral_data['instance'],
+        'mcu_id': mcu_id,
+        'data_length': peripheral_data['data_length'],
+        'timestamp': peripheral_data['last_repeat_timestamp'] if repeated else peripheral_data['timestamp'],
+        'repeated': repeated
+    }
+
+
+def _log_frame(peripheral_data, raw_bytes):
+    """
+    Logs the received frame as a structured record.
+
+    The record is only built when the logger is enabled; the configured
+    handler samples and filters it and writes it from a background thread.
+    """
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    fields = {
+        'peripheral_type': peripheral_data['peripheral_type'],
+        'mcu_id': peripheral_data['mcu_id'],
+        'instance': peripheral_data['instance'],
+        'data_length': peripheral_data['data_length'],
+        'hex_data': peripheral_data['hex_data'],
+        'configuration': peripheral_data['configuration'],
+    }
+    # Frame structure (if raw data exists)
+    if len(raw_bytes) >= FRAME_OVERHEAD:
+        fields['frame'] = {
+            'start': raw_bytes[0],
+            'command': raw_bytes[1],
+            'length': raw_bytes[2],
+            'end': raw_bytes[-1],
+        }
+    logger.info(
+        '%s configuration received for %s', peripheral_data['peripheral_type'],
+        peripheral_data['mcu_id'], extra=fields
+    )
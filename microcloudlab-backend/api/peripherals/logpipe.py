@@ -0,0 +1,158 @@
+"""
+Non-blocking structured logging for the peripheral ingestion path.
+
+Frames are logged through the standard `logging` module on the
+`api.peripherals` logger. The handler configured for it in `settings.LOGGING`
+is a `BackgroundQueueHandler`: the request thread only applies the cheap
+sampling and level filters and puts the record on a bounded queue, and a
+background `QueueListener` thread formats and writes it. When the queue is
+full the record is dropped and counted rather than blocking the request.
+
+All classes here are referenced from `settings.LOGGING`, which is configured
+before the app registry is ready, so this module must not import models.
+"""
+import atexit
+import itertools
+import json
+import logging
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+def _level(level):
+    """
+    Converts a level name such as 'DEBUG' to its number.
+    """
+    if isinstance(level, int):
+        return level
+    return logging.getLevelName(level.upper())
+
+
+class FrameSampler(logging.Filter):
+    """
+    Lets through one record in every `rate` for each MCU.
+
+    Records carrying an `mcu_id` attribute are counted per MCU and only every
+    `rate`-th one passes. Warnings and errors, and records without an
+    `mcu_id`, always pass.
+
+    The `mcu_id` comes from the client, so rather than one counter per MCU
+    there is a fixed number of counters and each MCU is hashed to one of
+    them. MCUs sharing a counter are sampled together.
+
+    Args:
+        rate (int): Log 1 in `rate` frames per MCU. 1 disables sampling.
+        slots (int): The number of counters.
+    """
+
+    def __init__(self, rate=1, slots=1024):
+        super().__init__()
+        self.rate = max(int(rate), 1)
+        self._counters = [itertools.count() for _ in range(max(int(slots), 1))]
+
+    def filter(self, record):
+        if self.rate == 1 or record.levelno >= logging.WARNING:
+            return True
+        mcu_id = getattr(record, 'mcu_id', None)
+        if mcu_id is None:
+            return True
+        counter = self._counters[hash(mcu_id) % len(self._counters)]
+        return next(counter) % self.rate == 0
+
+
+class PeripheralLevelFilter(logging.Filter):
+    """
+    Applies a minimum level per peripheral type.
+
+    Args:
+        levels (dict): Maps peripheral types (e.g. 'UART') to level names or
+            numbers.
+        default (str | int): The level applied to types not in `levels`.
+    """
+
+    def __init__(self, levels=None, default=logging.NOTSET):
+        super().__init__()
+        self.levels = {
+            peripheral_type.upper(): _level(level)
+            for peripheral_type, level in (levels or {}).items()
+        }
+        self.default = _level(default)
+
+    def filter(self, record):
+        peripheral_type = getattr(record, 'peripheral_type', None)
+        return record.levelno >= self.levels.get(peripheral_type, self.default)
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats records as single-line JSON objects.
+
+    The object holds the timestamp, level, logger name and message, plus every
+    attribute passed through `extra`.
+    """
+
+    def format(self, record):
+        payload = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                payload[key] = value
+        if record.exc_text:
+            payload['exception'] = record.exc_text
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class BackgroundQueueHandler(QueueHandler):
+    """
+    A logging handler that hands records to a background writer thread.
+
+    The handler owns a bounded queue and a `QueueListener` that writes the
+    records to stdout (or to `filename`). Records are enqueued without
+    blocking; when the queue is full they are dropped and counted in
+    `dropped`.
+
+    Args:
+        maxsize (int): The capacity of the queue.
+        json_output (bool): Whether to write JSON lines instead of plain text.
+        filename (str, optional): Writes to this file instead of stdout.
+    """
+
+    def __init__(self, maxsize=10000, json_output=True, filename=None):
+        super().__init__(queue.Queue(maxsize))
+        self.dropped = 0
+        if filename:
+            target = logging.FileHandler(filename, encoding='utf-8')
+        else:
+            target = logging.StreamHandler(sys.stdout)
+        target.setFormatter(
+            JsonFormatter() if json_output else logging.Formatter('%(asctime)s %(levelname)s %(name)s %(message)s')
+        )
+        self.listener = QueueListener(self.queue, target)
+        self.listener.start()
+        atexit.register(self.listener.stop)
+
+    def prepare(self, record):
+        """
+        Prepares a record for the queue without formatting it.
+
+        Formatting is left to the listener thread; only exception information,
+        which cannot cross threads, is rendered here.
+        """
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
@@ -0,0 +1,453 @@
+"""
+Durable, append-only storage of peripheral history.
+
+The in-memory `peripheral_store` only keeps the most recent frames and is lost
+on restart. `SegmentedLog` additionally appends every accepted frame to disk so
+long sessions can be inspected later with time-range queries.
+
+The log is a directory of segments. Each segment is a pair of files named
+after the timestamp (in microseconds) of its first record:
+
+* ``<base>.log`` holds the records back to back. A record is a fixed header
+  followed by the MCU id and the raw frame::
+
+      +--------------+---------+------------+-------------+--------+-----+
+      | timestamp u64| command | mcu_id len | raw len u32 | mcu_id | raw |
+      |  (µs, LE)    |   u8    |    u16     |             |        |     |
+      +--------------+---------+------------+-------------+--------+-----+
+
+* ``<base>.idx`` is a sparse index of ``(timestamp, position)`` pairs, one
+  for roughly every `index_interval` bytes of log, so a query can seek to the
+  first record of its range instead of scanning the segment.
+
+Segments are read through `mmap`, so queries never load a whole segment into
+memory. A new segment is started once the active one exceeds `segment_bytes`
+or `segment_seconds`, and whole segments are deleted once the log exceeds
+`retention_bytes` or they are older than `retention_seconds`.
+
+`append` only queues the frame: a background thread takes everything queued
+so far and writes it with a single `write` per file, so the request path
+never waits on the disk. Frames become visible to `query` once written
+(`flush` waits for that).
+
+Several processes (e.g. gunicorn workers) may write to the same directory.
+Writers serialize on an exclusive `flock` of the directory's ``active`` file,
+which records the active segment and the timestamp of its last record. Under
+the lock, a writer moves to the segment another process rolled to and takes
+its write position from the size of the files, so index entries point at
+record boundaries and timestamps stay sorted whichever process wrote them.
+"""
+import atexit
+import bisect
+import fcntl
+import logging
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+RECORD_HEADER = struct.Struct('<QBHI')
+INDEX_ENTRY = struct.Struct('<QQ')
+# The active segment's base timestamp and the timestamp of its last record
+ACTIVE = struct.Struct('<QQ')
+
+LOG_SUFFIX = '.log'
+INDEX_SUFFIX = '.idx'
+ACTIVE_NAME = 'active'
+
+# The most records written by the background thread in one go
+WRITE_BATCH = 1024
+
+logger = logging.getLogger('api.peripherals')
+
+
+class SegmentedLog:
+    """
+    A segmented, append-only log of peripheral frames, safe to share between
+    threads and processes.
+
+    Args:
+        directory (str | Path): Where the segments are stored. Created on
+            first write.
+        segment_bytes (int): Size after which a new segment is started.
+        segment_seconds (int): Age after which a new segment is started.
+        retention_bytes (int): Total size above which the oldest segments
+            are deleted.
+        retention_seconds (int): Age after which a segment is deleted.
+        index_interval (int): Approximate number of log bytes between two
+            sparse index entries.
+        max_pending (int): The number of frames queued for the writer
+            thread before `append` blocks.
+    """
+
+    def __init__(self, directory, segment_bytes=8 * 1024 * 1024, segment_seconds=3600,
+                 retention_bytes=1024 * 1024 * 1024, retention_seconds=7 * 24 * 3600,
+                 index_interval=4096, max_pending=10000):
+        self.directory = Path(directory)
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.retention_bytes = retention_bytes
+        self.retention_seconds = retention_seconds
+        self.index_interval = index_interval
+        self.max_pending = max_pending
+        self._reset()
+        atexit.register(self.close)
+
+    def _reset(self):
+        """
+        Sets up the per-process state: the queue, the writer thread and the
+        open files. Neither the thread nor its locks survive a fork.
+        """
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(self.max_pending)
+        self._writer = None
+        self._active_fd = None
+        self._log_fd = None
+        self._index_fd = None
+        self._base = None
+        self._position = 0
+        self._indexed_position = None
+
+    def append(self, mcu_id, command, raw_bytes, timestamp=None):
+        """
+        Queues a frame for the active segment.
+
+        Args:
+            mcu_id (str): The identifier of the microcontroller.
+            command (int): The frame's command code.
+            raw_bytes (bytes | memoryview): The raw frame.
+            timestamp (float, optional): The receive time in seconds since the
+                epoch. Defaults to now. Timestamps are kept non-decreasing
+                so each segment stays sorted, so the stored timestamp may be
+                slightly later.
+        """
+        timestamp_us = int((time.time() if timestamp is None else timestamp) * 1_000_000)
+        record = (timestamp_us, command & 0xFF, str(mcu_id).encode('utf-8')[:0xFFFF], bytes(raw_bytes))
+        self._ensure_writer()
+        self._queue.put(record)
+
+    def flush(self):
+        """
+        Waits until every frame queued by this process is written.
+        """
+        if self._pid == os.getpid() and self._writer is not None:
+            self._queue.join()
+
+    def close(self):
+        """
+        Writes the queued frames, stops the writer thread and closes the files.
+        """
+        if self._pid != os.getpid():
+            return
+        with self._lock:
+            writer, self._writer = self._writer, None
+            if writer is not None:
+                self._queue.put(None)
+                writer.join()
+            self._close_segment()
+            if self._active_fd is not None:
+                os.close(self._active_fd)
+                self._active_fd = None
+
+    def query(self, since=None, until=None, mcu_id=None, limit=None):
+        """
+        Reads the records within a time range.
+
+        Segments entirely outside the range are skipped, and within a
+        segment the sparse index is used to seek to the first candidate
+        record.
+
+        Args:
+            since (float, optional): Inclusive lower bound, seconds since the epoch.
+            until (float, optional): Inclusive upper bound, seconds since the epoch.
+            mcu_id (str, optional): Only return records for this MCU.
+            limit (int, optional): The maximum number of records returned.
+
+        Returns:
+            list: ``(timestamp_us, mcu_id, command, raw_bytes)`` tuples in
+            time order.
+        """
+        since_us = int(since * 1_000_000) if since is not None else 0
+        until_us = int(until * 1_000_000) if until is not None else None
+        mcu_bytes = str(mcu_id).encode('utf-8') if mcu_id is not None else None
+
+        bases = self._segment_bases()
+        records = []
+        for position, base in enumerate(bases):
+            if until_us is not None and base > until_us:
+                break
+            next_base = bases[position + 1] if position + 1 < len(bases) else None
+            if next_base is not None and next_base <= since_us:
+                continue
+            for record in self._read_segment(base, since_us, until_us, mcu_bytes):
+                records.append(record)
+                if limit is not None and len(records) >= limit:
+                    return records
+        return records
+
+    def enforce_retention(self):
+        """
+        Deletes the segments that exceed the size or age limits.
+
+        The active segment is never deleted.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.directory / ACTIVE_NAME, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            active = os.pread(fd, ACTIVE.size, 0)
+            self._enforce_retention(ACTIVE.unpack(active)[0] if len(active) == ACTIVE.size else None)
+        finally:
+            # Closing the descriptor releases the lock
+            os.close(fd)
+
+    def _ensure_writer(self):
+        if self._pid != os.getpid():
+            self._reset()
+        if self._writer is None:
+            with self._lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(
+                        target=self._write_loop, name='peripheral-history-log', daemon=True
+                    )
+                    self._writer.start()
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < WRITE_BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            records = [record for record in batch if record is not None]
+            try:
+                if records:
+                    self._write(records)
+            except OSError:
+                logger.exception('Could not write %d frames to the peripheral history', len(records))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if len(records) < len(batch):
+                # Closed
+                return
+
+    def _write(self, records):
+        """
+        Writes records to the active segment under the directory lock.
+        """
+        if self._active_fd is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._active_fd = os.open(self.directory / ACTIVE_NAME, os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(self._active_fd, fcntl.LOCK_EX)
+        try:
+            active = os.pread(self._active_fd, ACTIVE.size, 0)
+            base, last_timestamp = ACTIVE.unpack(active) if len(active) == ACTIVE.size else (None, 0)
+            self._sync(base)
+
+            log_chunks = []
+            index_chunks = []
+            for timestamp_us, command, mcu_bytes, raw_bytes in records:
+                timestamp_us = max(timestamp_us, last_timestamp)
+                if self._needs_roll(timestamp_us):
+                    self._write_chunks(log_chunks, index_chunks)
+                    timestamp_us = self._roll(timestamp_us)
+                if self._indexed_position is None or self._position - self._indexed_position >= self.index_interval:
+                    index_chunks.append(INDEX_ENTRY.pack(timestamp_us, self._position))
+                    self._indexed_position = self._position
+                log_chunks.append(RECORD_HEADER.pack(timestamp_us, command, len(mcu_bytes), len(raw_bytes)))
+                log_chunks.append(mcu_bytes)
+                log_chunks.append(raw_bytes)
+                self._position += RECORD_HEADER.size + len(mcu_bytes) + len(raw_bytes)
+                last_timestamp = timestamp_us
+            self._write_chunks(log_chunks, index_chunks)
+            os.pwrite(self._active_fd, ACTIVE.pack(self._base, last_timestamp), 0)
+        finally:
+            fcntl.flock(self._active_fd, fcntl.LOCK_UN)
+
+    def _sync(self, base):
+        """
+        Opens the active segment recorded in the ``active`` file, and takes
+        the write position and last index entry from the files, which other
+        processes may have appended to.
+        """
+        if base is not None and base != self._base:
+            self._close_segment()
+            self._open_segment(base)
+        if self._log_fd is None:
+            return
+        self._position = os.fstat(self._log_fd).st_size
+        index_size = os.fstat(self._index_fd).st_size
+        index_size -= index_size % INDEX_ENTRY.size
+        if index_size:
+            self._indexed_position = INDEX_ENTRY.unpack(
+                os.pread(self._index_fd, INDEX_ENTRY.size, index_size - INDEX_ENTRY.size)
+            )[1]
+        else:
+            self._indexed_position = None
+
+    def _write_chunks(self, log_chunks, index_chunks):
+        # Index entries first: one pointing past the end of the log is
+        # harmless to readers, a record without its index entry is not
+        for fd, chunks in ((self._index_fd, index_chunks), (self._log_fd, log_chunks)):
+            if chunks:
+                data = memoryview(b''.join(chunks))
+                while data:
+                    data = data[os.write(fd, data):]
+                chunks.clear()
+
+    def _needs_roll(self, timestamp_us):
+        if self._log_fd is None:
+            return True
+        if self._position >= self.segment_bytes:
+            return True
+        return timestamp_us - self._base >= self.segment_seconds * 1_000_000
+
+    def _roll(self, timestamp_us):
+        """
+        Closes the active segment and starts a new one at `timestamp_us`.
+
+        Only called under the directory lock; the segment is created
+        exclusively all the same.
+
+        Returns:
+            int: The new segment's base timestamp. It is only later than
+            `timestamp_us` if a segment with that name already exists.
+        """
+        self._close_segment()
+        base = timestamp_us
+        while True:
+            try:
+                fd = os.open(self._segment_path(base), os.O_WRONLY | os.O_APPEND | os.O_CREAT | os.O_EXCL, 0o644)
+            except FileExistsError:
+                base += 1
+                continue
+            os.close(fd)
+            break
+        self._open_segment(base)
+        self._enforce_retention(active=base)
+        return base
+
+    def _open_segment(self, base):
+        self._log_fd = os.open(self._segment_path(base), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._index_fd = os.open(self._segment_path(base, INDEX_SUFFIX), os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        self._base = base
+        self._position = 0
+        self._indexed_position = None
+
+    def _close_segment(self):
+        for fd in (self._log_fd, self._index_fd):
+            if fd is not None:
+                os.close(fd)
+        self._log_fd = self._index_fd = self._base = None
+
+    def _enforce_retention(self, active):
+        bases = self._segment_bases()
+        sizes = {base: self._segment_path(base).stat().st_size for base in bases}
+        total = sum(sizes.values())
+        cutoff = int((time.time() - self.retention_seconds) * 1_000_000)
+
+        for position, base in enumerate(bases):
+            if base == active:
+                break
+            # A segment ends where the next one starts
+            segment_end = bases[position + 1] if position + 1 < len(bases) else base
+            if total <= self.retention_bytes and segment_end >= cutoff:
+                break
+            self._segment_path(base).unlink(missing_ok=True)
+            self._segment_path(base, INDEX_SUFFIX).unlink(missing_ok=True)
+            total -= sizes[base]
+
+    def _segment_bases(self):
+        """
+        Returns the base timestamps of the existing segments, oldest first.
+        """
+        if not self.directory.is_dir():
+            return []
+        return sorted(
+            int(path.stem) for path in self.directory.iterdir()
+            if path.suffix == LOG_SUFFIX and path.stem.isdigit()
+        )
+
+    def _segment_path(self, base, suffix=LOG_SUFFIX):
+        return self.directory / f'{base:020d}{suffix}'
+
+    def _seek_position(self, base, since_us):
+        """
+        Returns the log position of the last indexed record before `since_us`.
+
+        Records before it are all older than `since_us`, even when several
+        records share a timestamp.
+        """
+        try:
+            index_data = self._segment_path(base, INDEX_SUFFIX).read_bytes()
+        except FileNotFoundError:
+            return 0
+        usable = len(index_data) - len(index_data) % INDEX_ENTRY.size
+        entries = list(INDEX_ENTRY.iter_unpack(index_data[:usable]))
+        if not entries:
+            return 0
+        timestamps = [entry_timestamp for entry_timestamp, _ in entries]
+        slot = bisect.bisect_left(timestamps, since_us) - 1
+        return entries[slot][1] if slot >= 0 else 0
+
+    def _read_segment(self, base, since_us, until_us, mcu_bytes):
+        """
+        Yields the matching records of one segment, read through mmap.
+        """
+        try:
+            log_file = open(self._segment_path(base), 'rb')
+        except FileNotFoundError:
+            return
+        with log_file:
+            size = os.fstat(log_file.fileno()).st_size
+            if size == 0:
+                return
+            with mmap.mmap(log_file.fileno(), size, access=mmap.ACCESS_READ) as mapped:
+                position = self._seek_position(base, since_us) if since_us else 0
+                header_size = RECORD_HEADER.size
+                while position + header_size <= size:
+                    timestamp_us, command, mcu_length, raw_length = RECORD_HEADER.unpack_from(mapped, position)
+                    mcu_start = position + header_size
+                    raw_start = mcu_start + mcu_length
+                    end = raw_start + raw_length
+                    if end > size:
+                        # A partially written record at the end of the segment
+                        return
+                    if until_us is not None and timestamp_us > until_us:
+                        return
+                    if timestamp_us >= since_us and (
+                            mcu_bytes is None or mapped[mcu_start:raw_start] == mcu_bytes):
+                        yield (
+                            timestamp_us,
+                            mapped[mcu_start:raw_start].decode('utf-8', 'replace'),
+                            command,
+                            mapped[raw_start:end],
+                        )
+                    position = end
+
+
+def _history_log_from_settings():
+    directory = getattr(settings, 'PERIPHERAL_HISTORY_DIR', None)
+    if not directory:
+        return None
+    return SegmentedLog(
+        directory,
+        segment_bytes=getattr(settings, 'PERIPHERAL_HISTORY_SEGMENT_BYTES', 8 * 1024 * 1024),
+        segment_seconds=getattr(settings, 'PERIPHERAL_HISTORY_SEGMENT_SECONDS', 3600),
+        retention_bytes=getattr(settings, 'PERIPHERAL_HISTORY_RETENTION_BYTES', 1024 * 1024 * 1024),
+        retention_seconds=getattr(settings, 'PERIPHERAL_HISTORY_RETENTION_SECONDS', 7 * 24 * 3600),
+        index_interval=getattr(settings, 'PERIPHERAL_HISTORY_INDEX_INTERVAL', 4096),
+        max_pending=getattr(settings, 'PERIPHERAL_HISTORY_QUEUE_SIZE', 10000),
+    )
+
+
+# None when PERIPHERAL_HISTORY_DIR is not set, which disables durable history
+peripheral_history_log = _history_log_from_settings()
@@ -0,0 +1,302 @@
+"""
+Peripheral history shared by every worker process on a host.
+
+`PeripheralStore` lives in process memory, so with several gunicorn/uvicorn
+workers each one only sees the frames it received itself. When
+`PERIPHERAL_SHARED_STORE_PATH` is set, `peripheral_store` is a
+`SharedPeripheralStore` instead: a ring buffer of fixed-size slots in a
+memory-mapped file that all workers append to and read from.
+
+File layout::
+
+    +--------+---------------------------------------------+
+    | header | magic, version, slot count, slot size,      |
+    | 64 B   | last written sequence, cleared-up-to seq    |
+    +--------+---------------------------------------------+
+    | slot 0 | seq u64 | length u32 | type 16s | mcu 8s | rev u32 | JSON entry ... |
+    | slot 1 | ...                                                                  |
+
+Writers serialize on an exclusive `flock` of the file (plus a thread lock,
+since `flock` does not exclude threads sharing a descriptor). A forked
+worker inherits the parent's descriptor, and with it the parent's lock, so
+each process opens its own descriptor on first write. Entry N goes to
+slot ``(N - 1) % slot_count``. A writer zeroes the slot's sequence number
+before rewriting it and stores the new number last, so readers, which take no
+lock, validate a slot by reading its sequence number before and after copying
+it. The slot header carries the peripheral type and a digest of the `mcu_id`,
+so filtered reads only decode the JSON of matching slots, and decoded entries
+are cached per process by sequence number.
+
+An entry is rewritten in place when a repeat of its frame is counted
+(`record_repeat`). The rewrite bumps the slot's revision, which tells readers
+that their cached copy is stale, and that a copy they took meanwhile is torn.
+"""
+import fcntl
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+from contextlib import contextmanager
+
+MAGIC = b'MCLP'
+VERSION = 2
+
+FILE_HEADER = struct.Struct('<4sIIIQQ')
+FILE_HEADER_SIZE = 64
+WRITE_SEQ_OFFSET = 16
+FLOOR_SEQ_OFFSET = 24
+SLOT_HEADER = struct.Struct('<QI16s8sI')
+SEQ = struct.Struct('<Q')
+
+
+# Guards the per-process setup of `SharedPeripheralStore._write_lock`. Replaced
+# in forked children, where the inherited copy may be held by a thread that
+# did not come along.
+_setup_lock = threading.Lock()
+
+
+def _reset_setup_lock():
+    global _setup_lock
+    _setup_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_setup_lock)
+
+
+def _mcu_digest(mcu_id):
+    return hashlib.blake2b(str(mcu_id).encode('utf-8'), digest_size=8).digest()
+
+
+class SharedPeripheralStore:
+    """
+    A `PeripheralStore`-compatible store backed by a shared memory-mapped ring buffer.
+
+    Args:
+        path (str | Path): The backing file. Created if it does not exist; an
+            existing file keeps its own slot geometry.
+        capacity (int): The maximum number of entries returned by `history`
+            and `by_type`.
+        stream_capacity (int): The maximum number of entries returned by
+            `for_device`.
+        slot_count (int): The number of slots in the ring.
+        slot_size (int): The size of a slot in bytes, header included.
+    """
+
+    def __init__(self, path, capacity=50, stream_capacity=50, slot_count=1024, slot_size=4096):
+        self.path = str(path)
+        self.capacity = capacity
+        self.stream_capacity = stream_capacity
+        self._pid = None
+        self._fd = None
+        self._cache = {}
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            header = os.pread(fd, FILE_HEADER.size, 0)
+            if len(header) == FILE_HEADER.size and header[:4] == MAGIC and FILE_HEADER.unpack(header)[1] == VERSION:
+                _, _, slot_count, slot_size, _, _ = FILE_HEADER.unpack(header)
+            else:
+                os.ftruncate(fd, FILE_HEADER_SIZE + slot_count * slot_size)
+                os.pwrite(fd, FILE_HEADER.pack(MAGIC, VERSION, slot_count, slot_size, 0, 0), 0)
+            self.slot_count = slot_count
+            self.slot_size = slot_size
+            # The mapping outlives the descriptor, and stays shared across fork
+            self._map = mmap.mmap(fd, FILE_HEADER_SIZE + slot_count * slot_size)
+        finally:
+            # Unlocked explicitly: mmap keeps a duplicate of the descriptor,
+            # which would otherwise hold the lock
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def append(self, entry):
+        """
+        Records a peripheral communication entry in the shared ring.
+
+        Entries too large for a slot lose their `raw_data` list (the bytes are
+        still available as `hex_data`) and then, if needed, their
+        `configuration` and `hex_data`, and are marked `truncated`.
+
+        Args:
+            entry (dict): The entry to store. Its `seq` is set to the entry's
+                sequence number in the ring.
+
+        Returns:
+            dict: The stored entry.
+        """
+        peripheral_type = entry['peripheral_type'].encode('utf-8')[:16]
+        mcu_digest = _mcu_digest(entry['mcu_id'])
+
+        with self._write_lock():
+            seq = entry['seq'] = SEQ.unpack_from(self._map, WRITE_SEQ_OFFSET)[0] + 1
+            payload = self._encode(entry)
+            offset = self._slot_offset(seq)
+            SEQ.pack_into(self._map, offset, 0)
+            self._map[offset + SLOT_HEADER.size:offset + SLOT_HEADER.size + len(payload)] = payload
+            SLOT_HEADER.pack_into(self._map, offset, seq, len(payload), peripheral_type, mcu_digest, 0)
+            SEQ.pack_into(self._map, WRITE_SEQ_OFFSET, seq)
+        return entry
+
+    def record_repeat(self, entry, timestamp):
+        """
+        Counts a repeat of the frame of a stored entry, for all workers.
+
+        Args:
+            entry (dict): The entry returned by `append`.
+            timestamp (str): The repeated frame's timestamp.
+
+        Returns:
+            dict: The updated entry. Its slot is left alone if the entry was
+            overwritten in the meantime.
+        """
+        with self._write_lock():
+            entry['repeat_count'] += 1
+            entry['last_repeat_timestamp'] = timestamp
+            seq = entry['seq']
+            offset = self._slot_offset(seq)
+            slot_seq, _, slot_type, slot_mcu, revision = SLOT_HEADER.unpack_from(self._map, offset)
+            if slot_seq == seq:
+                payload = self._encode(entry)
+                SEQ.pack_into(self._map, offset, 0)
+                self._map[offset + SLOT_HEADER.size:offset + SLOT_HEADER.size + len(payload)] = payload
+                SLOT_HEADER.pack_into(
+                    self._map, offset, seq, len(payload), slot_type, slot_mcu, (revision + 1) & 0xFFFFFFFF
+                )
+        return entry
+
+    def latest(self):
+        """
+        Returns the most recently stored entry from any worker, or None.
+        """
+        entries = self._collect(1)
+        return entries[0] if entries else None
+
+    def sequence_bounds(self):
+        """
+        Returns `(floor_seq, last_seq)` across all workers.
+        """
+        return (
+            SEQ.unpack_from(self._map, FLOOR_SEQ_OFFSET)[0],
+            SEQ.unpack_from(self._map, WRITE_SEQ_OFFSET)[0],
+        )
+
+    def history(self, after_seq=None, limit=None):
+        """
+        Returns the most recent `capacity` entries in arrival order.
+        """
+        return self._collect(self.capacity, after_seq=after_seq, page=limit)
+
+    def by_type(self, peripheral_type, after_seq=None, limit=None):
+        """
+        Returns the most recent `capacity` entries of one peripheral type.
+        """
+        peripheral_type = peripheral_type.upper().encode('utf-8')[:16]
+        return self._collect(self.capacity, peripheral_type=peripheral_type, after_seq=after_seq, page=limit)
+
+    def for_device(self, mcu_id, peripheral_type=None, after_seq=None, limit=None):
+        """
+        Returns the most recent `stream_capacity` entries for one microcontroller.
+        """
+        if peripheral_type is not None:
+            peripheral_type = peripheral_type.upper().encode('utf-8')[:16]
+        return self._collect(self.stream_capacity, peripheral_type=peripheral_type,
+                             mcu_digest=_mcu_digest(mcu_id), after_seq=after_seq, page=limit)
+
+    def clear(self):
+        """
+        Hides every entry written so far, for all workers.
+        """
+        with self._write_lock():
+            write_seq = SEQ.unpack_from(self._map, WRITE_SEQ_OFFSET)[0]
+            SEQ.pack_into(self._map, FLOOR_SEQ_OFFSET, write_seq)
+        self._cache.clear()
+
+    @contextmanager
+    def _write_lock(self):
+        """
+        Excludes the other writers, in this process and in the others.
+        """
+        if self._pid != os.getpid():
+            with _setup_lock:
+                if self._pid != os.getpid():
+                    # First write in this process: its own descriptor, so that
+                    # its flock excludes the other processes', and a fresh
+                    # thread lock
+                    self._thread_lock = threading.Lock()
+                    self._fd = os.open(self.path, os.O_RDWR)
+                    self._cache = {}
+                    self._pid = os.getpid()
+        with self._thread_lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _encode(self, entry):
+        limit = self.slot_size - SLOT_HEADER.size
+        payload = json.dumps(entry, default=str, separators=(',', ':')).encode('utf-8')
+        for dropped in ('raw_data', 'configuration', 'hex_data'):
+            if len(payload) <= limit:
+                break
+            entry = {key: value for key, value in entry.items() if key != dropped}
+            entry['truncated'] = True
+            payload = json.dumps(entry, default=str, separators=(',', ':')).encode('utf-8')
+        if len(payload) > limit:
+            raise ValueError(f'Peripheral entry does not fit in a {self.slot_size}-byte slot')
+        return payload
+
+    def _slot_offset(self, seq):
+        return FILE_HEADER_SIZE + ((seq - 1) % self.slot_count) * self.slot_size
+
+    def _collect(self, limit, peripheral_type=None, mcu_digest=None, after_seq=None, page=None):
+        """
+        Walks the ring from the newest entry backwards and returns up to
+        `limit` matching entries, oldest first, narrowed to a `page` as
+        described in `store.select_entries`.
+        """
+        write_seq = SEQ.unpack_from(self._map, WRITE_SEQ_OFFSET)[0]
+        floor_seq = SEQ.unpack_from(self._map, FLOOR_SEQ_OFFSET)[0]
+        oldest = max(floor_seq + 1, write_seq - self.slot_count + 1, 1)
+        if after_seq is not None:
+            oldest = max(oldest, after_seq + 1)
+        elif page is not None:
+            limit = min(limit, page)
+
+        entries = []
+        for seq in range(write_seq, oldest - 1, -1):
+            offset = self._slot_offset(seq)
+            slot_seq, length, slot_type, slot_mcu, revision = SLOT_HEADER.unpack_from(self._map, offset)
+            if slot_seq != seq:
+                # Being rewritten, or already overwritten by a newer entry
+                continue
+            if peripheral_type is not None and slot_type.rstrip(b'\0') != peripheral_type:
+                continue
+            if mcu_digest is not None and slot_mcu != mcu_digest:
+                continue
+            cached = self._cache.get(seq)
+            if cached is not None and cached[0] == revision:
+                entry = cached[1]
+            else:
+                start = offset + SLOT_HEADER.size
+                payload = self._map[start:start + length]
+                check = SLOT_HEADER.unpack_from(self._map, offset)
+                if (check[0], check[4]) != (seq, revision):
+                    # Rewritten while it was being copied
+                    continue
+                entry = json.loads(payload)
+                self._cache[seq] = (revision, entry)
+            entries.append(entry)
+            if len(entries) >= limit:
+                break
+
+        if len(self._cache) > 2 * self.slot_count:
+            for stale in [cached for cached in list(self._cache) if cached < oldest]:
+                self._cache.pop(stale, None)
+
+        entries.reverse()
+        if after_seq is not None and page is not None:
+            return entries[:page]
+        return entries
@@ -0,0 +1,253 @@
+"""
+In-process storage for received peripheral traffic.
+
+Every frame accepted by `peripheral_send` is recorded in a `PeripheralStore`.
+The store keeps fixed-capacity ring buffers so that appending a frame never
+copies the existing history, and it maintains secondary indexes so that the
+viewer endpoints can answer "last N frames of type X" or "last N frames for
+MCU Y" without scanning every stored entry.
+
+Each stored entry is stamped with a `seq` number that increases with every
+append, so pollers can ask for the entries after the last one they have
+(`after_seq`) and tell from `sequence_bounds()` whether anything changed.
+"""
+import heapq
+import threading
+from collections import OrderedDict, deque
+
+from django.conf import settings
+
+
+class PeripheralStore:
+    """
+    A thread-safe store of peripheral communications.
+
+    Entries are kept in three kinds of ring buffers, all backed by
+    `collections.deque(maxlen=...)` so appends are O(1) and the oldest entry is
+    dropped automatically once a buffer is full:
+
+    * a global history of the most recent entries, in arrival order;
+    * one buffer per peripheral type (the secondary index by type);
+    * one buffer per `(mcu_id, peripheral_type)` stream.
+
+    The number of per-device streams is bounded as well; when the limit is
+    reached the least recently written stream is evicted. A small index from
+    `mcu_id` to its peripheral types lets a device's streams be found without
+    walking every stream.
+
+    Args:
+        capacity (int): The maximum number of entries kept in the global
+            history and in each per-type buffer.
+        stream_capacity (int): The maximum number of entries kept for each
+            `(mcu_id, peripheral_type)` stream.
+        max_streams (int): The maximum number of device streams tracked.
+    """
+
+    def __init__(self, capacity=50, stream_capacity=50, max_streams=1024):
+        self.capacity = capacity
+        self.stream_capacity = stream_capacity
+        self.max_streams = max_streams
+        self._lock = threading.Lock()
+        self._history = deque(maxlen=capacity)
+        self._by_type = {}
+        self._streams = OrderedDict()
+        self._device_types = {}
+        self._seq = 0
+        self._floor_seq = 0
+        self._last = None
+
+    def append(self, entry):
+        """
+        Records a peripheral communication entry.
+
+        Args:
+            entry (dict): The entry to store. It must contain upper-cased
+                `peripheral_type` and `mcu_id` keys. Its `seq` is set.
+
+        Returns:
+            dict: The stored entry.
+        """
+        peripheral_type = entry['peripheral_type']
+        stream_key = (entry['mcu_id'], peripheral_type)
+
+        with self._lock:
+            self._seq += 1
+            entry['seq'] = self._seq
+            self._last = entry
+            self._history.append(entry)
+
+            by_type = self._by_type.get(peripheral_type)
+            if by_type is None:
+                by_type = self._by_type[peripheral_type] = deque(maxlen=self.capacity)
+            by_type.append(entry)
+
+            stream = self._streams.get(stream_key)
+            if stream is None:
+                if len(self._streams) >= self.max_streams:
+                    (evicted_mcu_id, evicted_type), _ = self._streams.popitem(last=False)
+                    evicted_types = self._device_types[evicted_mcu_id]
+                    evicted_types.discard(evicted_type)
+                    if not evicted_types:
+                        del self._device_types[evicted_mcu_id]
+                stream = self._streams[stream_key] = deque(maxlen=self.stream_capacity)
+                self._device_types.setdefault(entry['mcu_id'], set()).add(peripheral_type)
+            else:
+                self._streams.move_to_end(stream_key)
+            stream.append(entry)
+
+        return entry
+
+    def record_repeat(self, entry, timestamp):
+        """
+        Counts a repeat of the frame of a stored entry.
+
+        Args:
+            entry (dict): The entry returned by `append`.
+            timestamp (str): The repeated frame's timestamp.
+
+        Returns:
+            dict: The updated entry.
+        """
+        with self._lock:
+            entry['repeat_count'] += 1
+            entry['last_repeat_timestamp'] = timestamp
+        return entry
+
+    def latest(self):
+        """
+        Returns the most recently stored entry, or None if nothing was stored.
+        """
+        return self._last
+
+    def sequence_bounds(self):
+        """
+        Returns `(floor_seq, last_seq)`: the `seq` up to which entries were
+        cleared and the `seq` of the newest entry. Either changes whenever
+        the stored history does.
+        """
+        with self._lock:
+            return self._floor_seq, self._seq
+
+    def history(self, after_seq=None, limit=None):
+        """
+        Returns the stored history in arrival order.
+
+        Args:
+            after_seq (int, optional): Only return entries with a greater `seq`.
+            limit (int, optional): The maximum number of entries returned; see
+                `select_entries`.
+
+        Returns:
+            list: A snapshot of the global history buffer.
+        """
+        with self._lock:
+            return select_entries(self._history, after_seq, limit)
+
+    def by_type(self, peripheral_type, after_seq=None, limit=None):
+        """
+        Returns the stored entries for a single peripheral type.
+
+        Args:
+            peripheral_type (str): The peripheral type (case-insensitive).
+            after_seq (int, optional): Only return entries with a greater `seq`.
+            limit (int, optional): The maximum number of entries returned.
+
+        Returns:
+            list: A snapshot of the per-type buffer, in arrival order.
+        """
+        with self._lock:
+            return select_entries(self._by_type.get(peripheral_type.upper(), ()), after_seq, limit)
+
+    def for_device(self, mcu_id, peripheral_type=None, after_seq=None, limit=None):
+        """
+        Returns the stored entries for a single microcontroller.
+
+        Args:
+            mcu_id (str): The identifier of the microcontroller.
+            peripheral_type (str, optional): Restricts the result to a single
+                peripheral type. When omitted, all of the device's streams are
+                merged in arrival order.
+            after_seq (int, optional): Only return entries with a greater `seq`.
+            limit (int, optional): The maximum number of entries returned.
+
+        Returns:
+            list: The matching entries, in arrival order.
+        """
+        with self._lock:
+            if peripheral_type is not None:
+                types = (peripheral_type.upper(),)
+            else:
+                types = self._device_types.get(mcu_id, ())
+            streams = [
+                select_entries(self._streams[(mcu_id, stream_type)], after_seq)
+                for stream_type in types
+                if (mcu_id, stream_type) in self._streams
+            ]
+        merged = list(heapq.merge(*streams, key=lambda entry: entry['seq']))
+        return select_entries(merged, None, limit) if after_seq is None else merged[:limit]
+
+    def clear(self):
+        """
+        Removes every stored entry.
+        """
+        with self._lock:
+            self._history.clear()
+            self._by_type.clear()
+            self._streams.clear()
+            self._device_types.clear()
+            self._floor_seq = self._seq
+            self._last = None
+
+
+def select_entries(entries, after_seq=None, limit=None):
+    """
+    Selects a page of entries from a buffer ordered by `seq`.
+
+    With `after_seq`, the buffer is only walked back to the first entry the
+    caller already has, and the `limit` oldest new entries are returned, so a
+    client can page forward from its cursor. Without it, the `limit` most
+    recent entries are returned.
+
+    Args:
+        entries (Sequence): Entries in increasing `seq` order.
+        after_seq (int, optional): The `seq` of the last entry the caller has.
+        limit (int, optional): The maximum number of entries returned.
+
+    Returns:
+        list: The selected entries, in arrival order.
+    """
+    if after_seq is None:
+        selected = list(entries)
+        return selected[max(len(selected) - limit, 0):] if limit is not None else selected
+    selected = []
+    for entry in reversed(entries):
+        if entry['seq'] <= after_seq:
+            break
+        selected.append(entry)
+    selected.reverse()
+    return selected[:limit] if limit is not None else selected
+
+
+def _store_from_settings():
+    capacity = getattr(settings, 'PERIPHERAL_HISTORY_CAPACITY', 50)
+    stream_capacity = getattr(settings, 'PERIPHERAL_STREAM_CAPACITY', 50)
+    shared_path = getattr(settings, 'PERIPHERAL_SHARED_STORE_PATH', None)
+    if shared_path:
+        from .shared import SharedPeripheralStore
+        return SharedPeripheralStore(
+            shared_path,
+            capacity=capacity,
+            stream_capacity=stream_capacity,
+            slot_count=getattr(settings, 'PERIPHERAL_SHARED_STORE_SLOTS', 1024),
+            slot_size=getattr(settings, 'PERIPHERAL_SHARED_STORE_SLOT_SIZE', 4096),
+        )
+    return PeripheralStore(
+        capacity=capacity,
+        stream_capacity=stream_capacity,
+        max_streams=getattr(settings, 'PERIPHERAL_MAX_STREAMS', 1024),
+    )
+
+
+# A SharedPeripheralStore when PERIPHERAL_SHARED_STORE_PATH is set, so that all
+# worker processes on the host see the same traffic
+peripheral_store = _store_from_settings()
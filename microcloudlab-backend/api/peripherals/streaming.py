@@ -0,0 +1,144 @@
+"""
+Live fan-out of accepted peripheral frames to streaming subscribers.
+
+`ingest_frame` publishes every accepted frame to `peripheral_hub`. Each
+subscriber (one per open `peripheral/stream/` connection) registers the
+`mcu_id` and `peripheral_type` it is interested in, and receives matching
+frames through its own bounded queue. When a subscriber falls behind, the
+oldest queued frames are dropped instead of the publisher being slowed down.
+
+Publishing happens on request threads while subscribers are served by the
+ASGI event loop, so the hand-off goes through `loop.call_soon_threadsafe`.
+"""
+import asyncio
+import json
+import threading
+from collections import deque
+
+
+class Subscription:
+    """
+    A single subscriber's bounded queue of serialized frames.
+
+    Args:
+        mcu_id (str, optional): Only frames for this MCU are delivered.
+        peripheral_type (str, optional): Only frames of this type are delivered.
+        maxsize (int): The number of frames buffered before the oldest one is
+            dropped.
+    """
+
+    def __init__(self, mcu_id=None, peripheral_type=None, maxsize=100):
+        self.mcu_id = mcu_id
+        self.peripheral_type = peripheral_type.upper() if peripheral_type else None
+        self.dropped = 0
+        self._queue = deque(maxlen=maxsize)
+        self._loop = asyncio.get_running_loop()
+        self._ready = asyncio.Event()
+
+    @property
+    def key(self):
+        """The `(mcu_id, peripheral_type)` filter, None meaning any."""
+        return (self.mcu_id, self.peripheral_type)
+
+    def push(self, payload):
+        """
+        Queues a serialized frame. Safe to call from any thread.
+
+        Args:
+            payload (str): The JSON-encoded frame.
+        """
+        if len(self._queue) == self._queue.maxlen:
+            self.dropped += 1
+        self._queue.append(payload)
+        if not self._ready.is_set():
+            try:
+                self._loop.call_soon_threadsafe(self._ready.set)
+            except RuntimeError:
+                # The subscriber's event loop has already been closed
+                pass
+
+    async def drain(self):
+        """
+        Waits for frames and returns everything queued so far.
+
+        Returns:
+            list: The serialized frames, oldest first.
+        """
+        await self._ready.wait()
+        self._ready.clear()
+        payloads = []
+        while self._queue:
+            payloads.append(self._queue.popleft())
+        return payloads
+
+
+class SubscriptionHub:
+    """
+    Registry of active subscriptions, indexed by their filter.
+
+    Publishing a frame looks up the four filters that can match it
+    (exact, any type, any MCU, everything) instead of testing every
+    subscription, and serializes the frame only once.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+
+    def subscribe(self, mcu_id=None, peripheral_type=None, maxsize=100):
+        """
+        Registers a new subscription. Must be called from the event loop
+        that will consume it.
+
+        Returns:
+            Subscription: The new subscription.
+        """
+        subscription = Subscription(mcu_id, peripheral_type, maxsize)
+        with self._lock:
+            self._subscriptions.setdefault(subscription.key, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """
+        Removes a subscription; it receives no further frames.
+        """
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.key)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.key]
+
+    def publish(self, entry):
+        """
+        Delivers a stored peripheral entry to every matching subscription.
+
+        Args:
+            entry (dict): The entry produced by `ingest_frame`.
+
+        Returns:
+            int: The number of subscriptions the entry was delivered to.
+        """
+        if not self._subscriptions:
+            return 0
+        mcu_id = entry['mcu_id']
+        peripheral_type = entry['peripheral_type']
+        with self._lock:
+            targets = [
+                subscription
+                for key in ((mcu_id, peripheral_type), (mcu_id, None), (None, peripheral_type), (None, None))
+                for subscription in self._subscriptions.get(key, ())
+            ]
+        if not targets:
+            return 0
+        payload = json.dumps(entry, default=str)
+        for subscription in targets:
+            subscription.push(payload)
+        return len(targets)
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+
+peripheral_hub = SubscriptionHub()
@@ -0,0 +1,182 @@
+"""
+Per-device backpressure on the peripheral ingestion endpoints.
+
+`peripheral_limiter` holds one token bucket per `(mcu_id, peripheral_type)`.
+Every frame takes a token; tokens are refilled continuously at
+`refill_rate` per second up to `burst`. A device that runs out is throttled
+on its own, so one misbehaving board or frontend loop cannot starve the rest
+of the fleet.
+
+Buckets are spread over independently locked stripes, so requests for
+different devices rarely wait on each other, and idle buckets (which would be
+full again anyway) are discarded once a stripe grows past its share of
+`max_keys`.
+"""
+import threading
+import time
+
+from django.conf import settings
+from rest_framework.throttling import BaseThrottle
+
+from .frames import COMMAND_NAMES
+
+# Bucket fields: tokens left, time of the last update, frames throttled
+TOKENS, UPDATED, THROTTLED = range(3)
+
+
+class TokenBucketLimiter:
+    """
+    A thread-safe set of token buckets keyed by `(mcu_id, peripheral_type)`.
+
+    Args:
+        burst (int): The number of frames a device may send back to back.
+        refill_rate (float): The number of tokens regained per second.
+        max_keys (int): The approximate number of buckets kept in memory.
+        stripes (int): The number of independently locked bucket tables.
+        clock (Callable): Returns the current time in seconds.
+    """
+
+    def __init__(self, burst=20, refill_rate=10.0, max_keys=10000, stripes=16, clock=time.monotonic):
+        self.burst = burst
+        self.refill_rate = refill_rate
+        self._clock = clock
+        self._stripe_keys = max(1, max_keys // stripes)
+        # Each stripe is a lock, its buckets and its [allowed, throttled] totals
+        self._stripes = [(threading.Lock(), {}, [0, 0]) for _ in range(stripes)]
+
+    def acquire(self, key):
+        """
+        Takes a token from the bucket of `key`.
+
+        Args:
+            key (tuple): The `(mcu_id, peripheral_type)` of the frame.
+
+        Returns:
+            float: 0 if the frame is allowed, otherwise the number of seconds
+            until the bucket holds a token again.
+        """
+        now = self._clock()
+        lock, buckets, totals = self._stripes[hash(key) % len(self._stripes)]
+        with lock:
+            bucket = buckets.get(key)
+            if bucket is None:
+                if len(buckets) >= self._stripe_keys:
+                    self._prune(buckets, now)
+                bucket = buckets[key] = [self.burst, now, 0]
+            tokens = min(self.burst, bucket[TOKENS] + (now - bucket[UPDATED]) * self.refill_rate)
+            bucket[UPDATED] = now
+            if tokens >= 1:
+                bucket[TOKENS] = tokens - 1
+                totals[0] += 1
+                return 0.0
+            bucket[TOKENS] = tokens
+            bucket[THROTTLED] += 1
+            totals[1] += 1
+            return (1 - tokens) / self.refill_rate
+
+    def stats(self, top=10):
+        """
+        Returns the limiter's configuration and throttling counters.
+
+        Args:
+            top (int): The number of most throttled devices listed.
+
+        Returns:
+            dict: The `burst` and `refill_rate`, the `allowed` and `throttled`
+            frame totals, and the `top_throttled` devices with their counts.
+        """
+        allowed = throttled = 0
+        devices = []
+        for lock, buckets, totals in self._stripes:
+            with lock:
+                allowed += totals[0]
+                throttled += totals[1]
+                devices.extend(
+                    (bucket[THROTTLED], key) for key, bucket in buckets.items() if bucket[THROTTLED]
+                )
+        devices.sort(key=lambda device: device[0], reverse=True)
+        return {
+            'burst': self.burst,
+            'refill_rate': self.refill_rate,
+            'allowed': allowed,
+            'throttled': throttled,
+            'top_throttled': [
+                {'mcu_id': mcu_id, 'peripheral_type': peripheral_type, 'throttled': count}
+                for count, (mcu_id, peripheral_type) in devices[:top]
+            ],
+        }
+
+    def clear(self):
+        """
+        Refills every bucket and resets the counters.
+        """
+        for lock, buckets, totals in self._stripes:
+            with lock:
+                buckets.clear()
+                totals[:] = [0, 0]
+
+    def _prune(self, buckets, now):
+        """
+        Drops the buckets that have refilled completely, or the least
+        recently used one if none has.
+        """
+        idle = self.burst / self.refill_rate
+        stale = [key for key, bucket in buckets.items() if now - bucket[UPDATED] >= idle]
+        if not stale:
+            stale = [min(buckets, key=lambda key: buckets[key][UPDATED])]
+        for key in stale:
+            del buckets[key]
+
+
+def request_rate_key(request):
+    """
+    Returns the `(mcu_id, peripheral_type)` a `peripheral_send` request is
+    for, or None if the request does not look like a frame.
+    """
+    data = request.data
+    if isinstance(data, bytes):
+        if len(data) < 2:
+            return None
+        return (request.query_params.get('mcu_id', 'unknown'), COMMAND_NAMES.get(data[1], 'UNKNOWN'))
+    if not hasattr(data, 'get'):
+        return None
+    return (str(data.get('mcu_id', 'unknown')), str(data.get('peripheral_type', 'unknown')).upper())
+
+
+class PeripheralRateThrottle(BaseThrottle):
+    """
+    Applies `peripheral_limiter` to single-frame endpoints.
+
+    A throttled request gets a 429 response whose `Retry-After` header says
+    when the device's bucket will hold a token again.
+    """
+
+    def __init__(self):
+        self.retry_after = None
+
+    def allow_request(self, request, view):
+        if peripheral_limiter is None:
+            return True
+        key = request_rate_key(request)
+        if key is None:
+            return True
+        self.retry_after = peripheral_limiter.acquire(key)
+        return not self.retry_after
+
+    def wait(self):
+        return self.retry_after
+
+
+def _limiter_from_settings():
+    rate_limit = getattr(settings, 'PERIPHERAL_RATE_LIMIT', None)
+    if not rate_limit:
+        return None
+    return TokenBucketLimiter(
+        burst=rate_limit.get('burst', 20),
+        refill_rate=rate_limit.get('refill_rate', 10.0),
+        max_keys=getattr(settings, 'PERIPHERAL_RATE_LIMIT_MAX_KEYS', 10000),
+    )
+
+
+# None when PERIPHERAL_RATE_LIMIT is not set, which disables throttling
+peripheral_limiter = _limiter_from_settings()
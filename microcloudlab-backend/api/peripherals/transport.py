@@ -0,0 +1,458 @@
+"""
+Delivery of accepted peripheral frames to the boards.
+
+`ingest_frame` hands every new frame to `device_dispatcher`, which looks up
+the route of its `mcu_id` in `PERIPHERAL_DEVICE_ROUTES` and queues the frame
+on that device's channel. Routes are URLs naming a transport::
+
+    PERIPHERAL_DEVICE_ROUTES = {
+        'esp32-lab-1': 'tcp://10.0.0.21:3333',
+        'stm32-bench': 'serial:///dev/ttyUSB0?baudrate=115200',
+        '*': 'loopback://',  # any other device
+    }
+
+All device I/O runs on a single asyncio event loop in a background thread, so
+request threads only pay for a `call_soon_threadsafe`. Each device has one
+channel: a bounded queue of frames and a task that keeps a persistent
+connection open, writes whatever frames have accumulated in one go and waits
+for the transport to drain before writing more. Frames for one device are
+therefore written in order, and a slow or unreachable board only delays its
+own queue. When a connection fails, the unwritten frames are put back and the
+channel reconnects with exponential backoff.
+"""
+import asyncio
+import os
+import termios
+import threading
+import tty
+from collections import deque
+from urllib.parse import parse_qs, urlsplit
+
+from django.conf import settings
+
+
+class TcpTransport:
+    """
+    Connects to a device (or a bridge in front of it) over TCP.
+
+    Args:
+        host (str): The host name or address.
+        port (int): The TCP port.
+    """
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+
+    async def connect(self):
+        """
+        Opens the connection.
+
+        Returns:
+            tuple: The `(StreamReader, StreamWriter)` pair; the reader is
+            None for write-only transports.
+        """
+        return await asyncio.open_connection(self.host, self.port)
+
+    def __str__(self):
+        return f'tcp://{self.host}:{self.port}'
+
+
+class _WritePipeProtocol(asyncio.streams.FlowControlMixin):
+    """
+    The protocol behind a write-only `StreamWriter`.
+
+    `FlowControlMixin` provides `drain`; this adds what `StreamWriter.wait_closed`
+    needs.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._closed = asyncio.get_running_loop().create_future()
+
+    def connection_lost(self, exc):
+        super().connection_lost(exc)
+        if not self._closed.done():
+            self._closed.set_result(None)
+
+    def _get_close_waiter(self, stream):
+        return self._closed
+
+
+class SerialTransport:
+    """
+    Writes to a serial port or pseudo-terminal.
+
+    The device is switched to raw mode, so frames are written byte for byte.
+
+    Args:
+        path (str): The device path, e.g. ``/dev/ttyUSB0``.
+        baudrate (int, optional): The line speed. Left unchanged if omitted.
+    """
+
+    def __init__(self, path, baudrate=None):
+        self.path = path
+        self.baudrate = baudrate
+
+    async def connect(self):
+        loop = asyncio.get_running_loop()
+        fd = os.open(self.path, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+        try:
+            self._configure(fd)
+            pipe = os.fdopen(fd, 'wb', buffering=0)
+        except Exception:
+            os.close(fd)
+            raise
+        transport, protocol = await loop.connect_write_pipe(_WritePipeProtocol, pipe)
+        return None, asyncio.StreamWriter(transport, protocol, None, loop)
+
+    def _configure(self, fd):
+        if not os.isatty(fd):
+            return
+        tty.setraw(fd)
+        if self.baudrate:
+            speed = getattr(termios, f'B{self.baudrate}')
+            attributes = termios.tcgetattr(fd)
+            attributes[4] = attributes[5] = speed
+            termios.tcsetattr(fd, termios.TCSANOW, attributes)
+
+    def __str__(self):
+        return f'serial://{self.path}'
+
+
+class LoopbackTransport:
+    """
+    Delivers frames to a TCP echo server on 127.0.0.1 instead of a board.
+
+    Stands in for a board during development and tests: frames take the same
+    path as with `TcpTransport` (batched writes, drain, replies read back),
+    but to a server started on the dispatcher's event loop on first connect,
+    which sends every byte back. All devices routed to one loopback share its
+    server.
+
+    Args:
+        keep (int): The number of most recently received bytes kept in
+            `received`; `received_bytes` counts all of them.
+    """
+
+    def __init__(self, keep=64 * 1024):
+        self.keep = keep
+        self.received = bytearray()
+        self.received_bytes = 0
+        self.connections = 0
+        self._server = None
+        self._clients = set()
+
+    async def connect(self):
+        if self._server is None:
+            self._server = await asyncio.start_server(self._echo, '127.0.0.1', 0)
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return await asyncio.open_connection(host, port)
+
+    async def hang_up(self):
+        """
+        Closes the server side of every connection, as a rebooting board would.
+        """
+        for writer in list(self._clients):
+            writer.close()
+
+    async def close(self):
+        """
+        Stops the echo server.
+        """
+        await self.hang_up()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _echo(self, reader, writer):
+        self.connections += 1
+        self._clients.add(writer)
+        try:
+            while True:
+                data = await reader.read(4096)
+                if not data:
+                    break
+                self.received_bytes += len(data)
+                self.received += data
+                if len(self.received) > self.keep:
+                    del self.received[:len(self.received) - self.keep]
+                writer.write(data)
+                await writer.drain()
+        except (OSError, ConnectionError):
+            pass
+        finally:
+            self._clients.discard(writer)
+            writer.close()
+
+    def __str__(self):
+        return 'loopback://'
+
+
+def transport_from_url(url):
+    """
+    Builds the transport described by a route URL.
+
+    Args:
+        url (str): ``tcp://host:port``, ``serial:///dev/path?baudrate=N``
+            or ``loopback://``.
+
+    Returns:
+        The transport.
+
+    Raises:
+        ValueError: If the URL scheme is not supported or the URL is incomplete.
+    """
+    parts = urlsplit(url)
+    if parts.scheme == 'tcp':
+        if not parts.hostname or not parts.port:
+            raise ValueError(f'TCP route needs a host and a port: {url}')
+        return TcpTransport(parts.hostname, parts.port)
+    if parts.scheme == 'serial':
+        baudrate = parse_qs(parts.query).get('baudrate')
+        return SerialTransport(parts.path, int(baudrate[0]) if baudrate else None)
+    if parts.scheme == 'loopback':
+        return LoopbackTransport()
+    raise ValueError(f'Unsupported device route: {url}')
+
+
+class DeviceChannel:
+    """
+    The ordered frame queue and connection of one device.
+
+    Only used from the dispatcher's event loop.
+
+    Args:
+        mcu_id (str): The device identifier.
+        transport: The transport used to reach the device.
+        maxsize (int): The number of frames queued before the oldest is
+            dropped.
+        max_backoff (float): The longest wait between reconnection attempts,
+            in seconds.
+        min_backoff (float): The wait before the first reconnection attempt.
+    """
+
+    def __init__(self, mcu_id, transport, maxsize=1000, max_backoff=30.0, min_backoff=0.5):
+        self.mcu_id = mcu_id
+        self.transport = transport
+        self.max_backoff = max_backoff
+        self.min_backoff = min_backoff
+        self.sent = 0
+        self.received = 0
+        self.dropped = 0
+        self.errors = 0
+        self.connected = False
+        self._pending = deque(maxlen=maxsize)
+        self._ready = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def put(self, frame):
+        if len(self._pending) == self._pending.maxlen:
+            self.dropped += 1
+        self._pending.append(frame)
+        self._ready.set()
+
+    def stats(self):
+        return {
+            'mcu_id': self.mcu_id,
+            'route': str(self.transport),
+            'connected': self.connected,
+            'queued': len(self._pending),
+            'sent': self.sent,
+            'received': self.received,
+            'dropped': self.dropped,
+            'errors': self.errors,
+        }
+
+    async def close(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    async def _run(self):
+        backoff = self.min_backoff
+        while True:
+            await self._ready.wait()
+            try:
+                reader, writer = await self.transport.connect()
+            except (OSError, ValueError):
+                self.errors += 1
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+                continue
+            backoff = self.min_backoff
+            self.connected = True
+            discard = asyncio.ensure_future(self._discard_replies(reader, writer)) if reader is not None else None
+            try:
+                await self._write_pending(writer)
+            except (OSError, ConnectionError):
+                self.errors += 1
+            finally:
+                self.connected = False
+                if discard is not None:
+                    discard.cancel()
+                writer.close()
+                try:
+                    await writer.wait_closed()
+                except (OSError, ConnectionError):
+                    pass
+
+    async def _write_pending(self, writer):
+        """
+        Writes queued frames until the connection fails.
+
+        Everything queued since the last write goes out in a single
+        `writelines`; the frames are only forgotten once the transport has
+        drained them, and are put back at the head of the queue otherwise.
+        """
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            if writer.is_closing():
+                if self._pending:
+                    # Reconnect for the queued frames without waiting for another
+                    self._ready.set()
+                raise ConnectionResetError(f'Connection to {self.transport} closed')
+            batch = list(self._pending)
+            self._pending.clear()
+            if not batch:
+                continue
+            try:
+                writer.writelines(batch)
+                await writer.drain()
+            except BaseException:
+                self._pending.extendleft(reversed(batch))
+                self._ready.set()
+                raise
+            self.sent += len(batch)
+
+    async def _discard_replies(self, reader, writer):
+        # Nothing consumes device replies yet; read them so the device is
+        # never blocked on a full socket buffer, and notice when it hangs up
+        while True:
+            try:
+                data = await reader.read(4096)
+            except (OSError, ConnectionError):
+                data = b''
+            if not data:
+                writer.close()
+                self._ready.set()
+                return
+            self.received += len(data)
+
+
+class DeviceDispatcher:
+    """
+    Routes frames to per-device channels on a background event loop.
+
+    Args:
+        routes (dict): Maps an `mcu_id` (or ``'*'`` for any other device) to
+            a route URL, see `transport_from_url`.
+        queue_size (int): The number of frames queued per device.
+        max_backoff (float): The longest wait between reconnection attempts.
+        min_backoff (float): The wait before the first reconnection attempt.
+    """
+
+    def __init__(self, routes, queue_size=1000, max_backoff=30.0, min_backoff=0.5):
+        self.queue_size = queue_size
+        self.max_backoff = max_backoff
+        self.min_backoff = min_backoff
+        self._routes = {mcu_id: transport_from_url(url) for mcu_id, url in routes.items()}
+        self._default = self._routes.pop('*', None)
+        self._channels = {}
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+
+    def route(self, mcu_id):
+        """
+        Returns the transport of a device, or None if it has no route.
+        """
+        return self._routes.get(mcu_id, self._default)
+
+    def dispatch(self, mcu_id, raw_bytes):
+        """
+        Queues a frame for delivery to its device. Safe to call from any thread.
+
+        Args:
+            mcu_id (str): The target device.
+            raw_bytes (bytes | memoryview): The frame.
+
+        Returns:
+            bool: Whether the device has a route and the frame was queued.
+        """
+        transport = self.route(mcu_id)
+        if transport is None:
+            return False
+        self._ensure_loop().call_soon_threadsafe(self._enqueue, mcu_id, transport, bytes(raw_bytes))
+        return True
+
+    def stats(self):
+        """
+        Returns the counters of every device channel.
+        """
+        if self._loop is None:
+            return []
+        future = asyncio.run_coroutine_threadsafe(self._stats(), self._loop)
+        return future.result(timeout=5)
+
+    def close(self):
+        """
+        Closes every connection and stops the background loop.
+        """
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._close_channels(), loop).result(timeout=5)
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join(timeout=5)
+        loop.close()
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name='peripheral-dispatcher', daemon=True
+                )
+                self._thread.start()
+            return self._loop
+
+    def _enqueue(self, mcu_id, transport, frame):
+        channel = self._channels.get(mcu_id)
+        if channel is None:
+            channel = self._channels[mcu_id] = DeviceChannel(
+                mcu_id, transport, self.queue_size, self.max_backoff, self.min_backoff
+            )
+        channel.put(frame)
+
+    async def _stats(self):
+        return [channel.stats() for channel in self._channels.values()]
+
+    async def _close_channels(self):
+        channels, self._channels = list(self._channels.values()), {}
+        for channel in channels:
+            await channel.close()
+        # The loopback's echo server lives on this loop
+        for transport in {*self._routes.values(), self._default}:
+            if isinstance(transport, LoopbackTransport):
+                await transport.close()
+
+
+def _dispatcher_from_settings():
+    routes = getattr(settings, 'PERIPHERAL_DEVICE_ROUTES', None)
+    if not routes:
+        return None
+    return DeviceDispatcher(
+        routes,
+        queue_size=getattr(settings, 'PERIPHERAL_DISPATCH_QUEUE_SIZE', 1000),
+        max_backoff=getattr(settings, 'PERIPHERAL_DISPATCH_MAX_BACKOFF', 30.0),
+    )
+
+
+# None when PERIPHERAL_DEVICE_ROUTES is empty, which keeps frames on the server
+device_dispatcher = _dispatcher_from_settings()
@@ -0,0 +1,170 @@
+"""
+Query planning for viewsets with nested serializers.
+
+Nested serializers read related objects one attribute access at a time, so
+serializing a list of N objects issues a query per object and per relation
+unless the queryset joins or prefetches them up front. `plan_serializer` walks
+a serializer's fields (including the ones generated by `Meta.depth`) and works
+out which relations need `select_related` and which need `prefetch_related`,
+and which columns are read at all; `QueryPlanningMixin` applies that plan to
+a viewset's queryset.
+"""
+from collections import namedtuple
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.relations import ManyRelatedField, RelatedField
+from rest_framework.serializers import BaseSerializer, ListSerializer
+
+QueryPlan = namedtuple('QueryPlan', ['select_related', 'prefetch_related', 'only'])
+QueryPlan.__doc__ = """
+The relations and columns a serializer reads.
+
+Attributes:
+    select_related (tuple): Paths of the to-one relations to join.
+    prefetch_related (tuple): Paths of the relations to prefetch.
+    only (tuple | None): The joined columns read, as `.only()` paths, or
+        None if the serializer reads something that is not a model field.
+"""
+
+
+def _walk(serializer, prefix, in_prefetch, plan):
+    """
+    Collects the relation paths and columns read by `serializer` and its
+    nested serializers.
+
+    Relations reached through a to-many relation can no longer be joined, so
+    everything below one is prefetched as well.
+    """
+    model = serializer.Meta.model
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if field.source == '*' or '.' in field.source:
+            plan['only'] = None
+            continue
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            plan['only'] = None
+            continue
+        path = prefix + field.source
+        if not model_field.is_relation:
+            if not in_prefetch and plan['only'] is not None:
+                plan['only'].append(path)
+            continue
+
+        if isinstance(field, ListSerializer):
+            nested = field.child
+        elif isinstance(field, BaseSerializer):
+            nested = field
+        elif isinstance(field, ManyRelatedField):
+            nested = None
+        elif isinstance(field, RelatedField):
+            # A primary key read from the local `<name>_id` column
+            if not in_prefetch and plan['only'] is not None and model_field.concrete:
+                plan['only'].append(path)
+            continue
+        else:
+            continue
+
+        many = model_field.many_to_many or model_field.one_to_many
+        if many or in_prefetch:
+            plan['prefetch_related'].append(path)
+        else:
+            plan['select_related'].append(path)
+            if plan['only'] is not None and model_field.concrete:
+                plan['only'].append(path)
+        if nested is not None:
+            _walk(nested, path + '__', in_prefetch or many, plan)
+
+
+def plan_serializer(serializer):
+    """
+    Works out the relations and columns a serializer instance reads.
+
+    Args:
+        serializer (ModelSerializer): The serializer, with its fields as they
+            will be rendered.
+
+    Returns:
+        QueryPlan: The plan.
+    """
+    plan = {'select_related': [], 'prefetch_related': [], 'only': []}
+    _walk(serializer, '', False, plan)
+    return QueryPlan(
+        tuple(plan['select_related']),
+        tuple(plan['prefetch_related']),
+        tuple(plan['only']) if plan['only'] is not None else None,
+    )
+
+
+@lru_cache(maxsize=None)
+def plan_queryset(serializer_class):
+    """
+    Works out the relations a serializer class reads.
+
+    Args:
+        serializer_class (type): A `ModelSerializer` subclass.
+
+    Returns:
+        QueryPlan: The plan of a default instance of the class, without
+        `only`: serializers rendering every field read every column anyway.
+    """
+    return plan_serializer(serializer_class())._replace(only=None)
+
+
+def apply_plan(queryset, plan):
+    """
+    Applies a `QueryPlan` to a queryset.
+
+    Args:
+        queryset (QuerySet): The queryset to optimize.
+        plan (QueryPlan): The plan of the serializer its objects are rendered with.
+
+    Returns:
+        QuerySet: The queryset with the planned joins and prefetches, loading
+        only the planned columns (and those it is ordered by) if the plan
+        lists them.
+    """
+    if plan.select_related:
+        queryset = queryset.select_related(*plan.select_related)
+    if plan.prefetch_related:
+        queryset = queryset.prefetch_related(*plan.prefetch_related)
+    if plan.only is not None:
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        ordering = [field.lstrip('-') for field in ordering if isinstance(field, str) and field != '?']
+        queryset = queryset.only(*plan.only, *ordering)
+    return queryset
+
+
+def optimize_queryset(queryset, serializer_class):
+    """
+    Applies the plan of `serializer_class` to a queryset.
+
+    Args:
+        queryset (QuerySet): The queryset to optimize.
+        serializer_class (type): The serializer its objects are rendered with.
+
+    Returns:
+        QuerySet: The queryset with the planned joins and prefetches.
+    """
+    return apply_plan(queryset, plan_queryset(serializer_class))
+
+
+class QueryPlanningMixin:
+    """
+    Viewset mixin joining and prefetching what the serializer renders.
+
+    Listing N objects then costs a fixed number of queries instead of a
+    number that grows with N.
+    """
+
+    def get_query_plan(self):
+        """
+        Returns the `QueryPlan` applied to the viewset's queryset.
+        """
+        return plan_queryset(self.get_serializer_class())
+
+    def get_queryset(self):
+        return apply_plan(super().get_queryset(), self.get_query_plan())
@@ -0,0 +1,248 @@
+"""
+Lease-based reservations of microcontrollers.
+
+A user reserves a board of a type with `reserve`. A free board is claimed with
+a single conditional UPDATE of its `is_available` flag (compare-and-swap), so
+two users can never hold the same board: of concurrent claims of a board, one
+updates it and the others update nothing and move on to another candidate.
+Claimants pick at random among the first `RESERVATION_CLAIM_CANDIDATES` free
+boards, so a crowd spreads over the pool instead of racing for its first
+board.
+
+When no board is free, or users are already waiting for the type, the
+reservation joins the type's first-come, first-served queue. A released or
+lapsed board is handed straight to the head of the queue, and only becomes
+available when nobody waits for it.
+
+Every reservation, waiting or holding, lapses `RESERVATION_LEASE_SECONDS`
+after it was made or last renewed with `renew` (the client's heartbeat).
+Lapsed reservations are swept by every reservation operation, so boards of
+clients that went away return to the pool without any background job.
+
+The writes bypass model signals: `model_changed` is called for the boards
+whose availability changed.
+"""
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Microcontroller, Reservation
+from .signals import model_changed
+
+OPEN_STATUSES = (Reservation.WAITING, Reservation.ACTIVE)
+
+
+def _lease():
+    return timedelta(seconds=getattr(settings, 'RESERVATION_LEASE_SECONDS', 60))
+
+
+def _claim_board(mcu_type, user_id, now):
+    """
+    Takes a free board of `mcu_type` for `user_id`.
+
+    Returns:
+        UUID: The claimed board's id, or None if every board is taken.
+    """
+    candidates_count = getattr(settings, 'RESERVATION_CLAIM_CANDIDATES', 8)
+    free = Microcontroller.objects.filter(type=mcu_type, is_available=True).order_by('name')
+    while True:
+        candidates = list(free.values_list('id', flat=True)[:candidates_count])
+        if not candidates:
+            return None
+        random.shuffle(candidates)
+        for board_id in candidates:
+            # Compare-and-swap: only one claim of a free board updates it
+            if Microcontroller.objects.filter(id=board_id, is_available=True).update(
+                is_available=False, current_user_id=user_id, updated_at=now
+            ):
+                return board_id
+        # Every candidate was taken meanwhile, by claims that succeeded
+
+
+def _hand_over(board_id, mcu_type, now):
+    """
+    Gives a board that was just released to the head of its type's queue, or
+    makes it available when nobody waits for it.
+    """
+    queue = Reservation.objects.filter(microcontroller_type=mcu_type, status=Reservation.WAITING)
+    while True:
+        head = queue.filter(lease_expires_at__gte=now).order_by('id').values_list('id', 'user_id').first()
+        if head is None:
+            Microcontroller.objects.filter(id=board_id).update(is_available=True, current_user=None, updated_at=now)
+            return
+        granted = Reservation.objects.filter(id=head[0], status=Reservation.WAITING).update(
+            status=Reservation.ACTIVE, microcontroller_id=board_id, granted_at=now, lease_expires_at=now + _lease()
+        )
+        if granted:
+            Microcontroller.objects.filter(id=board_id).update(current_user_id=head[1], updated_at=now)
+            return
+        # Cancelled meanwhile
+
+
+def _dispatch(mcu_type, now):
+    """
+    Hands free boards to the waiting users of `mcu_type`, for boards released
+    while a reservation was joining the queue.
+
+    Returns:
+        bool: Whether a board was handed over.
+    """
+    handed_over = False
+    queue = Reservation.objects.filter(
+        microcontroller_type=mcu_type, status=Reservation.WAITING, lease_expires_at__gte=now
+    ).order_by('id')
+    while True:
+        head = queue.values_list('id', 'user_id').first()
+        if head is None:
+            return handed_over
+        with transaction.atomic():
+            board_id = _claim_board(mcu_type, head[1], now)
+            if board_id is None:
+                return handed_over
+            if not Reservation.objects.filter(id=head[0], status=Reservation.WAITING).update(
+                status=Reservation.ACTIVE, microcontroller_id=board_id, granted_at=now,
+                lease_expires_at=now + _lease()
+            ):
+                # Cancelled meanwhile: the board goes back
+                transaction.set_rollback(True)
+                continue
+        handed_over = True
+
+
+def expire_leases():
+    """
+    Ends the reservations whose lease has run out, handing their boards over.
+
+    Returns:
+        int: The number of boards taken back.
+    """
+    now = timezone.now()
+    Reservation.objects.filter(status=Reservation.WAITING, lease_expires_at__lt=now).update(
+        status=Reservation.EXPIRED, ended_at=now
+    )
+    lapsed = list(
+        Reservation.objects.filter(status=Reservation.ACTIVE, lease_expires_at__lt=now)
+        .values_list('id', 'microcontroller_id', 'microcontroller_type')
+    )
+    taken_back = 0
+    for reservation_id, board_id, mcu_type in lapsed:
+        with transaction.atomic():
+            # Renewed or expired by someone else meanwhile otherwise
+            if Reservation.objects.filter(
+                id=reservation_id, status=Reservation.ACTIVE, lease_expires_at__lt=now
+            ).update(status=Reservation.EXPIRED, ended_at=now):
+                _hand_over(board_id, mcu_type, now)
+                taken_back += 1
+    if taken_back:
+        model_changed(Microcontroller)
+    return taken_back
+
+
+def reserve(user, mcu_type):
+    """
+    Reserves a board of a type for a user.
+
+    Args:
+        user (User): The user.
+        mcu_type (str): One of `Microcontroller.MICROCONTROLLER_TYPES`.
+
+    Returns:
+        Reservation: The user's open reservation for the type: an ``ACTIVE``
+        one holding a board, or a ``WAITING`` one in the type's queue. A user
+        with an open reservation for the type gets it back.
+    """
+    expire_leases()
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            existing = Reservation.objects.filter(
+                user=user, microcontroller_type=mcu_type, status__in=OPEN_STATUSES
+            ).first()
+            if existing is not None:
+                return existing
+            # Newcomers only take a board while nobody waits for one
+            waiting = Reservation.objects.filter(microcontroller_type=mcu_type, status=Reservation.WAITING)
+            board_id = None if waiting.exists() else _claim_board(mcu_type, user.pk, now)
+            reservation = Reservation.objects.create(
+                user=user, microcontroller_type=mcu_type, microcontroller_id=board_id,
+                status=Reservation.ACTIVE if board_id else Reservation.WAITING,
+                granted_at=now if board_id else None, lease_expires_at=now + _lease()
+            )
+    except IntegrityError:
+        # A concurrent request of the same user made it first
+        return Reservation.objects.get(user=user, microcontroller_type=mcu_type, status__in=OPEN_STATUSES)
+
+    if board_id is not None:
+        model_changed(Microcontroller)
+    elif _dispatch(mcu_type, now):
+        model_changed(Microcontroller)
+        reservation.refresh_from_db()
+    return reservation
+
+
+def renew(reservation):
+    """
+    Extends the lease of an open reservation (heartbeat).
+
+    Args:
+        reservation (Reservation): The reservation.
+
+    Returns:
+        Reservation: The reservation as it now is; no longer open if its
+        lease had already run out.
+    """
+    expire_leases()
+    now = timezone.now()
+    renewed = Reservation.objects.filter(
+        id=reservation.pk, status__in=OPEN_STATUSES, lease_expires_at__gte=now
+    ).update(lease_expires_at=now + _lease())
+    reservation.refresh_from_db()
+    if renewed and reservation.status == Reservation.WAITING and _dispatch(reservation.microcontroller_type, now):
+        model_changed(Microcontroller)
+        reservation.refresh_from_db()
+    return reservation
+
+
+def release(reservation):
+    """
+    Ends a reservation: frees its board or leaves the queue.
+
+    Args:
+        reservation (Reservation): The reservation.
+
+    Returns:
+        Reservation: The reservation as it now is.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        if Reservation.objects.filter(id=reservation.pk, status=Reservation.WAITING).update(
+            status=Reservation.CANCELLED, ended_at=now
+        ):
+            released = False
+        else:
+            released = Reservation.objects.filter(id=reservation.pk, status=Reservation.ACTIVE).update(
+                status=Reservation.RELEASED, ended_at=now
+            )
+            if released:
+                # The board as of now: `reservation` may predate its hand-over
+                board_id = Reservation.objects.filter(id=reservation.pk).values_list('microcontroller_id', flat=True).get()
+                _hand_over(board_id, reservation.microcontroller_type, now)
+    if released:
+        model_changed(Microcontroller)
+    reservation.refresh_from_db()
+    return reservation
+
+
+def queue_position(reservation):
+    """
+    Returns the 1-based position of a waiting reservation in its queue, or None.
+    """
+    if reservation.status != Reservation.WAITING:
+        return None
+    return Reservation.objects.filter(
+        microcontroller_type=reservation.microcontroller_type, status=Reservation.WAITING,
+        id__lte=reservation.pk
+    ).count()
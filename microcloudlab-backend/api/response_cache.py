@@ -0,0 +1,183 @@
+"""
+Server-side cache of rendered responses for read-mostly endpoints.
+
+`ResponseCacheMixin` keeps the rendered body and headers of successful GET
+`list` and `retrieve` responses in the Django cache named by
+`API_RESPONSE_CACHE` (see `CACHES` in the settings), so a hit is answered
+without running a query, a serializer or a renderer.
+
+Only JSON responses are cached: the browsable API's HTML pages embed the
+signed-in user and a CSRF token, and must not be served to anyone else.
+
+Entries are keyed by the request path with its query string, the `Accept`
+header and a generation token per model the response renders. The signal
+handlers in `api.signals` drop a model's token whenever one of its rows
+changes; the next request draws a new one, so every entry rendered from the
+old data is unreachable at once and ages out of the cache by itself. Tokens
+are kept in the same cache as the responses, so invalidation reaches every
+process sharing it: a local-memory cache is per process and only suits a
+single worker, a file-based (or any shared) cache suits several.
+"""
+import hashlib
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.template.response import SimpleTemplateResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework.renderers import JSONRenderer
+
+from .conditional import rendered_models
+
+_GENERATION_PREFIX = 'api-response-generation:'
+_RESPONSE_PREFIX = 'api-response:'
+
+# Set per response; never stored
+_UNCACHED_HEADERS = ('X-Cache', 'Allow', 'Vary')
+
+
+class ResponseCache:
+    """
+    Rendered responses and model generations in a Django cache.
+
+    Args:
+        alias (str): The alias of the cache in `CACHES`.
+    """
+
+    def __init__(self, alias):
+        self.alias = alias
+        self._lock = threading.Lock()
+        self._counters = {}
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def key(self, request, labels):
+        """
+        Returns the key of the response to `request`.
+
+        Args:
+            request (Request): The request.
+            labels (tuple): The labels of the models the response renders.
+        """
+        keys = [_GENERATION_PREFIX + label for label in labels]
+        generations = self.cache.get_many(keys)
+        for key in keys:
+            if key not in generations:
+                # Never drawn, invalidated or evicted: a new token can match
+                # no existing entry
+                self.cache.add(key, uuid.uuid4().hex, timeout=None)
+                generations[key] = self.cache.get(key)
+
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(request.get_full_path().encode('utf-8'))
+        digest.update(b'\0' + request.headers.get('Accept', '').encode('utf-8'))
+        for key in keys:
+            digest.update(f'\0{generations[key]}'.encode('utf-8'))
+        return _RESPONSE_PREFIX + digest.hexdigest()
+
+    def get(self, key):
+        """
+        Returns the cached `(content, headers)` pair stored under `key`, or None.
+        """
+        return self.cache.get(key)
+
+    def store(self, key, response):
+        """
+        Stores a rendered response under `key`.
+        """
+        headers = {
+            name: value for name, value in response.items()
+            if name not in _UNCACHED_HEADERS
+        }
+        self.cache.set(key, (response.content, headers))
+
+    def invalidate(self, label):
+        """
+        Makes every cached response rendering the model `label` unreachable.
+        """
+        self.cache.delete(_GENERATION_PREFIX + label)
+
+    def record(self, label, hit):
+        """
+        Counts a hit or a miss of the responses rendering the model `label`.
+        """
+        with self._lock:
+            counters = self._counters.setdefault(label, {'hits': 0, 'misses': 0})
+            counters['hits' if hit else 'misses'] += 1
+
+    def stats(self):
+        """
+        Returns the hit and miss counters of this process, per model.
+        """
+        with self._lock:
+            return {label: dict(counters) for label, counters in self._counters.items()}
+
+    def clear(self):
+        """
+        Drops every cached entry and resets the counters.
+        """
+        self.cache.clear()
+        with self._lock:
+            self._counters.clear()
+
+
+class ResponseCacheMixin:
+    """
+    Viewset mixin serving `list` and `retrieve` from `response_cache`.
+
+    Responses say whether they were served from the cache in an `X-Cache`
+    header (``HIT`` or ``MISS``). Requests negotiating another renderer than
+    JSON bypass the cache.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self._respond_from_cache(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._respond_from_cache(super().retrieve, request, *args, **kwargs)
+
+    def _respond_from_cache(self, handler, request, *args, **kwargs):
+        if (response_cache is None or request.method != 'GET'
+                or not isinstance(getattr(request, 'accepted_renderer', None), JSONRenderer)):
+            return handler(request, *args, **kwargs)
+
+        serializer_class = self.get_serializer_class()
+        label = serializer_class.Meta.model._meta.label
+        key = response_cache.key(request, rendered_models(serializer_class))
+        cached = response_cache.get(key)
+        if cached is not None:
+            response_cache.record(label, hit=True)
+            content, headers = cached
+            response = get_conditional_response(
+                request, etag=headers.get('ETag'),
+                last_modified=parse_http_date_safe(headers.get('Last-Modified', '')),
+            )
+            if response is None:
+                response = HttpResponse(content)
+            for name, value in headers.items():
+                response[name] = value
+            response['X-Cache'] = 'HIT'
+            return response
+
+        response_cache.record(label, hit=False)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200 and isinstance(response, SimpleTemplateResponse):
+            response.add_post_render_callback(lambda rendered: response_cache.store(key, rendered))
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+def _response_cache_from_settings():
+    alias = getattr(settings, 'API_RESPONSE_CACHE', None)
+    if not alias:
+        return None
+    return ResponseCache(alias)
+
+
+# None when API_RESPONSE_CACHE is unset, which renders every response
+response_cache = _response_cache_from_settings()
@@ -0,0 +1,221 @@
+"""
+Full-text search over tutorials, resources and case studies.
+
+The searchable text of every object is kept in the SQLite FTS5 table
+``api_search`` (created by migration 0009), one row per `SearchDocument`
+sharing its id, and is kept in step with the objects by `api.signals`.
+`search` answers a query from the FTS index alone: BM25 ranks the matches,
+titles weighing more than bodies, and only the requested page of them is
+mapped back to objects.
+
+Queries are reduced to their words, all of which must match; the last one
+also matches as a prefix (from two characters on), so results follow a query
+as it is typed. Other databases have no FTS5: the index is left empty and
+`search_supported` is False.
+"""
+import html
+import re
+import uuid
+
+from django.db import connections, transaction
+
+from .models import CaseStudy, Resource, SearchDocument, Tutorial
+
+SEARCH_TABLE = 'api_search'
+
+# The title and body fields of each searched model
+SEARCHED_FIELDS = {
+    Tutorial: ('title', ('description', 'content')),
+    Resource: ('title', ('description',)),
+    CaseStudy: ('title', ('subtitle', 'description', 'challenge', 'solution', 'results')),
+}
+
+# Searched models by the type names of the search endpoint
+SEARCH_TYPES = {model._meta.model_name: model for model in SEARCHED_FIELDS}
+
+MAX_QUERY_TERMS = 16
+
+# BM25 weights of the title, body and kind columns
+RANKING = 'bm25(10.0, 1.0, 0.0)'
+
+# Marks the matches in highlights and snippets before the text is escaped
+_MATCH_START = '\x02'
+_MATCH_END = '\x03'
+
+_WORD = re.compile(r'\w+')
+
+
+def search_supported(using='default'):
+    """
+    Returns whether the database `using` has the FTS5 index.
+    """
+    return connections[using].vendor == 'sqlite'
+
+
+def _document_text(model, obj):
+    title_field, body_fields = SEARCHED_FIELDS[model]
+    body = '\n'.join(getattr(obj, field) or '' for field in body_fields)
+    return getattr(obj, title_field) or '', body
+
+
+def index_documents(model, objects, using='default'):
+    """
+    Replaces the search index entries of some objects with their current text.
+
+    Args:
+        model (type): One of the `SEARCHED_FIELDS` models.
+        objects (iterable): The objects to index.
+        using (str): The database alias.
+    """
+    if not search_supported(using):
+        return
+    objects = list(objects)
+    with transaction.atomic(using=using):
+        unindex_documents(model, [obj.pk for obj in objects], using)
+        _insert_documents(model, objects, using)
+
+
+def _insert_documents(model, objects, using):
+    documents = SearchDocument.objects.using(using).bulk_create(
+        [SearchDocument(model=model._meta.label, object_id=obj.pk) for obj in objects]
+    )
+    with connections[using].cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, title, body, kind) VALUES (%s, %s, %s, %s)',
+            [
+                (document.pk, *_document_text(model, obj), model._meta.model_name)
+                for document, obj in zip(documents, objects)
+            ]
+        )
+
+
+def unindex_documents(model, pks, using='default'):
+    """
+    Deletes the search index entries of some objects.
+    """
+    if not search_supported(using):
+        return
+    documents = SearchDocument.objects.using(using).filter(model=model._meta.label, object_id__in=pks)
+    ids = list(documents.values_list('pk', flat=True))
+    if not ids:
+        return
+    with transaction.atomic(using=using):
+        with connections[using].cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [(pk,) for pk in ids])
+        documents.delete()
+
+
+def rebuild_search_index(using='default', batch_size=1000):
+    """
+    Rebuilds the search index from scratch.
+
+    Args:
+        using (str): The database alias.
+        batch_size (int): The number of objects indexed per batch.
+
+    Returns:
+        dict: The number of indexed objects per model label.
+    """
+    counts = {}
+    if not search_supported(using):
+        return counts
+    with transaction.atomic(using=using):
+        with connections[using].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        SearchDocument.objects.using(using).all().delete()
+        for model, (title_field, body_fields) in SEARCHED_FIELDS.items():
+            objects = model._default_manager.using(using).only('pk', title_field, *body_fields).order_by()
+            batch = []
+            for obj in objects.iterator(chunk_size=batch_size):
+                batch.append(obj)
+                if len(batch) == batch_size:
+                    _insert_documents(model, batch, using)
+                    batch = []
+            _insert_documents(model, batch, using)
+            counts[model._meta.label] = objects.count()
+        with connections[using].cursor() as cursor:
+            # Merges the index's segments, which the row by row writes multiplied
+            cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+    return counts
+
+
+def match_expression(query):
+    """
+    Turns a user's query into an FTS5 query.
+
+    Args:
+        query (str): The text typed by the user.
+
+    Returns:
+        str: An expression matching the documents containing every word of
+        the query, the last one as a prefix unless it is a single character,
+        or None if it has no words.
+    """
+    terms = _WORD.findall(query)[:MAX_QUERY_TERMS]
+    if not terms:
+        return None
+    # Quoted, words are never read as FTS5 operators (AND, NEAR, column names)
+    expression = ' '.join(f'"{term}"' for term in terms)
+    # Single characters prefix too many words to be worth it (and are not
+    # covered by the table's prefix indexes)
+    return expression + '*' if len(terms[-1]) > 1 else expression
+
+
+def _marked_html(text):
+    return html.escape(text).replace(_MATCH_START, '<mark>').replace(_MATCH_END, '</mark>')
+
+
+def search(query, types=None, limit=20, using='default'):
+    """
+    Finds the tutorials, resources and case studies matching a query.
+
+    Args:
+        query (str): The text typed by the user.
+        types (list): The `SEARCH_TYPES` to search, or None for all of them.
+        limit (int): The maximum number of results.
+        using (str): The database alias.
+
+    Returns:
+        list: The best matches first, as dicts with the object's ``type``
+        and ``id``, its ``title`` and a ``snippet`` of its body as HTML with
+        the matched words in ``<mark>`` elements, and its ``score`` (higher
+        is better).
+    """
+    expression = match_expression(query)
+    if expression is None or not search_supported(using):
+        return []
+    # The kind column only serves the type filter
+    expression = f'{{title body}} : ({expression})'
+    if types:
+        expression += f' AND kind : ({" OR ".join(types)})'
+
+    # Ordered by rank, FTS5 sorts the matches itself and the highlights,
+    # snippets and join are only computed for the returned page
+    sql = f'''
+        SELECT document.model, document.object_id,
+               highlight({SEARCH_TABLE}, 0, %s, %s),
+               snippet({SEARCH_TABLE}, 1, %s, %s, '…', 24),
+               {SEARCH_TABLE}.rank
+        FROM {SEARCH_TABLE}
+        JOIN {SearchDocument._meta.db_table} AS document ON document.id = {SEARCH_TABLE}.rowid
+        WHERE {SEARCH_TABLE} MATCH %s AND {SEARCH_TABLE}.rank MATCH %s
+        ORDER BY {SEARCH_TABLE}.rank
+        LIMIT %s
+    '''
+    markers = [_MATCH_START, _MATCH_END]
+    with connections[using].cursor() as cursor:
+        cursor.execute(sql, [*markers, *markers, expression, RANKING, limit])
+        rows = cursor.fetchall()
+
+    models = {model._meta.label: model for model in SEARCHED_FIELDS}
+    return [
+        {
+            'type': models[label]._meta.model_name,
+            'id': str(uuid.UUID(str(object_id))),
+            'title': _marked_html(title),
+            'snippet': _marked_html(snippet),
+            # BM25 scores are negative, the best the lowest
+            'score': round(-score, 4),
+        }
+        for label, object_id, title, snippet, score in rows
+    ]
@@ -18,6 +18,8 @@ class MicrocontrollerSerializer(serializers.ModelSerializer):
     class Meta:
         model = Microcontroller
         fields = '__all__'
+        # Set by reservations only (`api.reservations`)
+        read_only_fields = ['is_available', 'current_user']
         depth = 1
 
 
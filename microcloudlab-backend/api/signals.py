@@ -0,0 +1,209 @@
+"""
+Signal handlers keeping `ModelVersion`, the response cache, the tag index,
+the search index and the authenticated user cache in step with the data.
+
+Connected in `ApiConfig.ready`. Writes that bypass model signals
+(`QuerySet.update`, `bulk_create`, raw SQL) must call `model_changed`, and
+`reindex_objects` for the objects they wrote, themselves. Bulk writes that do
+send them, such as a `QuerySet.delete()` of many rows, can run in
+`batched_signals` so that the receivers' work is done once per model rather
+than once per row.
+"""
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.utils import timezone
+
+from .authentication import user_cache
+from .models import ModelVersion, Reservation, RevokedToken, SearchDocument, TagIndex
+from .response_cache import response_cache
+from .search import SEARCHED_FIELDS, index_documents, unindex_documents
+from .tags import TAGGED_FIELDS, reindex_tags, unindex_tags
+
+
+def bump_version(model, using='default'):
+    """
+    Records a change to the rows of `model`.
+
+    Args:
+        model (type): The changed model class.
+        using (str): The database alias the change was written to.
+    """
+    label = model._meta.concrete_model._meta.label
+    versions = ModelVersion.objects.using(using)
+    now = timezone.now()
+    if versions.filter(label=label).update(version=F('version') + 1, changed_at=now):
+        return
+    try:
+        with transaction.atomic(using=using):
+            versions.create(label=label, version=1, changed_at=now)
+    except IntegrityError:
+        # Created by a concurrent change in the meantime
+        versions.filter(label=label).update(version=F('version') + 1, changed_at=now)
+
+
+def _is_versioned(model):
+    # Derived tables change along with the rows they derive from, and revoked
+    # tokens and reservations are never rendered (`api.reservations` records
+    # the board changes it makes itself). Historical models (data migrations) live in
+    # registries of their own, possibly before the ModelVersion table exists.
+    if model in (ModelVersion, TagIndex, SearchDocument, RevokedToken, Reservation) or model._meta.apps is not apps:
+        return False
+    return model._meta.app_label not in getattr(settings, 'MODEL_VERSION_IGNORED_APPS', ['admin', 'sessions'])
+
+
+def model_changed(model, using='default'):
+    """
+    Records a change to the rows of `model` and invalidates the cached
+    responses rendering it.
+
+    Args:
+        model (type): The changed model class.
+        using (str): The database alias the change was written to.
+    """
+    bump_version(model, using)
+    if response_cache is not None:
+        label = model._meta.concrete_model._meta.label
+        # Now, so this transaction never reads stale responses, and again on
+        # commit, in case another request cached the uncommitted state meanwhile
+        response_cache.invalidate(label)
+        transaction.on_commit(lambda: response_cache.invalidate(label), using=using)
+
+
+def reindex_objects(model, objects, using='default'):
+    """
+    Updates the tag and search indexes of objects written without signals.
+
+    Args:
+        model (type): The objects' model class.
+        objects (list): The saved objects.
+        using (str): The database alias they were written to.
+    """
+    if model in TAGGED_FIELDS:
+        reindex_tags(model, objects, using)
+    if model in SEARCHED_FIELDS:
+        index_documents(model, objects, using)
+
+
+_batches = threading.local()
+
+
+class SignalBatch:
+    """
+    The changes recorded by the receivers inside `batched_signals`.
+    """
+
+    def __init__(self):
+        self.changed_models = {}
+        self.unindexed = defaultdict(list)
+
+    def changed(self, model, using='default'):
+        """
+        Records a change to the rows of `model`, e.g. one made by the
+        deletion collector without signals (``SET_NULL`` updates, fast deletes).
+        """
+        if _is_versioned(model):
+            self.changed_models[(model, using)] = None
+
+    def apply(self):
+        for (unindex, model, using), pks in self.unindexed.items():
+            unindex(model, pks, using)
+        for model, using in self.changed_models:
+            model_changed(model, using)
+
+
+@contextmanager
+def batched_signals():
+    """
+    Defers the receivers' work to the end of the block.
+
+    Inside it, saved and deleted rows only record their model, and deleted
+    rows their primary key. On exit every recorded model gets one version
+    bump and cache invalidation, and the deleted rows leave the tag and
+    search indexes together. Nested blocks join the outermost one.
+
+    Yields:
+        SignalBatch: The recorded changes.
+    """
+    batch = getattr(_batches, 'current', None)
+    if batch is not None:
+        yield batch
+        return
+    batch = _batches.current = SignalBatch()
+    try:
+        yield batch
+    finally:
+        _batches.current = None
+    batch.apply()
+
+
+def _row_changed(sender, using, **kwargs):
+    batch = getattr(_batches, 'current', None)
+    if batch is not None:
+        batch.changed(sender, using)
+    else:
+        model_changed(sender, using)
+
+
+def _unindex(unindex, sender, instance, using):
+    batch = getattr(_batches, 'current', None)
+    if batch is not None:
+        batch.unindexed[(unindex, sender, using)].append(instance.pk)
+    else:
+        unindex(sender, [instance.pk], using)
+
+
+def _relation_changed(sender, instance, action, model, using, **kwargs):
+    # Both sides render the relation (e.g. a project's collaborators)
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        for changed in {type(instance), model}:
+            if _is_versioned(changed):
+                model_changed(changed, using)
+
+
+def _tags_saved(sender, instance, using, update_fields=None, **kwargs):
+    if update_fields is None or TAGGED_FIELDS[sender] in update_fields:
+        reindex_tags(sender, [instance], using)
+
+
+def _tags_deleted(sender, instance, using, **kwargs):
+    _unindex(unindex_tags, sender, instance, using)
+
+
+def _document_saved(sender, instance, using, update_fields=None, **kwargs):
+    title_field, body_fields = SEARCHED_FIELDS[sender]
+    if update_fields is None or not update_fields.isdisjoint((title_field, *body_fields)):
+        index_documents(sender, [instance], using)
+
+
+def _document_deleted(sender, instance, using, **kwargs):
+    _unindex(unindex_documents, sender, instance, using)
+
+
+def _user_changed(sender, instance, **kwargs):
+    user_cache.forget(instance.pk)
+
+
+def connect():
+    # Receivers are connected per model: a model with delete receivers can
+    # no longer be deleted in bulk, which the derived tables rely on
+    for model in apps.get_models():
+        if _is_versioned(model):
+            post_save.connect(_row_changed, sender=model, dispatch_uid='api.model_version.save')
+            post_delete.connect(_row_changed, sender=model, dispatch_uid='api.model_version.delete')
+    for model in TAGGED_FIELDS:
+        post_save.connect(_tags_saved, sender=model, dispatch_uid='api.tags.save')
+        post_delete.connect(_tags_deleted, sender=model, dispatch_uid='api.tags.delete')
+    for model in SEARCHED_FIELDS:
+        post_save.connect(_document_saved, sender=model, dispatch_uid='api.search.save')
+        post_delete.connect(_document_deleted, sender=model, dispatch_uid='api.search.delete')
+    post_save.connect(_user_changed, sender=User, dispatch_uid='api.authentication.save')
+    post_delete.connect(_user_changed, sender=User, dispatch_uid='api.authentication.delete')
+    m2m_changed.connect(_relation_changed, dispatch_uid='api.model_version.m2m')
@@ -0,0 +1,137 @@
+"""
+Sparse fieldsets and opt-in expansion for the router-registered endpoints.
+
+By default an object is rendered with every field and every relation nested
+in full. A GET request may instead pick what it needs:
+
+    ``?fields=id,title,project.title``
+        Renders only the listed fields. Dotted paths select fields of a
+        nested object (and expand it).
+    ``?expand=project,project.owner``
+        Renders the listed relations as nested objects.
+
+As soon as either parameter is given, relations that are not expanded are
+rendered as their primary keys, and the queryset loads only the columns and
+joins the relations that are rendered, so unrequested text columns such as
+`code_content` never leave the database::
+
+    GET /api/codeexecutions/?fields=id,execution_status,project.title
+    [{"id": 7, "execution_status": "SUCCESS", "project": {"title": "Blink"}}, ...]
+"""
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+from .query_planning import QueryPlanningMixin, plan_serializer
+
+
+def parse_field_paths(value):
+    """
+    Parses a comma-separated list of dotted field paths into a tree.
+
+    Args:
+        value (str): E.g. ``'id,project.title,project.owner.username'``.
+
+    Returns:
+        dict: Maps each field name to the tree of its selected subfields,
+        e.g. ``{'id': {}, 'project': {'title': {}, 'owner': {'username': {}}}}``.
+    """
+    tree = {}
+    for path in value.split(','):
+        path = path.strip()
+        if not path:
+            continue
+        node = tree
+        for name in path.split('.'):
+            node = node.setdefault(name, {})
+    return tree
+
+
+def _nested_serializer(field):
+    if isinstance(field, serializers.ListSerializer):
+        return field.child
+    if isinstance(field, serializers.BaseSerializer):
+        return field
+    return None
+
+
+def restrict_serializer(serializer, fields, expand, prefix=''):
+    """
+    Removes the unselected fields of a serializer and collapses its
+    unexpanded relations to primary keys, recursing into expanded ones.
+
+    Args:
+        serializer (Serializer): The serializer, modified in place.
+        fields (dict | None): The selected fields as returned by
+            `parse_field_paths`, or None to keep every field.
+        expand (dict): The expanded relations, as returned by `parse_field_paths`.
+        prefix (str): The dotted path of `serializer`, used in error messages.
+
+    Raises:
+        ValidationError: If a parameter names a field that cannot be rendered.
+    """
+    known = serializer.fields
+    for parameter, tree in (('fields', fields or {}), ('expand', expand)):
+        unknown = [name for name in tree if name not in known]
+        if unknown:
+            raise ValidationError({parameter: [f'Unknown field: {prefix}{name}' for name in unknown]})
+
+    for name, field in list(serializer.fields.items()):
+        if fields is not None and name not in fields:
+            serializer.fields.pop(name)
+            continue
+        subfields = fields.get(name) if fields is not None else None
+        nested = _nested_serializer(field)
+        if nested is None:
+            if subfields or name in expand:
+                raise ValidationError({
+                    'expand' if name in expand else 'fields': [f'Not a nested object: {prefix}{name}']
+                })
+            continue
+        if subfields or name in expand:
+            restrict_serializer(nested, subfields or None, expand.get(name, {}), f'{prefix}{name}.')
+            continue
+        options = {'read_only': True, 'many': nested is not field}
+        if field.source != name:
+            options['source'] = field.source
+        serializer.fields[name] = serializers.PrimaryKeyRelatedField(**options)
+
+
+class SparseFieldsMixin(QueryPlanningMixin):
+    """
+    Viewset mixin honouring the `fields` and `expand` query parameters.
+
+    See the module documentation. Without either parameter, or for requests
+    other than GET, the viewset behaves as a plain `QueryPlanningMixin`.
+    """
+
+    fields_query_param = 'fields'
+    expand_query_param = 'expand'
+
+    def get_field_selection(self):
+        """
+        Returns the requested `(fields, expand)` trees, or None if the request
+        does not ask for a sparse response.
+        """
+        request = getattr(self, 'request', None)
+        if request is None or request.method not in ('GET', 'HEAD'):
+            return None
+        fields = request.query_params.get(self.fields_query_param)
+        expand = request.query_params.get(self.expand_query_param)
+        if fields is None and expand is None:
+            return None
+        return (
+            parse_field_paths(fields) if fields else None,
+            parse_field_paths(expand or ''),
+        )
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        selection = self.get_field_selection()
+        if selection is not None:
+            restrict_serializer(_nested_serializer(serializer), *selection)
+        return serializer
+
+    def get_query_plan(self):
+        if self.get_field_selection() is None:
+            return super().get_query_plan()
+        return plan_serializer(self.get_serializer())
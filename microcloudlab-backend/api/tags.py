@@ -0,0 +1,141 @@
+"""
+Tag filters and facet counts backed by the `TagIndex` table.
+
+The tags of tutorials, resources and case studies are stored as JSON lists,
+which the database cannot index. Every tag is therefore also kept as a
+`TagIndex` row (see `api.signals`), and the tagged viewsets accept::
+
+    ?tags=ESP32,WiFi            objects having all of the tags
+    ?tags=ESP32,WiFi&match=any  objects having any of them
+
+Tags match case-insensitively. `GET <endpoint>/tags/` returns the number of
+(filtered) objects per tag, most frequent first, in a single query.
+"""
+from django.db import transaction
+from django.db.models import Count, Min
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.response import Response
+
+from .models import CaseStudy, Resource, TagIndex, Tutorial
+
+# The JSON list field holding the tags of each tagged model
+TAGGED_FIELDS = {
+    Tutorial: 'tags',
+    Resource: 'tags',
+    CaseStudy: 'technologies_used',
+}
+
+MAX_TAG_LENGTH = TagIndex._meta.get_field('tag').max_length
+
+
+def normalize_tags(values):
+    """
+    Extracts the distinct tags of a JSON tag list.
+
+    Args:
+        values: The stored value; anything but a list of strings has no tags.
+
+    Returns:
+        dict: Maps each tag's case-folded key to the tag as first written.
+    """
+    tags = {}
+    if not isinstance(values, list):
+        return tags
+    for value in values:
+        if not isinstance(value, str):
+            continue
+        tag = value.strip()[:MAX_TAG_LENGTH]
+        if tag:
+            tags.setdefault(tag.casefold()[:MAX_TAG_LENGTH], tag)
+    return tags
+
+
+def reindex_tags(model, objects, using='default'):
+    """
+    Replaces the `TagIndex` rows of some objects with their current tags.
+
+    Args:
+        model (type): One of the `TAGGED_FIELDS` models.
+        objects (iterable): The objects to reindex.
+        using (str): The database alias.
+    """
+    label = model._meta.label
+    field = TAGGED_FIELDS[model]
+    objects = list(objects)
+    rows = [
+        TagIndex(model=label, object_id=obj.pk, tag=tag, tag_key=key)
+        for obj in objects
+        for key, tag in normalize_tags(getattr(obj, field)).items()
+    ]
+    with transaction.atomic(using=using):
+        unindex_tags(model, [obj.pk for obj in objects], using)
+        TagIndex.objects.using(using).bulk_create(rows)
+
+
+def unindex_tags(model, pks, using='default'):
+    """
+    Deletes the `TagIndex` rows of some objects.
+    """
+    TagIndex.objects.using(using).filter(model=model._meta.label, object_id__in=pks).delete()
+
+
+def tagged_ids(model, keys, match):
+    """
+    Returns the subquery of the primary keys of the objects with the given tags.
+
+    Args:
+        model (type): One of the `TAGGED_FIELDS` models.
+        keys (set): The case-folded tags.
+        match (str): ``'all'`` for the objects having every tag (the
+            intersection of the tags' object sets), ``'any'`` for those
+            having at least one.
+    """
+    index = TagIndex.objects.filter(model=model._meta.label, tag_key__in=keys)
+    if match == 'all' and len(keys) > 1:
+        index = index.values('object_id').annotate(matched=Count('tag_key')).filter(matched=len(keys))
+    return index.values('object_id')
+
+
+class TagFilterBackend(BaseFilterBackend):
+    """
+    Filters a tagged viewset by the `tags` and `match` query parameters.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        keys = set(normalize_tags(request.query_params.get('tags', '').split(',')))
+        if not keys:
+            return queryset
+        match = request.query_params.get('match', 'all')
+        if match not in ('all', 'any'):
+            raise ValidationError({'match': ["Must be 'all' or 'any'."]})
+        return queryset.filter(pk__in=tagged_ids(queryset.model, keys, match))
+
+
+class TagFacetsMixin:
+    """
+    Viewset mixin adding tag filtering and the `tags/` facet counts.
+    """
+
+    filter_backends = [TagFilterBackend]
+
+    @action(detail=False, methods=['get'], url_path='tags')
+    def tag_counts(self, request):
+        """
+        Counts the objects per tag, among those matching the request's filters.
+
+        Returns:
+            Response: A list of ``{"tag": ..., "count": ...}``, most frequent first.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        index = TagIndex.objects.filter(model=queryset.model._meta.label)
+        if queryset.query.has_filters():
+            index = index.filter(object_id__in=queryset.values('pk'))
+        counts = (
+            index.values('tag_key')
+            .annotate(first_tag=Min('tag'), count=Count('object_id'))
+            .order_by('-count', 'tag_key')
+            .values_list('first_tag', 'count')
+        )
+        return Response([{'tag': tag, 'count': count} for tag, count in counts])
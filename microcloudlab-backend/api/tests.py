@@ -1,3 +1,1576 @@
-from django.test import TestCase
+import asyncio
+import json
+import logging
+import multiprocessing
+import re
+import struct
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from .authentication import user_cache
+from .management.commands import benchmark_indexes
+from .models import (
+    CaseStudy, CodeExecution, Microcontroller, ModelVersion, Project, Reservation, Resource, SearchDocument, TagIndex,
+    TeamMember, Tutorial, TutorialProgress, UserProfile
+)
+from .pagination import encode_cursor
+from .peripherals.decoders import decode_frame
+from .peripherals.dedup import FrameDeduplicator
+from .peripherals.ingest import frame_deduplicator
+from .peripherals.logpipe import BackgroundQueueHandler, FrameSampler, JsonFormatter, PeripheralLevelFilter
+from .peripherals.segment_log import INDEX_ENTRY, RECORD_HEADER, SegmentedLog
+from .peripherals.shared import SharedPeripheralStore
+from .peripherals.store import PeripheralStore, peripheral_store
+from .peripherals.streaming import SubscriptionHub, peripheral_hub
+from .peripherals.throttle import TokenBucketLimiter, peripheral_limiter
+from .peripherals.transport import DeviceChannel, DeviceDispatcher, LoopbackTransport
+from .query_planning import optimize_queryset
+from .reservations import expire_leases, reserve
+from .response_cache import response_cache
+from .search import rebuild_search_index
+from .serializers import MicrocontrollerSerializer, ProjectSerializer
+from .signals import batched_signals
+
+
+def clear_response_cache():
+    # Rolled back test data never invalidates the responses cached from it
+    if response_cache is not None:
+        response_cache.clear()
+
+
+def reset_peripherals(test_case):
+    """
+    Empties the process-wide peripheral state, and keeps `test_case` from
+    writing to the durable history under `BASE_DIR` or logging every frame.
+    """
+    peripheral_store.clear()
+    if frame_deduplicator is not None:
+        frame_deduplicator.clear()
+    if peripheral_limiter is not None:
+        peripheral_limiter.clear()
+    patchers = [
+        mock.patch('api.peripherals.ingest.peripheral_history_log', None),
+        mock.patch('api.views.peripheral_history_log', None),
+        mock.patch.object(logging.getLogger('api.peripherals'), 'disabled', True),
+    ]
+    for patcher in patchers:
+        patcher.start()
+        test_case.addCleanup(patcher.stop)
+
+
+def pack_frame(command, payload=b''):
+    """
+    Packs a peripheral frame the way `peripheralService.js` does.
+    """
+    return bytes([0xAA, command, len(payload), *payload, 0x55])
+
+
+def create_catalog(count):
+    """
+    Creates `count` objects of each model rendered with nested serializers,
+    every one of them linked to distinct related objects.
+    """
+    for index in range(count):
+        user = User.objects.create_user(username=f'user-{User.objects.count()}')
+        collaborator = User.objects.create_user(username=f'user-{User.objects.count()}')
+        microcontroller = Microcontroller.objects.create(
+            name=f'Board {index}', type='ESP32', description='Test board', current_user=user
+        )
+        project = Project.objects.create(
+            title=f'Project {index}', description='Test project', project_type='IOT',
+            owner=user, microcontroller=microcontroller
+        )
+        project.collaborators.add(user, collaborator)
+        CodeExecution.objects.create(project=project, user=collaborator, code_content='print(1)')
+        profile = UserProfile.objects.create(user=user)
+        profile.preferred_microcontrollers.add(microcontroller)
+        tutorial = Tutorial.objects.create(
+            title=f'Tutorial {index}', description='Test tutorial', content='...',
+            difficulty='BEGINNER', estimated_time=10, microcontroller=microcontroller, author=user
+        )
+        TutorialProgress.objects.create(user=collaborator, tutorial=tutorial)
+
+
+class PeripheralStoreTests(SimpleTestCase):
+    """
+    The peripheral store keeps bounded histories per type and per device.
+    """
+
+    def append(self, store, mcu_id, peripheral_type, index):
+        return store.append({'mcu_id': mcu_id, 'peripheral_type': peripheral_type, 'index': index})
+
+    def indexes(self, entries):
+        return [entry['index'] for entry in entries]
+
+    def test_buffers_drop_the_oldest_entries(self):
+        store = PeripheralStore(capacity=3, stream_capacity=2)
+        for index in range(5):
+            self.append(store, 'esp32', 'UART', index)
+        self.assertEqual(self.indexes(store.history()), [2, 3, 4])
+        self.assertEqual(self.indexes(store.by_type('uart')), [2, 3, 4])
+        self.assertEqual(self.indexes(store.for_device('esp32')), [3, 4])
+        self.assertEqual(store.latest()['seq'], 5)
+
+    def test_device_streams_merge_in_arrival_order(self):
+        store = PeripheralStore()
+        for index, (mcu_id, peripheral_type) in enumerate([('a', 'UART'), ('b', 'UART'), ('a', 'SPI'), ('a', 'UART')]):
+            self.append(store, mcu_id, peripheral_type, index)
+        self.assertEqual(self.indexes(store.for_device('a')), [0, 2, 3])
+        self.assertEqual(self.indexes(store.for_device('a', 'spi')), [2])
+        self.assertEqual(self.indexes(store.for_device('a', limit=2)), [2, 3])
+        self.assertEqual(self.indexes(store.by_type('UART')), [0, 1, 3])
+        self.assertEqual(store.for_device('c'), [])
+
+    def test_least_recently_written_streams_are_evicted(self):
+        store = PeripheralStore(max_streams=2)
+        for index, mcu_id in enumerate(['a', 'b', 'a', 'c']):
+            self.append(store, mcu_id, 'UART', index)
+        self.assertEqual(store.for_device('b'), [])
+        self.assertEqual(self.indexes(store.for_device('a')), [0, 2])
+        self.assertEqual(self.indexes(store.history()), [0, 1, 2, 3])
+
+    def test_clear_keeps_counting(self):
+        store = PeripheralStore()
+        self.append(store, 'a', 'UART', 0)
+        self.append(store, 'a', 'UART', 1)
+        store.clear()
+        self.assertEqual(store.sequence_bounds(), (2, 2))
+        self.assertEqual((store.history(), store.for_device('a'), store.latest()), ([], [], None))
+        self.assertEqual(self.append(store, 'a', 'UART', 2)['seq'], 3)
+
+
+class PeripheralSendTests(SimpleTestCase):
+    """
+    peripheral/send/ takes either a JSON body or the raw frame.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        reset_peripherals(self)
+
+    def send_raw(self, body, query='?mcu_id=esp32-lab&instance=GPIO3'):
+        return self.client.post('/api/peripheral/send/' + query, body, content_type='application/octet-stream')
+
+    def test_accepts_raw_frames(self):
+        frame = pack_frame(0x05, bytes([3, 1, 0, 0]))
+        response = self.send_raw(frame)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            (response.json()['peripheral_type'], response.json()['mcu_id'], response.json()['data_length']),
+            ('GPIO', 'esp32-lab', len(frame))
+        )
+        entry = peripheral_store.latest()
+        self.assertEqual((entry['instance'], entry['raw_data']), ('GPIO3', list(frame)))
+        self.assertEqual(entry['hex_data'], 'AA 05 04 03 01 00 00 55')
+
+    def test_rejects_malformed_raw_frames(self):
+        for body, message in [
+            (b'\xAA\x05', 'Frame too short'),
+            (pack_frame(0x05, b'\x03')[:-1] + b'\x00', 'Invalid end byte'),
+            (b'\xAA\x05\x09\x03\x55', 'Length byte'),
+        ]:
+            with self.subTest(message=message):
+                response = self.send_raw(body)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(message, response.json()['message'])
+        self.assertIsNone(peripheral_store.latest())
+
+    def test_accepts_json_frames(self):
+        response = self.client.post('/api/peripheral/send/', {
+            'peripheral_type': 'uart', 'instance': 'UART1', 'mcu_id': 'esp32-lab',
+            'configuration': {'baudRate': 9600}, 'data': list(pack_frame(0x01, b'\x01'))
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(peripheral_store.latest()['configuration'], {'baudRate': 9600})
+        self.assertEqual(peripheral_store.latest()['peripheral_type'], 'UART')
+
+    def test_rejects_other_content_types(self):
+        response = self.client.post('/api/peripheral/send/', 'AA 05 00 55', content_type='text/plain')
+        self.assertEqual(response.status_code, 415)
+        self.assertIn('text/plain', response.json()['detail'])
+        self.assertIsNone(peripheral_store.latest())
+
+
+class PeripheralSendBatchTests(SimpleTestCase):
+    """
+    peripheral/send-batch/ ingests every frame of a batch on its own.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        reset_peripherals(self)
+
+    def record(self, mcu_id, instance, frame):
+        return bytes([len(mcu_id)]) + mcu_id.encode() + bytes([len(instance)]) + instance.encode() + frame
+
+    def test_json_batch_reports_each_frame(self):
+        response = self.client.post('/api/peripheral/send-batch/', {'frames': [
+            {'peripheral_type': 'GPIO', 'instance': 'GPIO1', 'mcu_id': 'a', 'data': 'AA 05 01 01 55'},
+            {'peripheral_type': 'GPIO', 'instance': 'GPIO2', 'mcu_id': 'a', 'data': 'not hex'},
+            {'peripheral_type': 'SPI', 'instance': 'SPI1', 'mcu_id': 'b', 'data': list(pack_frame(0x02, b'\x01'))},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['status'], data['accepted'], data['rejected']), ('partial', 2, 1))
+        self.assertEqual([result['status'] for result in data['results']], ['success', 'error', 'success'])
+        self.assertEqual([entry['instance'] for entry in peripheral_store.history()], ['GPIO1', 'SPI1'])
+
+    def test_binary_batch_skips_malformed_frames(self):
+        body = b''.join([
+            self.record('a', 'UART1', pack_frame(0x01, b'\x01\x02')),
+            self.record('b', 'SPI1', b'\xAB\x02\x00\x55'),
+            self.record('b', 'GPIO4', pack_frame(0x05, b'\x04')),
+        ])
+        response = self.client.post('/api/peripheral/send-batch/?timestamp=1700000000', body,
+                                    content_type='application/octet-stream')
+        data = response.json()
+        self.assertEqual([result['status'] for result in data['results']], ['success', 'error', 'success'])
+        self.assertIn('Invalid start byte', data['results'][1]['message'])
+        entries = peripheral_store.history()
+        self.assertEqual([(entry['mcu_id'], entry['peripheral_type']) for entry in entries], [('a', 'UART'), ('b', 'GPIO')])
+        self.assertEqual(entries[0]['hex_data'], 'AA 01 02 01 02 55')
+        self.assertEqual(entries[1]['hex_data'], 'AA 05 01 04 55')
+
+    def test_truncated_binary_batch_keeps_the_complete_frames(self):
+        body = self.record('a', 'UART1', pack_frame(0x01, b'\x01')) + self.record('a', 'UART2', b'\xAA\x01\x05\x01')
+        data = self.client.post('/api/peripheral/send-batch/', body, content_type='application/octet-stream').json()
+        self.assertEqual((data['status'], data['accepted'], data['rejected']), ('partial', 1, 1))
+        self.assertIn('Truncated frame', data['results'][1]['message'])
+
+    def test_rejects_empty_batches(self):
+        self.assertEqual(self.client.post('/api/peripheral/send-batch/', [], format='json').status_code, 400)
+        self.assertEqual(self.client.post('/api/peripheral/send-batch/', {'frames': {}}, format='json').status_code, 400)
+
+
+class PeripheralLogPipelineTests(SimpleTestCase):
+    """
+    Frames are sampled and filtered on the request thread and written by a
+    background thread.
+    """
+
+    def record(self, level=logging.INFO, **fields):
+        record = logging.LogRecord('api.peripherals', level, __file__, 0, 'Frame for %s', ('esp32',), None)
+        record.__dict__.update(fields)
+        return record
+
+    def test_sampler_counts_per_mcu(self):
+        sampler = FrameSampler(rate=3)
+        passed = [sampler.filter(self.record(mcu_id=mcu_id)) for mcu_id in ['a', 'b'] * 6]
+        self.assertEqual(passed.count(True), 4)
+        self.assertEqual(passed[:2], [True, True])
+        self.assertTrue(sampler.filter(self.record(logging.WARNING, mcu_id='a')))
+        self.assertTrue(sampler.filter(self.record()))
+
+    def test_sampler_counters_are_bounded(self):
+        sampler = FrameSampler(rate=2, slots=8)
+        for index in range(1000):
+            sampler.filter(self.record(mcu_id=f'mcu-{index}'))
+        self.assertEqual(len(sampler._counters), 8)
+
+    def test_level_filter_per_peripheral_type(self):
+        levels = PeripheralLevelFilter({'gpio': 'WARNING'}, default='INFO')
+        self.assertFalse(levels.filter(self.record(peripheral_type='GPIO')))
+        self.assertTrue(levels.filter(self.record(logging.ERROR, peripheral_type='GPIO')))
+        self.assertTrue(levels.filter(self.record(peripheral_type='UART')))
+        self.assertFalse(levels.filter(self.record(logging.DEBUG, peripheral_type='UART')))
+
+    def test_json_lines_carry_the_extra_fields(self):
+        line = json.loads(JsonFormatter().format(self.record(mcu_id='esp32', frame={'command': 1})))
+        self.assertEqual(line['message'], 'Frame for esp32')
+        self.assertEqual((line['level'], line['mcu_id'], line['frame']), ('INFO', 'esp32', {'command': 1}))
+
+    def test_full_queue_drops_records(self):
+        # Stopped here rather than at exit, so the records stay queued
+        with mock.patch('atexit.register'):
+            handler = BackgroundQueueHandler(maxsize=2)
+        handler.listener.stop()
+        for _ in range(5):
+            handler.handle(self.record(mcu_id='esp32'))
+        self.assertEqual((handler.queue.qsize(), handler.dropped), (2, 3))
+
+
+class PeripheralStreamTests(SimpleTestCase):
+    """
+    Accepted frames are pushed to matching peripheral/stream/ subscribers.
+    """
+
+    def setUp(self):
+        reset_peripherals(self)
+
+    async def test_publishes_to_matching_subscriptions(self):
+        hub = SubscriptionHub()
+        everything = hub.subscribe()
+        device = hub.subscribe('a')
+        uart = hub.subscribe('a', 'uart', maxsize=2)
+        other = hub.subscribe('b')
+        for index in range(3):
+            self.assertEqual(hub.publish({'mcu_id': 'a', 'peripheral_type': 'UART', 'index': index}), 3)
+        self.assertEqual(len(await everything.drain()), 3)
+        self.assertEqual(len(await device.drain()), 3)
+        self.assertEqual([json.loads(payload)['index'] for payload in await uart.drain()], [1, 2])
+        self.assertEqual(uart.dropped, 1)
+        self.assertFalse(other._queue)
+        hub.unsubscribe(everything)
+        self.assertEqual(len(hub), 3)
+
+    async def test_streams_frames_as_events(self):
+        response = await self.async_client.get('/api/peripheral/stream/', {'mcu_id': 'esp32'})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = aiter(response.streaming_content)
+        self.assertEqual(await anext(events), b'retry: 3000\n\n')
+        # The subscription exists once the first event was sent
+        pending = asyncio.ensure_future(anext(events))
+        await asyncio.sleep(0)
+        peripheral_hub.publish({'mcu_id': 'other', 'peripheral_type': 'GPIO'})
+        peripheral_hub.publish({'mcu_id': 'esp32', 'peripheral_type': 'GPIO', 'seq': 7})
+        event = await asyncio.wait_for(pending, 5)
+        self.assertTrue(event.startswith(b'event: frame\ndata: '))
+        self.assertEqual(json.loads(event.split(b'data: ', 1)[1])['seq'], 7)
+        await events.aclose()
+
+    def test_needs_asgi(self):
+        self.assertEqual(APIClient().get('/api/peripheral/stream/').status_code, 501)
+
+
+class SegmentedLogTests(SimpleTestCase):
+    """
+    The durable history answers time-range queries across segments, whichever
+    process wrote them.
+    """
+
+    def setUp(self):
+        reset_peripherals(self)
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def create_log(self, **options):
+        log = SegmentedLog(self.directory.name, **options)
+        self.addCleanup(log.close)
+        return log
+
+    def timestamps(self, records):
+        return [timestamp_us // 1_000_000 for timestamp_us, _, _, _ in records]
+
+    def segment_files(self):
+        return sorted(path.name for path in Path(self.directory.name).iterdir() if path.suffix == '.log')
+
+    def test_queries_time_ranges(self):
+        log = self.create_log(index_interval=32)
+        for second in range(10):
+            log.append('a' if second % 2 else 'b', 0x05, pack_frame(0x05, bytes([second])), timestamp=1000 + second)
+        log.flush()
+        self.assertEqual(self.timestamps(log.query(since=1003, until=1006)), [1003, 1004, 1005, 1006])
+        self.assertEqual(self.timestamps(log.query(since=1003, mcu_id='a')), [1003, 1005, 1007, 1009])
+        self.assertEqual(self.timestamps(log.query(until=1004, limit=2)), [1000, 1001])
+        timestamp_us, mcu_id, command, raw_bytes = log.query(since=1009)[0]
+        self.assertEqual((mcu_id, command, bytes(raw_bytes)), ('a', 0x05, pack_frame(0x05, b'\x09')))
+
+    def test_keeps_timestamps_sorted(self):
+        log = self.create_log(index_interval=1)
+        for timestamp in [1000, 1002, 1001, 1002, 1002, 1003]:
+            log.append('a', 0x01, b'', timestamp=timestamp)
+        log.flush()
+        self.assertEqual(self.timestamps(log.query()), [1000, 1002, 1002, 1002, 1002, 1003])
+        # Every record of the first indexed timestamp, not just the indexed one
+        self.assertEqual(self.timestamps(log.query(since=1002, until=1002)), [1002] * 4)
+
+    def test_rolls_and_deletes_old_segments(self):
+        # Recent enough for the default retention
+        start = int(time.time()) - 3600
+        log = self.create_log(segment_bytes=100, segment_seconds=60, index_interval=1)
+        for second in range(6):
+            log.append('a', 0x01, bytes(40), timestamp=start + second)
+        log.append('a', 0x01, b'', timestamp=start + 100)
+        log.flush()
+        self.assertEqual(len(self.segment_files()), 4)
+        self.assertEqual(
+            [second - start for second in self.timestamps(log.query(since=start + 1))], [1, 2, 3, 4, 5, 100]
+        )
+
+        log.retention_bytes = 100
+        log.enforce_retention()
+        self.assertEqual(self.segment_files(), [f'{(start + 100) * 1_000_000:020d}.log'])
+        self.assertEqual(self.timestamps(log.query()), [start + 100])
+
+    def test_processes_share_a_log(self):
+        log = self.create_log(segment_bytes=2000, index_interval=64)
+        log.append('parent', 0x01, b'\x00')
+        log.flush()
+
+        def write(name):
+            for index in range(200):
+                log.append(name, 0x01, bytes(index % 7))
+            log.close()
+
+        context = multiprocessing.get_context('fork')
+        workers = [context.Process(target=write, args=(f'worker-{index}',)) for index in range(2)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(30)
+            self.assertEqual(worker.exitcode, 0)
+
+        records = log.query()
+        self.assertEqual(len(records), 401)
+        self.assertEqual([record[0] for record in records], sorted(record[0] for record in records))
+        for segment in self.segment_files():
+            data = (Path(self.directory.name) / segment).read_bytes()
+            boundaries = set()
+            position = 0
+            while position < len(data):
+                boundaries.add(position)
+                _, _, mcu_length, raw_length = RECORD_HEADER.unpack_from(data, position)
+                position += RECORD_HEADER.size + mcu_length + raw_length
+            self.assertEqual(position, len(data))
+            index = (Path(self.directory.name) / segment).with_suffix('.idx').read_bytes()
+            self.assertLessEqual({entry[1] for entry in INDEX_ENTRY.iter_unpack(index)}, boundaries)
+
+    def test_history_endpoint_queries_the_log(self):
+        log = self.create_log()
+        with mock.patch('api.peripherals.ingest.peripheral_history_log', log), \
+                mock.patch('api.views.peripheral_history_log', log):
+            client = APIClient()
+            before = time.time()
+            client.post('/api/peripheral/send/?mcu_id=esp32', pack_frame(0x05, bytes([3, 1, 0, 0])),
+                        content_type='application/octet-stream')
+            log.flush()
+            response = client.get('/api/peripheral/history/', {'since': before - 1, 'mcu_id': 'esp32'})
+            for limit in (0, -1):
+                self.assertEqual(client.get('/api/peripheral/history/', {'since': before - 1, 'limit': limit}).status_code, 400)
+        self.assertEqual(response.status_code, 200)
+        entry = response.json()['data'][0]
+        self.assertEqual((entry['peripheral_type'], entry['decoded']['pin']), ('GPIO', 3))
+        self.assertEqual(APIClient().get('/api/peripheral/history/', {'since': 'yesterday'}).status_code, 400)
+
+
+class SharedPeripheralStoreTests(SimpleTestCase):
+    """
+    Worker processes append to and read from one memory-mapped ring.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = Path(self.directory.name) / 'peripherals'
+
+    def entry(self, mcu_id, peripheral_type='UART', **fields):
+        return {'mcu_id': mcu_id, 'peripheral_type': peripheral_type, **fields}
+
+    def test_reads_filter_by_type_and_device(self):
+        store = SharedPeripheralStore(self.path, capacity=3, slot_count=8, slot_size=256)
+        for index, (mcu_id, peripheral_type) in enumerate([('a', 'UART'), ('b', 'SPI'), ('a', 'SPI'), ('a', 'UART')]):
+            store.append(self.entry(mcu_id, peripheral_type, index=index))
+        reader = SharedPeripheralStore(self.path, capacity=3)
+        self.assertEqual([entry['index'] for entry in reader.history()], [1, 2, 3])
+        self.assertEqual([entry['index'] for entry in reader.by_type('spi')], [1, 2])
+        self.assertEqual([entry['index'] for entry in reader.for_device('a', after_seq=1)], [2, 3])
+        self.assertEqual(reader.latest()['seq'], 4)
+        reader.clear()
+        self.assertEqual((store.history(), store.sequence_bounds()), ([], (4, 4)))
+
+    def test_truncates_entries_too_large_for_a_slot(self):
+        store = SharedPeripheralStore(self.path, slot_count=4, slot_size=256)
+        store.append(self.entry('a', raw_data=list(range(100)), hex_data='AA'))
+        entry = store.latest()
+        self.assertTrue(entry['truncated'])
+        self.assertNotIn('raw_data', entry)
+        self.assertEqual(entry['hex_data'], 'AA')
+
+    def test_forked_workers_do_not_overwrite_each_other(self):
+        store = SharedPeripheralStore(self.path, capacity=5000, stream_capacity=5000, slot_count=4096, slot_size=256)
+        # Opens the parent's descriptor before the workers inherit it
+        store.append(self.entry('parent', index=0))
+
+        def write(mcu_id):
+            for index in range(1000):
+                store.append(self.entry(mcu_id, index=index))
+
+        context = multiprocessing.get_context('fork')
+        workers = [context.Process(target=write, args=(f'worker-{index}',)) for index in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(30)
+            self.assertEqual(worker.exitcode, 0)
+
+        entries = store.history()
+        self.assertEqual([entry['seq'] for entry in entries], list(range(1, 4002)))
+        for index in range(4):
+            self.assertEqual([entry['index'] for entry in store.for_device(f'worker-{index}')], list(range(1000)))
+
+
+class FrameDecoderTests(SimpleTestCase):
+    """
+    Frames are decoded into typed configurations with the frontend's layouts.
+    """
+
+    def test_decodes_uart_frames(self):
+        payload = struct.pack('>BIBBBBBBHHBBBB', 1, 115200, 8, 1, 20, 3, 0xC0, 16, 256, 512, 9, 10, 0xFF, 12)
+        decoded = decode_frame(pack_frame(0x01, payload + bytes(4)))
+        self.assertEqual(decoded['peripheral_type'], 'UART')
+        self.assertEqual((decoded['baud_rate'], decoded['parity'], decoded['stop_bits']), (115200, 'even', 2.0))
+        self.assertEqual((decoded['flow_control'], decoded['dma_enable'], decoded['auto_baud']), ('rts_cts', True, False))
+        self.assertEqual((decoded['rx_buffer_size'], decoded['rts_pin'], decoded['cts_pin']), (512, None, 12))
+
+    def test_decodes_i2c_and_pwm_frames(self):
+        i2c = decode_frame(pack_frame(0x03, struct.pack('>BBIBBBB', 1, 0x3C, 400000, 1, 0x90, 20, 21)))
+        self.assertEqual((i2c['address'], i2c['clock_speed'], i2c['duty_cycle']), (0x3C, 400000, '16_9'))
+        self.assertEqual((i2c['general_call'], i2c['interrupt_enable'], i2c['no_stretch']), (True, True, False))
+        pwm = decode_frame(pack_frame(0x04, struct.pack('>BIHB', 2, 1000, 2550, 5)))
+        self.assertEqual((pwm['frequency'], pwm['duty_cycle'], pwm['output_pin']), (1000, 25.5, 5))
+
+    def test_undecodable_frames(self):
+        self.assertIsNone(decode_frame(pack_frame(0x09, b'\x01')))
+        self.assertIsNone(decode_frame(pack_frame(0x01, b'\x01\x02')))
+        self.assertIsNone(decode_frame(b'\xAA\x05\x04\x01\x55'))
+
+    def test_entries_carry_the_decoded_frame(self):
+        reset_peripherals(self)
+        APIClient().post('/api/peripheral/send/?mcu_id=esp32', pack_frame(0x05, bytes([13, 1, 0, 1])),
+                         content_type='application/octet-stream')
+        self.assertEqual(peripheral_store.latest()['decoded'], {
+            'peripheral_type': 'GPIO', 'pin': 13, 'direction': 'output', 'pull_up': False, 'pull_down': True
+        })
+
+
+class FrameDeduplicationTests(SimpleTestCase):
+    """
+    A frame repeating the last one of its peripheral instance is counted on
+    the stored entry instead of being stored again.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        reset_peripherals(self)
+
+    def send(self, frame, instance='GPIO3'):
+        response = self.client.post(f'/api/peripheral/send/?mcu_id=esp32&instance={instance}', frame,
+                                    content_type='application/octet-stream')
+        return response.json()
+
+    def test_counts_repeats_per_instance(self):
+        first = pack_frame(0x05, bytes([3, 1, 0, 0]))
+        self.assertFalse(self.send(first)['repeated'])
+        self.assertTrue(self.send(first)['repeated'])
+        self.assertFalse(self.send(first, instance='GPIO4')['repeated'])
+        self.assertFalse(self.send(pack_frame(0x05, bytes([3, 0, 0, 0])))['repeated'])
+        self.assertFalse(self.send(first)['repeated'])
+        entries = peripheral_store.history()
+        self.assertEqual([entry['repeat_count'] for entry in entries], [1, 0, 0, 0])
+        self.assertEqual(entries[0]['last_repeat_timestamp'], '"unknown"')
+
+    def test_concurrent_identical_frames_are_stored_once(self):
+        deduplicator = FrameDeduplicator()
+        store = PeripheralStore()
+        building = threading.Event()
+        release = threading.Event()
+        results = []
+
+        def build_slowly():
+            building.set()
+            release.wait(5)
+            return {'mcu_id': 'esp32', 'peripheral_type': 'GPIO', 'repeat_count': 0}
+
+        def admit(build_entry):
+            results.append(deduplicator.admit(('esp32', 'GPIO', 'GPIO3'), b'digest', '1', store, build_entry))
+
+        first = threading.Thread(target=admit, args=(build_slowly,))
+        first.start()
+        building.wait(5)
+        second = threading.Thread(target=admit, args=(lambda: self.fail('Built twice'),))
+        second.start()
+        # Gives the second frame time to reach the check while the first is built
+        time.sleep(0.05)
+        release.set()
+        first.join(5)
+        second.join(5)
+        self.assertEqual([repeated for _, repeated in results], [False, True])
+        self.assertEqual([entry['repeat_count'] for entry in store.history()], [1])
+
+    def test_shared_store_readers_see_the_count(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = Path(directory.name) / 'peripherals'
+        writer = SharedPeripheralStore(path, slot_count=8, slot_size=512)
+        reader = SharedPeripheralStore(path)
+        deduplicator = FrameDeduplicator()
+        entry = {'mcu_id': 'esp32', 'peripheral_type': 'GPIO', 'repeat_count': 0}
+        deduplicator.admit(('esp32', 'GPIO', 'GPIO3'), b'digest', '1', writer, lambda: entry)
+        self.assertEqual(reader.latest()['repeat_count'], 0)
+        deduplicator.admit(('esp32', 'GPIO', 'GPIO3'), b'digest', '2', writer, dict)
+        self.assertEqual((reader.latest()['repeat_count'], reader.latest()['last_repeat_timestamp']), (1, '2'))
+
+
+class PeripheralRateLimitTests(SimpleTestCase):
+    """
+    Every device gets its own token bucket on the ingestion endpoints.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        reset_peripherals(self)
+        self.now = 1000.0
+        self.limiter = TokenBucketLimiter(burst=2, refill_rate=0.5, clock=lambda: self.now)
+        for target in ('api.peripherals.throttle.peripheral_limiter', 'api.views.peripheral_limiter'):
+            patcher = mock.patch(target, self.limiter)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def send(self, mcu_id, value):
+        return self.client.post(f'/api/peripheral/send/?mcu_id={mcu_id}', pack_frame(0x05, bytes([value, 1, 0, 0])),
+                                content_type='application/octet-stream')
+
+    def test_buckets_refill_over_time(self):
+        self.assertEqual([self.limiter.acquire(('a', 'GPIO')) for _ in range(2)], [0.0, 0.0])
+        self.assertEqual(self.limiter.acquire(('a', 'GPIO')), 2.0)
+        self.assertEqual(self.limiter.acquire(('a', 'UART')), 0.0)
+        self.now += 1
+        self.assertEqual(self.limiter.acquire(('a', 'GPIO')), 1.0)
+        self.now += 1
+        self.assertEqual(self.limiter.acquire(('a', 'GPIO')), 0.0)
+        stats = self.limiter.stats()
+        self.assertEqual((stats['allowed'], stats['throttled']), (4, 2))
+        self.assertEqual(stats['top_throttled'], [{'mcu_id': 'a', 'peripheral_type': 'GPIO', 'throttled': 2}])
+
+    def test_send_answers_429_per_device(self):
+        self.assertEqual([self.send('a', value).status_code for value in range(2)], [200, 200])
+        response = self.send('a', 2)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '2')
+        self.assertEqual(self.send('b', 0).status_code, 200)
+        self.assertEqual(len(peripheral_store.history()), 3)
+
+    def test_batches_throttle_frame_by_frame(self):
+        frames = [
+            {'peripheral_type': 'GPIO', 'mcu_id': mcu_id, 'instance': f'GPIO{index}', 'data': list(pack_frame(0x05, bytes([index])))}
+            for index, mcu_id in enumerate(['a', 'a', 'a', 'b'])
+        ]
+        response = self.client.post('/api/peripheral/send-batch/', frames, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['status'] for result in response.json()['results']], ['success', 'success', 'throttled', 'success'])
+        self.assertEqual((response.json()['throttled'], response['Retry-After']), (1, '2'))
+
+        response = self.client.post('/api/peripheral/send-batch/', frames[:1], format='json')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.json()['status'], 'error')
+
+    def test_unhashable_device_ids_are_keyed_as_text(self):
+        for mcu_id in (['a'], {'id': 'a'}):
+            response = self.client.post('/api/peripheral/send/', {'mcu_id': mcu_id, 'peripheral_type': 'GPIO'}, format='json')
+            self.assertLess(response.status_code, 500)
+        self.assertEqual(self.limiter.stats()['allowed'], 2)
+
+    def test_stats_list_the_throttled_devices(self):
+        for value in range(3):
+            self.send('a', value)
+        data = self.client.get('/api/peripheral/stats/').json()
+        self.assertEqual(data['rate_limit']['top_throttled'][0]['mcu_id'], 'a')
+        self.assertEqual(data['rate_limit']['throttled'], 1)
+
+
+class DeviceDispatchTests(SimpleTestCase):
+    """
+    Accepted frames reach their board in order, across failed writes and reconnections.
+    """
+
+    frames = [pack_frame(0x05, bytes([index])) for index in range(5)]
+
+    async def eventually(self, condition, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                self.fail('Condition not met in time')
+            await asyncio.sleep(0.01)
+
+    async def shutdown(self, channel, loopback):
+        await channel.close()
+        await loopback.close()
+
+    async def test_writes_queued_frames_in_one_batch(self):
+        loopback = LoopbackTransport()
+        connect, batches = loopback.connect, []
+
+        async def recording_connect():
+            reader, writer = await connect()
+            writelines = writer.writelines
+            writer.writelines = lambda frames: (batches.append(list(frames)), writelines(frames))
+            return reader, writer
+
+        loopback.connect = recording_connect
+        channel = DeviceChannel('esp32', loopback)
+        for frame in self.frames[:3]:
+            channel.put(frame)
+        await self.eventually(lambda: channel.sent == 3)
+        for frame in self.frames[3:]:
+            channel.put(frame)
+        await self.eventually(lambda: channel.received == len(b''.join(self.frames)))
+        self.assertEqual(batches, [self.frames[:3], self.frames[3:]])
+        self.assertEqual(bytes(loopback.received), b''.join(self.frames))
+        self.assertEqual(channel.stats()['sent'], 5)
+        await self.shutdown(channel, loopback)
+
+    async def test_requeues_at_the_head_when_drain_fails(self):
+        loopback = LoopbackTransport()
+        connect, opened = loopback.connect, []
+
+        async def failing_connect():
+            reader, writer = await connect()
+            opened.append(writer)
+            if len(opened) == 1:
+                async def drain():
+                    # A frame queued while the failing batch was in flight
+                    channel.put(self.frames[2])
+                    raise ConnectionResetError
+                writer.writelines = lambda frames: None
+                writer.drain = drain
+            return reader, writer
+
+        loopback.connect = failing_connect
+        channel = DeviceChannel('esp32', loopback, min_backoff=0.01)
+        channel.put(self.frames[0])
+        channel.put(self.frames[1])
+        await self.eventually(lambda: channel.sent == 3)
+        self.assertEqual(bytes(loopback.received), b''.join(self.frames[:3]))
+        self.assertEqual((channel.errors, len(opened)), (1, 2))
+        await self.shutdown(channel, loopback)
+
+    async def test_reconnects_with_backoff(self):
+        loopback = LoopbackTransport()
+        connect, attempts = loopback.connect, []
+
+        async def refusing_connect():
+            attempts.append(time.monotonic())
+            if len(attempts) <= 4:
+                raise ConnectionRefusedError
+            return await connect()
+
+        loopback.connect = refusing_connect
+        channel = DeviceChannel('esp32', loopback, max_backoff=0.05, min_backoff=0.02)
+        channel.put(self.frames[0])
+        await self.eventually(lambda: channel.sent == 1)
+        waits = [later - earlier for earlier, later in zip(attempts, attempts[1:])]
+        for waited, backoff in zip(waits, [0.02, 0.04, 0.05, 0.05]):
+            self.assertGreater(waited, backoff - 0.005)
+        self.assertEqual(channel.errors, 4)
+        await self.shutdown(channel, loopback)
+
+    async def test_reconnects_when_the_device_hangs_up(self):
+        loopback = LoopbackTransport()
+        channel = DeviceChannel('esp32', loopback)
+        channel.put(self.frames[0])
+        await self.eventually(lambda: channel.connected and loopback.received_bytes == len(self.frames[0]))
+        await loopback.hang_up()
+        await self.eventually(lambda: not channel.connected)
+        channel.put(self.frames[1])
+        await self.eventually(lambda: loopback.received_bytes == len(b''.join(self.frames[:2])))
+        self.assertEqual(loopback.connections, 2)
+        await self.shutdown(channel, loopback)
+
+    async def test_queued_frames_survive_a_closing_connection(self):
+        loopback = LoopbackTransport()
+        connect, opened = loopback.connect, []
+
+        async def closed_connect():
+            reader, writer = await connect()
+            opened.append(writer)
+            if len(opened) == 1:
+                writer.close()
+                return None, writer
+            return reader, writer
+
+        loopback.connect = closed_connect
+        channel = DeviceChannel('esp32', loopback, min_backoff=0.01)
+        channel.put(self.frames[0])
+        await self.eventually(lambda: channel.sent == 1, timeout=2)
+        self.assertEqual(bytes(loopback.received), self.frames[0])
+        await self.shutdown(channel, loopback)
+
+    async def test_loopback_keeps_the_latest_bytes(self):
+        loopback = LoopbackTransport(keep=4)
+        channel = DeviceChannel('esp32', loopback)
+        channel.put(bytes(range(10)))
+        await self.eventually(lambda: loopback.received_bytes == 10)
+        self.assertEqual(bytes(loopback.received), bytes(range(6, 10)))
+        await self.shutdown(channel, loopback)
+
+    def test_sent_frames_are_dispatched(self):
+        reset_peripherals(self)
+        dispatcher = DeviceDispatcher({'*': 'loopback://'})
+        self.addCleanup(dispatcher.close)
+        for target in ('api.peripherals.ingest.device_dispatcher', 'api.views.device_dispatcher'):
+            patcher = mock.patch(target, dispatcher)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        client = APIClient()
+        for frame in self.frames[:2]:
+            client.post('/api/peripheral/send/?mcu_id=esp32', frame, content_type='application/octet-stream')
+        loopback = dispatcher.route('esp32')
+        deadline = time.monotonic() + 5
+        while bytes(loopback.received) != b''.join(self.frames[:2]) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(bytes(loopback.received), b''.join(self.frames[:2]))
+        stats = client.get('/api/peripheral/stats/').json()['devices']
+        self.assertEqual((stats[0]['mcu_id'], stats[0]['sent']), ('esp32', 2))
+
+
+class PeripheralHistoryPagingTests(SimpleTestCase):
+    """
+    Pollers page through the in-memory history by seq and revalidate with ETags.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        reset_peripherals(self)
+        # Clearing the store keeps its sequence going; entries here count from base + 1
+        self.base = peripheral_store.sequence_bounds()[1]
+        # Alternating GPIO and UART frames, base + 1 to base + 6
+        for index in range(6):
+            self.client.post('/api/peripheral/send/?mcu_id=esp32', pack_frame(0x05 if index % 2 == 0 else 0x01, bytes([index])),
+                             content_type='application/octet-stream')
+
+    def seqs(self, response):
+        return [entry['seq'] - self.base for entry in response.json()['data']]
+
+    def get(self, path, after_seq=None, etag=None, **params):
+        if after_seq is not None:
+            params['after_seq'] = self.base + after_seq
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(path, params, **headers)
+
+    def test_pages_after_a_seq(self):
+        response = self.get('/api/peripheral/history/', after_seq=2, limit=3)
+        self.assertEqual(self.seqs(response), [3, 4, 5])
+        self.assertEqual(response.json()['last_seq'], self.base + 6)
+        self.assertEqual(self.seqs(self.get('/api/peripheral/history/', after_seq=5, limit=3)), [6])
+        self.assertEqual(self.seqs(self.get('/api/peripheral/history/', after_seq=6)), [])
+        # Without after_seq, limit keeps the newest entries
+        self.assertEqual(self.seqs(self.get('/api/peripheral/history/', limit=2)), [5, 6])
+        response = self.get('/api/peripheral/history/', after_seq=2, mcu_id='esp32', peripheral_type='uart')
+        self.assertEqual(self.seqs(response), [4, 6])
+
+    def test_rejects_invalid_pages(self):
+        for params in ({'after_seq': -1}, {'after_seq': 'x'}, {'limit': 0}):
+            self.assertEqual(self.client.get('/api/peripheral/history/', params).status_code, 400)
+            self.assertEqual(self.client.get('/api/peripheral/view/gpio/', params).status_code, 400)
+
+    def test_answers_304_until_something_is_stored(self):
+        etag = self.get('/api/peripheral/history/')['ETag']
+        response = self.get('/api/peripheral/history/', etag=etag)
+        self.assertEqual((response.status_code, response.content, response['ETag']), (304, b'', etag))
+        self.assertEqual(self.get('/api/peripheral/history/', etag=f'"x", W/{etag}').status_code, 304)
+
+        self.client.post('/api/peripheral/send/?mcu_id=esp32', pack_frame(0x05, b'\x09'), content_type='application/octet-stream')
+        response = self.get('/api/peripheral/history/', after_seq=6, etag=etag)
+        self.assertEqual((response.status_code, self.seqs(response)), (200, [7]))
+        self.assertNotEqual(response['ETag'], etag)
+
+        etag = response['ETag']
+        peripheral_store.clear()
+        self.assertEqual(self.get('/api/peripheral/history/', etag=etag).status_code, 200)
+
+    def test_pages_by_type(self):
+        response = self.get('/api/peripheral/view/gpio/', after_seq=1, limit=1)
+        self.assertEqual((self.seqs(response), response.json()['last_seq']), ([3], self.base + 6))
+        self.assertEqual(self.seqs(self.get('/api/peripheral/view/gpio/', limit=2)), [3, 5])
+        self.assertEqual(self.get('/api/peripheral/view/gpio/', etag=response['ETag']).status_code, 304)
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Listing and retrieving through the nested serializers must cost a fixed
+    number of queries, however many objects are rendered.
+
+    A failure here usually means a serializer gained a relation that the
+    viewset's query plan (`api.query_planning`) does not cover.
+    """
+
+    # Queries per list request: the `ModelVersion` lookup of the conditional
+    # GET, the main query and one per prefetched relation. The
+    # microcontrollers' `current_user` is rendered with its groups and
+    # permissions because of `Meta.depth`.
+    list_budgets = {
+        '/api/microcontrollers/': 4,
+        '/api/projects/': 5,
+        '/api/codeexecutions/': 5,
+        '/api/userprofiles/': 6,
+        '/api/tutorials/': 4,
+        '/api/tutorialprogress/': 4,
+        '/api/casestudies/': 2,
+        '/api/contactinquiries/': 2,
+        '/api/platformstats/': 2,
+        '/api/teammembers/': 2,
+        '/api/resources/': 2,
+    }
+
+    def setUp(self):
+        self.client = APIClient()
+        clear_response_cache()
+
+    def assert_list_budgets(self):
+        for url, budget in self.list_budgets.items():
+            with self.subTest(url=url), self.assertNumQueries(budget):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_list_budgets(self):
+        create_catalog(3)
+        self.assert_list_budgets()
+
+    def test_list_budgets_do_not_grow_with_rows(self):
+        create_catalog(12)
+        self.assert_list_budgets()
+
+    def test_retrieve_budgets(self):
+        create_catalog(1)
+        budgets = {
+            f'/api/projects/{Project.objects.get().pk}/': 5,
+            f'/api/codeexecutions/{CodeExecution.objects.get().pk}/': 5,
+            f'/api/tutorialprogress/{TutorialProgress.objects.get().pk}/': 4,
+        }
+        for url, budget in budgets.items():
+            with self.subTest(url=url), self.assertNumQueries(budget):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+
+class KeysetPaginationTests(TestCase):
+    """
+    List endpoints page forwards and backwards through Link header cursors.
+    """
+
+    def setUp(self):
+        clear_response_cache()
+        self.client = APIClient()
+        # Only the primary key tells most members apart
+        for index in range(7):
+            TeamMember.objects.create(name='Same' if index < 5 else f'Member {index}', role='Dev', bio='...', order=index // 3)
+        self.expected = [str(pk) for pk in TeamMember.objects.order_by('order', 'name', 'pk').values_list('pk', flat=True)]
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        links = {rel: link for link, rel in re.findall(r'<([^>]+)>; rel="(\w+)"', response.get('Link', ''))}
+        return [member['id'] for member in response.json()], links
+
+    def test_pages_forwards_and_backwards_across_ties(self):
+        pages, links = [], {'next': '/api/teammembers/?page_size=2'}
+        while 'next' in links:
+            page, links = self.get(links['next'])
+            pages.append(page)
+        self.assertEqual([len(page) for page in pages], [2, 2, 2, 1])
+        self.assertEqual(sum(pages, []), self.expected)
+        self.assertIn('page_size=2', links['prev'])
+
+        backwards = [pages[-1]]
+        while 'prev' in links:
+            page, links = self.get(links['prev'])
+            backwards.append(page)
+        self.assertEqual(backwards[::-1], pages)
+
+    def test_rows_added_meanwhile_are_not_repeated(self):
+        page, links = self.get('/api/teammembers/?page_size=3')
+        TeamMember.objects.create(name='Same', role='Dev', bio='...', order=-1)
+        rest, links = self.get(links['next'] + '&page_size=10')
+        self.assertEqual(page + rest, self.expected)
+        self.assertNotIn('next', links)
+
+    def test_rejects_invalid_cursors(self):
+        response = self.client.get('/api/teammembers/', {'cursor': 'not a cursor'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('cursor', response.json())
+        wrong_size = encode_cursor([0])
+        self.assertEqual(self.client.get('/api/teammembers/', {'cursor': wrong_size}).status_code, 400)
+
+
+class IndexPlanTests(TestCase):
+    """
+    Every indexed access path, list endpoints and filtered lookups, is planned with its index.
+    """
+
+    def test_access_paths_use_their_index(self):
+        create_catalog(3)
+        command = benchmark_indexes.Command()
+        paths = command._access_paths()
+        for label, index_name, queryset in paths:
+            with self.subTest(label):
+                self.assertIn(index_name, queryset.explain())
+        # No index goes without a query
+        declared = {index.name for model in benchmark_indexes.INDEXED_MODELS for index in model._meta.indexes}
+        self.assertEqual(declared, {index_name for _, index_name, _ in paths})
+
+
+class SparseFieldsTests(TestCase):
+    """
+    `?fields=` and `?expand=` trim the rendered fields and the loaded columns.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        clear_response_cache()
+        create_catalog(3)
+
+    def test_fields_select_columns_and_nested_fields(self):
+        with self.assertNumQueries(2) as queries:
+            response = self.client.get('/api/codeexecutions/?fields=id,execution_status,project.title')
+        self.assertEqual(response.status_code, 200)
+        for row in response.json():
+            self.assertEqual(set(row), {'id', 'execution_status', 'project'})
+            self.assertEqual(set(row['project']), {'title'})
+        self.assertNotIn('code_content', queries.captured_queries[-1]['sql'])
+
+    def test_unexpanded_relations_render_as_primary_keys(self):
+        execution = CodeExecution.objects.first()
+        response = self.client.get(f'/api/codeexecutions/{execution.pk}/?expand=project')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['user'], execution.user_id)
+        self.assertEqual(response.json()['project']['owner'], execution.project.owner_id)
+        self.assertEqual(
+            sorted(response.json()['project']['collaborators']),
+            sorted(execution.project.collaborators.values_list('pk', flat=True))
+        )
+
+    def test_unknown_fields_are_rejected(self):
+        self.assertEqual(self.client.get('/api/projects/?fields=title,nope').status_code, 400)
+        self.assertEqual(self.client.get('/api/projects/?expand=title').status_code, 400)
+
+
+class FastReadTests(TestCase):
+    """
+    Lists rendered through `api.fast_read` must match the serializers' output
+    byte for byte.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        clear_response_cache()
+        create_catalog(4)
+        Microcontroller.objects.create(
+            name='Spare board \u00e9', type='STM32', description='Unassigned',
+            specifications={'clock_hz': 1.5e8, 'notes': '\u2028'}
+        )
+        User.objects.first().groups.add(Group.objects.create(name='lab'))
+
+    def assert_matches_serializer(self, url, model, serializer_class):
+        response = self.client.get(url + '?page_size=3')
+        self.assertEqual(response.status_code, 200)
+        queryset = optimize_queryset(model.objects.order_by(*model._meta.ordering, 'pk'), serializer_class)
+        expected = JSONRenderer().render(serializer_class(queryset[:3], many=True).data)
+        self.assertEqual(response.content, expected)
+
+    def test_microcontrollers_match_serializer(self):
+        self.assert_matches_serializer('/api/microcontrollers/', Microcontroller, MicrocontrollerSerializer)
+
+    def test_projects_match_serializer(self):
+        self.assert_matches_serializer('/api/projects/', Project, ProjectSerializer)
+
+
+class ConditionalGetTests(TestCase):
+    """
+    List and detail responses carry validators that change with the data
+    they render, and repeating them gets a 304 without rendering.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        clear_response_cache()
+        create_catalog(2)
+
+    def test_unchanged_list_is_not_modified(self):
+        response = self.client.get('/api/projects/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-cache', response['Cache-Control'])
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/projects/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get('/api/microcontrollers/')['Last-Modified']
+        response = self.client.get('/api/microcontrollers/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_changes_to_nested_objects_change_the_etag(self):
+        etag = self.client.get('/api/projects/')['ETag']
+        user = User.objects.first()
+        user.first_name = 'Renamed'
+        user.save()
+        response = self.client.get('/api/projects/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        etag = response['ETag']
+        Project.objects.first().collaborators.clear()
+        self.assertEqual(self.client.get('/api/projects/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_query_parameters_change_the_etag(self):
+        etag = self.client.get('/api/projects/')['ETag']
+        self.assertNotEqual(self.client.get('/api/projects/?fields=id')['ETag'], etag)
+
+
+class ResponseCacheTests(TestCase):
+    """
+    Read-mostly endpoints are served from the response cache until the data
+    they render changes.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        clear_response_cache()
+        create_catalog(2)
+
+    def test_repeated_requests_do_not_query(self):
+        first = self.client.get('/api/tutorials/')
+        self.assertEqual(first['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/tutorials/')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(response_cache.stats()['api.Tutorial'], {'hits': 1, 'misses': 1})
+
+    def test_hits_answer_conditional_requests(self):
+        etag = self.client.get('/api/tutorials/')['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/tutorials/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_changes_to_rendered_models_invalidate(self):
+        self.client.get('/api/tutorials/')
+        board = Microcontroller.objects.first()
+        board.name = 'Renamed board'
+        board.save()
+        response = self.client.get('/api/tutorials/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertIn(b'Renamed board', response.content)
+
+    def test_browsable_api_pages_are_not_cached(self):
+        user = User.objects.create_user(username='browsing-reviewer')
+        self.client.force_authenticate(user)
+        response = self.client.get('/api/tutorials/', HTTP_ACCEPT='text/html')
+        self.assertContains(response, user.username)
+        self.assertNotIn('X-Cache', response)
+        self.client.force_authenticate(None)
+        response = self.client.get('/api/tutorials/', HTTP_ACCEPT='text/html')
+        self.assertNotIn('X-Cache', response)
+        self.assertNotContains(response, user.username)
+        self.assertEqual(self.client.get('/api/tutorials/')['X-Cache'], 'MISS')
+
+
+class TagIndexTests(TestCase):
+    """
+    Tagged endpoints filter and count tags through the tag index.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        clear_response_cache()
+        self.sensor = self.create_resource('Sensor guide', ['ESP32', 'Sensors'])
+        self.wifi = self.create_resource('WiFi guide', ['esp32', 'WiFi'])
+        self.create_resource('Pico guide', ['RP2040'])
+
+    def create_resource(self, title, tags):
+        return Resource.objects.create(
+            title=title, description='Test resource', resource_type='BLOG',
+            url='https://example.com', tags=tags
+        )
+
+    def titles(self, query):
+        response = self.client.get('/api/resources/' + query)
+        self.assertEqual(response.status_code, 200)
+        results = response.json()
+        if isinstance(results, dict):
+            results = results['results']
+        return sorted(resource['title'] for resource in results)
+
+    def test_filters_by_all_tags_case_insensitively(self):
+        self.assertEqual(self.titles('?tags=Esp32'), ['Sensor guide', 'WiFi guide'])
+        self.assertEqual(self.titles('?tags=esp32,wifi'), ['WiFi guide'])
+        self.assertEqual(self.titles('?tags=Sensors,WiFi'), [])
+
+    def test_filters_by_any_tag(self):
+        self.assertEqual(self.titles('?tags=Sensors,RP2040&match=any'), ['Pico guide', 'Sensor guide'])
+        self.assertEqual(self.client.get('/api/resources/?tags=WiFi&match=some').status_code, 400)
+
+    def test_batched_deletes_leave_the_indexes_together(self):
+        with batched_signals():
+            Resource.objects.filter(pk__in=[self.sensor.pk, self.wifi.pk]).delete()
+            # Deferred to the end of the block
+            self.assertEqual(TagIndex.objects.filter(object_id=self.sensor.pk).count(), 2)
+        self.assertEqual(self.titles('?tags=ESP32'), [])
+        self.assertEqual(sorted(TagIndex.objects.values_list('tag', flat=True)), ['RP2040'])
+
+    def test_counts_tags_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/resources/tags/')
+        self.assertEqual(response.json()[0], {'tag': 'ESP32', 'count': 2})
+        self.assertEqual(len(response.json()), 4)
+        response = self.client.get('/api/resources/tags/?tags=WiFi')
+        self.assertEqual(response.json(), [{'tag': 'esp32', 'count': 1}, {'tag': 'WiFi', 'count': 1}])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.wifi.tags = ['Sensors']
+        self.wifi.save()
+        self.assertEqual(self.titles('?tags=sensors'), ['Sensor guide', 'WiFi guide'])
+        self.assertEqual(self.titles('?tags=WiFi'), [])
+        self.sensor.delete()
+        self.assertFalse(TagIndex.objects.filter(object_id=self.sensor.pk).exists())
+        self.assertEqual(self.titles('?tags=sensors'), ['WiFi guide'])
+
+
+class SearchTests(TestCase):
+    """
+    search/ ranks tutorials, resources and case studies from the FTS5 index.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.guide = Resource.objects.create(
+            title='ESP32 deep sleep', description='Cut power draw with <timers> and wake stubs.',
+            resource_type='BLOG', url='https://example.com'
+        )
+        self.study = CaseStudy.objects.create(
+            title='Smart greenhouse', subtitle='Irrigation at scale', description='Sensors everywhere',
+            challenge='Batteries died within weeks', solution='ESP32 boards in deep sleep',
+            results='Two years per battery', industry='Agriculture'
+        )
+
+    def search(self, query):
+        response = self.client.get('/api/search/', {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_ranks_title_matches_first(self):
+        results = self.search('deep sleep')
+        self.assertEqual([result['id'] for result in results], [str(self.guide.pk), str(self.study.pk)])
+        self.assertEqual(results[0]['title'], 'ESP32 <mark>deep</mark> <mark>sleep</mark>')
+        self.assertIn('<mark>deep</mark> <mark>sleep</mark>', results[1]['snippet'])
+
+    def test_matches_last_word_as_prefix(self):
+        self.assertEqual([result['type'] for result in self.search('greenh')], ['casestudy'])
+        self.assertEqual(self.search('sleep greenh')[0]['id'], str(self.study.pk))
+        self.assertEqual(self.search('irrigation NEAR("'), [])
+
+    def test_escapes_text_and_filters_types(self):
+        results = self.search('timers')
+        self.assertIn('&lt;<mark>timers</mark>&gt;', results[0]['snippet'])
+        response = self.client.get('/api/search/', {'q': 'esp32', 'type': 'casestudy'})
+        self.assertEqual([result['type'] for result in response.json()['results']], ['casestudy'])
+        self.assertEqual(self.client.get('/api/search/', {'q': 'esp32', 'type': 'board'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/search/').status_code, 400)
+
+    def test_index_follows_saves_and_deletes(self):
+        self.guide.title = 'Low power modes'
+        self.guide.save()
+        self.assertEqual(self.search('low power')[0]['id'], str(self.guide.pk))
+        self.guide.delete()
+        self.assertEqual(self.search('power'), [])
+        self.assertEqual(SearchDocument.objects.count(), 1)
+
+    def test_rebuild(self):
+        Resource.objects.filter(pk=self.guide.pk).update(title='Watchdog timers')
+        self.assertEqual(rebuild_search_index(), {'api.Tutorial': 0, 'api.Resource': 1, 'api.CaseStudy': 1})
+        self.assertEqual(self.search('watchdog')[0]['id'], str(self.guide.pk))
+
+
+class BulkDeleteTests(TestCase):
+    """
+    microcontrollers/bulk-delete/ validates and deletes every board with a
+    fixed number of queries.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        clear_response_cache()
+        create_catalog(3)
+        self.locked = Microcontroller.objects.create(name='Locked board', type='ESP32', is_deletable=False)
+
+    def bulk_delete(self, ids):
+        return self.client.post('/api/microcontrollers/bulk-delete/', {'ids': ids}, format='json')
+
+    def test_reports_every_id_in_request_order(self):
+        board = Microcontroller.objects.get(name='Board 0')
+        missing = '00000000-0000-0000-0000-000000000000'
+        response = self.bulk_delete([str(board.pk), 'not-a-uuid', missing, str(self.locked.pk), str(board.pk)])
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['deleted_microcontrollers'], [{'id': str(board.pk), 'name': 'Board 0', 'type': 'ESP32'}])
+        self.assertEqual(
+            [(entry['id'], entry['name'], entry['reason'][:18]) for entry in data['invalid_ids']],
+            [
+                ('not-a-uuid', 'Unknown', 'Invalid ID format:'),
+                (missing, 'Unknown', 'Microcontroller no'),
+                (str(self.locked.pk), 'Locked board', 'Not deletable (is_'),
+                (str(board.pk), 'Unknown', 'Duplicate ID'),
+            ]
+        )
+        self.assertEqual(
+            (data['deleted_count'], data['total_requested'], data['successful_deletions'], data['failed_deletions']),
+            (1, 5, 1, 4)
+        )
+        self.assertFalse(Microcontroller.objects.filter(pk=board.pk).exists())
+        self.assertTrue(Microcontroller.objects.filter(pk=self.locked.pk).exists())
+
+    def test_query_count_does_not_grow_with_ids(self):
+        ids = [str(pk) for pk in Microcontroller.objects.filter(is_deletable=True).values_list('pk', flat=True)]
+        # Held, so the reservation is of a deleted board
+        Microcontroller.objects.filter(pk=self.locked.pk).update(is_available=False)
+        reserve(User.objects.first(), 'ESP32')
+        self.client.get('/api/microcontrollers/')
+        # Lookup, the collector's fetch of the boards, reservations, profile
+        # preferences, project and tutorial detach, delete and the version
+        # bumps of the four changed models, in a savepoint
+        with self.assertNumQueries(13):
+            response = self.bulk_delete(ids)
+        self.assertEqual(response.json()['deleted_count'], 3)
+        self.assertEqual(Microcontroller.objects.count(), 1)
+        self.assertFalse(Project.objects.filter(microcontroller__isnull=False).exists())
+        self.assertFalse(Tutorial.objects.filter(microcontroller__isnull=False).exists())
+        self.assertFalse(UserProfile.preferred_microcontrollers.through.objects.exists())
+        self.assertFalse(Reservation.objects.exists())
+        self.assertEqual(self.client.get('/api/microcontrollers/')['X-Cache'], 'MISS')
+
+    def test_bumps_each_version_once(self):
+        versions = lambda: dict(ModelVersion.objects.values_list('label', 'version'))
+        self.client.get('/api/projects/')
+        before = versions()
+        ids = [str(pk) for pk in Microcontroller.objects.filter(is_deletable=True).values_list('pk', flat=True)]
+        self.bulk_delete(ids)
+        after = versions()
+        for label in ('api.Microcontroller', 'api.Project', 'api.Tutorial', 'api.UserProfile'):
+            self.assertEqual(after[label], before.get(label, 0) + 1, label)
+
+
+class BulkImportTests(TestCase):
+    """
+    The catalog endpoints' import/ action upserts NDJSON rows in batches.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        clear_response_cache()
+
+    def post_import(self, endpoint, rows, batch_size=None):
+        body = '\n'.join(row if isinstance(row, str) else json.dumps(row) for row in rows)
+        path = f'/api/{endpoint}/import/' + (f'?batch_size={batch_size}' if batch_size else '')
+        response = self.client.post(path, body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_creates_and_updates_in_one_upsert_per_batch(self):
+        board = Microcontroller.objects.create(name='Old name', type='ESP32', description='Kept')
+        rows = [{'name': f'Board {index}', 'type': 'ARDUINO_UNO', 'description': 'Imported'} for index in range(5)]
+        rows.append({'id': str(board.pk), 'name': 'New name'})
+        # An upsert per batch in a savepoint, a lookup for the batch updating
+        # a board, and a single version bump
+        with self.assertNumQueries(3 + 4 + 1):
+            report = self.post_import('microcontrollers', rows, batch_size=3)
+        self.assertEqual((report['status'], report['created'], report['updated'], report['failed']), ('success', 5, 1, 0))
+        board.refresh_from_db()
+        self.assertEqual((board.name, board.description), ('New name', 'Kept'))
+        self.assertEqual(Microcontroller.objects.filter(description='Imported').count(), 5)
+
+    def test_reports_rejected_rows_by_line(self):
+        report = self.post_import('resources', [
+            {'title': 'Good', 'description': 'Fine', 'resource_type': 'BLOG', 'url': 'https://example.com'},
+            '{not json',
+            '[1, 2]',
+            {'id': 'nope', 'title': 'Bad id'},
+            {'title': 'Bad type', 'description': '...', 'resource_type': 'PODCAST', 'url': 'https://example.com'},
+        ])
+        self.assertEqual((report['status'], report['created'], report['failed']), ('partial', 1, 4))
+        self.assertEqual([error['line'] for error in report['errors']], [2, 3, 4, 5])
+        self.assertIn('resource_type', report['errors'][3]['errors'])
+        self.assertEqual(Resource.objects.get().title, 'Good')
+
+    def test_indexes_imported_objects(self):
+        create_catalog(1)
+        self.client.get('/api/tutorials/')
+        report = self.post_import('tutorials', [{
+            'title': 'Imported tutorial', 'description': 'Bulk loaded', 'content': 'Wire the sensor',
+            'difficulty': 'BEGINNER', 'estimated_time': 5, 'tags': ['Imported']
+        }])
+        self.assertEqual(report['created'], 1)
+        tutorial = Tutorial.objects.get(title='Imported tutorial')
+        self.assertEqual(tutorial.author, User.objects.first())
+        self.assertTrue(TagIndex.objects.filter(object_id=tutorial.pk, tag='Imported').exists())
+        self.assertEqual(self.client.get('/api/search/', {'q': 'sensor'}).json()['results'][0]['id'], str(tutorial.pk))
+        self.assertEqual(self.client.get('/api/tutorials/')['X-Cache'], 'MISS')
+
+
+class SignedTokenTests(TestCase):
+    """
+    Bearer tokens authenticate without querying the database.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        clear_response_cache()
+        user_cache.clear()
+        User.objects.create_user(username='first')
+        self.user = User.objects.create_user(username='maker', email='maker@example.com', password='s3cret-pass')
+
+    def sign_in(self, **credentials):
+        return self.client.post('/api/auth/token/', credentials or {'email': 'Maker@example.com', 'password': 's3cret-pass'})
+
+    def test_issues_tokens_for_valid_credentials_only(self):
+        response = self.sign_in()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['user']['username'], 'maker')
+        self.assertEqual(self.sign_in(username='maker', password='wrong').status_code, 401)
+        self.assertEqual(self.sign_in(username='maker').status_code, 400)
+
+    def test_authenticated_requests_do_not_query(self):
+        token = self.sign_in().json()['token']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.client.get('/api/tutorials/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/tutorials/')
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+    def test_sets_the_caller_as_owner(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.sign_in().json()['token']}")
+        response = self.client.post('/api/projects/', {
+            'title': 'Mine', 'description': 'Owned', 'project_type': 'IOT'
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Project.objects.get().owner, self.user)
+        self.client.credentials()
+        self.client.post('/api/projects/', {'title': 'Anonymous', 'description': '-', 'project_type': 'IOT'}, format='json')
+        self.assertEqual(Project.objects.get(title='Anonymous').owner.username, 'first')
+
+    def test_rejects_revoked_forged_and_expired_tokens(self):
+        token = self.sign_in().json()['token']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(self.client.post('/api/auth/token/revoke/').status_code, 200)
+        response = self.client.get('/api/tutorials/')
+        self.assertEqual((response.status_code, response['WWW-Authenticate']), (401, 'Bearer'))
+        # Which the frontend tells from wrong credentials
+        self.assertNotIn('WWW-Authenticate', self.sign_in(username='maker', password='wrong'))
+
+        forged = token.replace(f'{self.user.pk}.', '1.', 1)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {forged}')
+        self.assertEqual(self.client.get('/api/tutorials/').status_code, 401)
+
+        token = self.sign_in().json()['token']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        with override_settings(AUTH_TOKEN_MAX_AGE=-1):
+            self.assertEqual(self.client.get('/api/tutorials/').status_code, 401)
+
+    def test_registers_new_accounts(self):
+        response = self.client.post('/api/auth/register/', {
+            'name': 'New Maker', 'email': 'new@example.com', 'password': 'an0ther-pass'
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['user']['email'], 'new@example.com')
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.json()['token']}")
+        self.assertEqual(self.client.post('/api/auth/token/revoke/').status_code, 200)
+        self.client.credentials()
+        self.assertEqual(self.sign_in(email='NEW@example.com', password='an0ther-pass').status_code, 200)
+        self.assertEqual(User.objects.get(email='new@example.com').first_name, 'New Maker')
+
+    def test_rejects_invalid_registrations(self):
+        for details in [
+            {'email': 'new@example.com'},
+            {'email': 'not-an-email', 'password': 'an0ther-pass'},
+            {'email': 'MAKER@example.com', 'password': 'an0ther-pass'},
+            {'email': 'new@example.com', 'password': '123'},
+        ]:
+            with self.subTest(details):
+                self.assertEqual(self.client.post('/api/auth/register/', details, format='json').status_code, 400)
+        self.assertFalse(User.objects.filter(email='new@example.com').exists())
+
+    def test_revocations_go_through_a_cache_shared_by_the_workers(self):
+        self.assertNotIsInstance(caches[settings.AUTH_TOKEN_CACHE], LocMemCache)
+
+    def test_deactivated_users_are_dropped_from_the_cache(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.sign_in().json()['token']}")
+        self.assertEqual(self.client.get('/api/tutorials/').status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/tutorials/').status_code, 401)
+
+
+class ReservationTests(TestCase):
+    """
+    Boards are claimed atomically, queued for first come first served and
+    taken back when their lease runs out.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        clear_response_cache()
+        user_cache.clear()
+        self.users = [User.objects.create_user(username=f'maker-{index}') for index in range(3)]
+        self.boards = [Microcontroller.objects.create(name=f'Pico {index}', type='RASPBERRY_PI_PICO') for index in range(2)]
+
+    def as_user(self, user):
+        self.client.force_authenticate(user)
+        return self.client
+
+    def reserve(self, user):
+        return self.as_user(user).post('/api/reservations/', {'type': 'RASPBERRY_PI_PICO'}, format='json')
+
+    def test_claims_free_boards_then_queues(self):
+        first, second, third = [self.reserve(user) for user in self.users]
+        self.assertEqual((first.status_code, second.status_code, third.status_code), (201, 201, 202))
+        held = {first.json()['reservation']['microcontroller']['id'], second.json()['reservation']['microcontroller']['id']}
+        self.assertEqual(held, {str(board.pk) for board in self.boards})
+        self.assertEqual(third.json()['reservation']['queue_position'], 1)
+        self.assertFalse(Microcontroller.objects.filter(is_available=True).exists())
+        self.assertEqual(
+            set(Microcontroller.objects.values_list('current_user', flat=True)), {self.users[0].pk, self.users[1].pk}
+        )
+        # Asking again returns the same reservation
+        self.assertEqual(self.reserve(self.users[2]).json()['reservation']['id'], third.json()['reservation']['id'])
+        self.assertEqual(self.reserve(self.users[2]).status_code, 202)
+
+    def test_release_hands_the_board_to_the_queue(self):
+        first = self.reserve(self.users[0]).json()['reservation']
+        self.reserve(self.users[1])
+        waiting = self.reserve(self.users[2]).json()['reservation']
+        response = self.as_user(self.users[0]).post(f"/api/reservations/{first['id']}/release/")
+        self.assertEqual(response.json()['reservation']['status'], Reservation.RELEASED)
+        board = Microcontroller.objects.get(pk=first['microcontroller']['id'])
+        self.assertEqual((board.is_available, board.current_user), (False, self.users[2]))
+        data = self.as_user(self.users[2]).get(f"/api/reservations/{waiting['id']}/").json()['reservation']
+        self.assertEqual((data['status'], data['microcontroller']['id'], data['queue_position']), ('ACTIVE', str(board.pk), None))
+
+    def test_lapsed_leases_free_their_boards(self):
+        held = self.reserve(self.users[0]).json()['reservation']
+        with override_settings(RESERVATION_LEASE_SECONDS=-1):
+            self.reserve(self.users[1])
+        self.assertEqual(expire_leases(), 1)
+        self.assertEqual(Reservation.objects.get(user=self.users[1]).status, Reservation.EXPIRED)
+        self.assertEqual(Microcontroller.objects.filter(is_available=True).count(), 1)
+        response = self.as_user(self.users[1]).post(f"/api/reservations/{Reservation.objects.get(user=self.users[1]).pk}/heartbeat/")
+        self.assertEqual(response.status_code, 409)
+        response = self.as_user(self.users[0]).post(f"/api/reservations/{held['id']}/heartbeat/")
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(response.json()['reservation']['lease_expires_at'], held['lease_expires_at'])
+
+    def test_reservations_are_private_and_require_authentication(self):
+        reservation = self.reserve(self.users[0]).json()['reservation']
+        self.assertEqual(self.as_user(self.users[1]).get(f"/api/reservations/{reservation['id']}/").status_code, 404)
+        self.assertEqual(self.as_user(self.users[1]).post('/api/reservations/', {'type': 'Z80'}, format='json').status_code, 400)
+        self.client.force_authenticate(None)
+        self.assertIn(self.client.post('/api/reservations/', {'type': 'ESP32'}, format='json').status_code, (401, 403))
+
+    def test_availability_cannot_be_written_through_the_catalog(self):
+        board = self.boards[0]
+        response = self.as_user(self.users[0]).patch(
+            f'/api/microcontrollers/{board.pk}/', {'is_available': False, 'description': 'Updated'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        board.refresh_from_db()
+        self.assertEqual((board.is_available, board.description), (True, 'Updated'))
 
-# Create your tests here.
@@ -4,7 +4,10 @@ from .views import (
     MicrocontrollerViewSet, ProjectViewSet, CodeExecutionViewSet, UserProfileViewSet,
     TutorialViewSet, TutorialProgressViewSet, CaseStudyViewSet, ContactInquiryViewSet,
     PlatformStatsViewSet, TeamMemberViewSet, ResourceViewSet, 
-    peripheral_send, peripheral_view, peripheral_history, peripheral_view_by_type,
+    peripheral_send, peripheral_send_batch, peripheral_view, peripheral_history, peripheral_view_by_type,
+    peripheral_stream, peripheral_stats, response_cache_stats, search,
+    issue_auth_token, register_user, revoke_auth_token,
+    create_reservation, reservation_detail, reservation_heartbeat, reservation_release,
     bulk_delete_microcontrollers
 )
 
@@ -25,10 +28,22 @@ urlpatterns = [
     # Bulk operations (must come before router to avoid conflicts)
     path('microcontrollers/bulk-delete/', bulk_delete_microcontrollers, name='bulk_delete_microcontrollers'),
     path('', include(router.urls)),
+    path('cache/stats/', response_cache_stats, name='response_cache_stats'),
+    path('search/', search, name='search'),
+    path('auth/register/', register_user, name='register_user'),
+    path('auth/token/', issue_auth_token, name='issue_auth_token'),
+    path('auth/token/revoke/', revoke_auth_token, name='revoke_auth_token'),
+    path('reservations/', create_reservation, name='create_reservation'),
+    path('reservations/<int:pk>/', reservation_detail, name='reservation_detail'),
+    path('reservations/<int:pk>/heartbeat/', reservation_heartbeat, name='reservation_heartbeat'),
+    path('reservations/<int:pk>/release/', reservation_release, name='reservation_release'),
     # Generic peripheral communication endpoints
     path('peripheral/send/', peripheral_send, name='peripheral_send'),
+    path('peripheral/send-batch/', peripheral_send_batch, name='peripheral_send_batch'),
     path('peripheral/view/', peripheral_view, name='peripheral_view'),
     path('peripheral/history/', peripheral_history, name='peripheral_history'),
+    path('peripheral/stream/', peripheral_stream, name='peripheral_stream'),
+    path('peripheral/stats/', peripheral_stats, name='peripheral_stats'),
     path('peripheral/view/<str:peripheral_type>/', peripheral_view_by_type, name='peripheral_view_by_type'),
     # Legacy UART endpoints for backward compatibility
     path('uart/send/', peripheral_send, name='uart_send'),
@@ -1,27 +1,60 @@
 from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import (
+    api_view, authentication_classes, parser_classes, permission_classes, throttle_classes
+)
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
 from rest_framework.response import Response
 from rest_framework import status
+from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
-from django.http import JsonResponse
-import json
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from datetime import datetime, timezone as dt_timezone
+import asyncio
+import logging
+import math
 from .models import (
     Microcontroller, Project, CodeExecution, UserProfile, Tutorial, TutorialProgress,
-    CaseStudy, ContactInquiry, PlatformStats, TeamMember, Resource
+    CaseStudy, ContactInquiry, PlatformStats, TeamMember, Resource, Reservation
 )
 from .serializers import (
     MicrocontrollerSerializer, ProjectSerializer, CodeExecutionSerializer, UserProfileSerializer,
     TutorialSerializer, TutorialProgressSerializer, CaseStudySerializer, ContactInquirySerializer,
     PlatformStatsSerializer, TeamMemberSerializer, ResourceSerializer
 )
+from .parsers import OctetStreamParser
+from . import reservations
+from .authentication import SignedToken, get_acting_user, issue_token, revoked_tokens
+from .bulk_import import BulkImportMixin
+from .conditional import ConditionalGetMixin
+from .fast_read import FastReadMixin
+from .sparse_fields import SparseFieldsMixin
+from .tags import TagFacetsMixin
+from .peripherals.decoders import decode_frame
+from .peripherals.frames import COMMAND_NAMES, FrameError, hex_bytes, iter_frame_records, parse_frame
+from .peripherals.ingest import frame_response, ingest_frame
+from .peripherals.segment_log import peripheral_history_log
+from .peripherals.store import peripheral_store
+from .peripherals.streaming import peripheral_hub
+from .peripherals.throttle import PeripheralRateThrottle, peripheral_limiter
+from .peripherals.transport import device_dispatcher
+from .response_cache import ResponseCacheMixin, response_cache
+from .signals import batched_signals
+from .search import SEARCH_TYPES, search as search_documents, search_supported
 
-# Global variable to store the last peripheral data for viewing
-last_peripheral_data = None
-peripheral_data_history = []  # Store history of all peripheral communications
+logger = logging.getLogger('api.peripherals')
 
 
-class MicrocontrollerViewSet(viewsets.ModelViewSet):
+class MicrocontrollerViewSet(BulkImportMixin, ResponseCacheMixin, ConditionalGetMixin, FastReadMixin, viewsets.ModelViewSet):
     """
     A viewset for viewing and editing microcontroller instances.
     Provides `list`, `create`, `retrieve`, `update`, and `destroy` actions.
@@ -31,10 +64,10 @@ class MicrocontrollerViewSet(viewsets.ModelViewSet):
     permission_classes = [AllowAny]
 
 
-class ProjectViewSet(viewsets.ModelViewSet):
+class ProjectViewSet(ConditionalGetMixin, FastReadMixin, viewsets.ModelViewSet):
     """
     A viewset for viewing and editing Project instances.
-    This viewset automatically assigns a default owner when a new project is created.
+    This viewset assigns the requesting user (or a default one) as the owner of new projects.
     """
     queryset = Project.objects.all()
     serializer_class = ProjectSerializer
@@ -42,32 +75,16 @@ class ProjectViewSet(viewsets.ModelViewSet):
     
     def perform_create(self, serializer):
         """
-        Assigns a default user as the owner when creating a new project.
-        If no users exist, a default user is created.
+        Assigns the requesting user as the owner when creating a new project.
+        Anonymous projects get a default owner.
         """
-        # Get the first user or create a default user if none exists
-        try:
-            user = User.objects.first()
-            if not user:
-                user = User.objects.create_user(
-                    username='default_user',
-                    email='default@example.com',
-                    password='defaultpass123'
-                )
-        except:
-            # If there's any issue, create a default user
-            user = User.objects.create_user(
-                username='default_user',
-                email='default@example.com',
-                password='defaultpass123'
-            )
-        serializer.save(owner=user)
+        serializer.save(owner=get_acting_user(self.request))
 
 
-class CodeExecutionViewSet(viewsets.ModelViewSet):
+class CodeExecutionViewSet(ConditionalGetMixin, SparseFieldsMixin, viewsets.ModelViewSet):
     """
     A viewset for managing CodeExecution instances.
-    It automatically assigns a default user when a new execution is created.
+    It assigns the requesting user (or a default one) to new executions.
     """
     queryset = CodeExecution.objects.all()
     serializer_class = CodeExecutionSerializer
@@ -75,28 +92,13 @@ class CodeExecutionViewSet(viewsets.ModelViewSet):
     
     def perform_create(self, serializer):
         """
-        Assigns a default user to the code execution record.
-        Creates a default user if none exist.
+        Assigns the requesting user to the code execution record.
+        Anonymous executions get a default user.
         """
-        # Get the first user or create a default user if none exists
-        try:
-            user = User.objects.first()
-            if not user:
-                user = User.objects.create_user(
-                    username='default_user',
-                    email='default@example.com',
-                    password='defaultpass123'
-                )
-        except:
-            user = User.objects.create_user(
-                username='default_user',
-                email='default@example.com',
-                password='defaultpass123'
-            )
-        serializer.save(user=user)
+        serializer.save(user=get_acting_user(self.request))
 
 
-class UserProfileViewSet(viewsets.ModelViewSet):
+class UserProfileViewSet(ConditionalGetMixin, SparseFieldsMixin, viewsets.ModelViewSet):
     """
     A viewset for viewing and editing UserProfile instances.
     """
@@ -105,10 +107,10 @@ class UserProfileViewSet(viewsets.ModelViewSet):
     permission_classes = [AllowAny]
 
 
-class TutorialViewSet(viewsets.ModelViewSet):
+class TutorialViewSet(BulkImportMixin, TagFacetsMixin, ResponseCacheMixin, ConditionalGetMixin, SparseFieldsMixin, viewsets.ModelViewSet):
     """
     A viewset for managing Tutorial instances.
-    It automatically assigns a default author when a new tutorial is created.
+    It assigns the requesting user (or a default one) as the author of new tutorials.
     """
     queryset = Tutorial.objects.all()
     serializer_class = TutorialSerializer
@@ -116,28 +118,19 @@ class TutorialViewSet(viewsets.ModelViewSet):
     
     def perform_create(self, serializer):
         """
-        Assigns a default user as the author when creating a new tutorial.
-        Creates a default user if none exist.
+        Assigns the requesting user as the author when creating a new tutorial.
+        Anonymous tutorials get a default author.
         """
-        # Get the first user or create a default user if none exists
-        try:
-            user = User.objects.first()
-            if not user:
-                user = User.objects.create_user(
-                    username='default_user',
-                    email='default@example.com',
-                    password='defaultpass123'
-                )
-        except:
-            user = User.objects.create_user(
-                username='default_user',
-                email='default@example.com',
-                password='defaultpass123'
-            )
-        serializer.save(author=user)
+        serializer.save(author=get_acting_user(self.request))
+
+    def get_import_values(self):
+        """
+        Assigns the requesting user (or the default author) to imported tutorials.
+        """
+        return {'author': get_acting_user(self.request)}
 
 
-class TutorialProgressViewSet(viewsets.ModelViewSet):
+class TutorialProgressViewSet(ConditionalGetMixin, SparseFieldsMixin, viewsets.ModelViewSet):
     """
     A viewset for tracking user progress on tutorials.
     """
@@ -146,7 +139,7 @@ class TutorialProgressViewSet(viewsets.ModelViewSet):
     permission_classes = [AllowAny]
 
 
-class CaseStudyViewSet(viewsets.ModelViewSet):
+class CaseStudyViewSet(BulkImportMixin, TagFacetsMixin, ResponseCacheMixin, ConditionalGetMixin, SparseFieldsMixin, viewsets.ModelViewSet):
     """
     A viewset for managing CaseStudy instances.
     """
@@ -155,7 +148,7 @@ class CaseStudyViewSet(viewsets.ModelViewSet):
     permission_classes = [AllowAny]
 
 
-class ContactInquiryViewSet(viewsets.ModelViewSet):
+class ContactInquiryViewSet(ConditionalGetMixin, SparseFieldsMixin, viewsets.ModelViewSet):
     """
     A viewset for handling contact inquiries submitted through the platform.
     """
@@ -164,7 +157,7 @@ class ContactInquiryViewSet(viewsets.ModelViewSet):
     permission_classes = [AllowAny]
 
 
-class PlatformStatsViewSet(viewsets.ModelViewSet):
+class PlatformStatsViewSet(ConditionalGetMixin, SparseFieldsMixin, viewsets.ModelViewSet):
     """
     A viewset for viewing platform statistics.
     """
@@ -173,7 +166,7 @@ class PlatformStatsViewSet(viewsets.ModelViewSet):
     permission_classes = [AllowAny]
 
 
-class TeamMemberViewSet(viewsets.ModelViewSet):
+class TeamMemberViewSet(ResponseCacheMixin, ConditionalGetMixin, SparseFieldsMixin, viewsets.ModelViewSet):
     """
     A viewset for managing team member profiles.
     """
@@ -182,7 +175,7 @@ class TeamMemberViewSet(viewsets.ModelViewSet):
     permission_classes = [AllowAny]
 
 
-class ResourceViewSet(viewsets.ModelViewSet):
+class ResourceViewSet(BulkImportMixin, TagFacetsMixin, ResponseCacheMixin, ConditionalGetMixin, SparseFieldsMixin, viewsets.ModelViewSet):
     """
     A viewset for managing educational and support resources.
     """
@@ -194,111 +187,570 @@ class ResourceViewSet(viewsets.ModelViewSet):
 # Generic Peripheral Communication Endpoint
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@parser_classes([JSONParser, OctetStreamParser, FormParser, MultiPartParser])
+@throttle_classes([PeripheralRateThrottle])
 def peripheral_send(request):
     """
     Handles peripheral configuration data from the frontend for all peripheral types.
 
     This endpoint is designed to be a universal receiver for various peripheral
     configurations such as UART, SPI, I2C, etc. It logs the received data,
-    stores it in-memory for debugging and historical viewing, and simulates a
-    successful response.
+    records it in the in-process `peripheral_store` for debugging and
+    historical viewing, and simulates a successful response.
+
+    Two request formats are accepted:
+
+    * JSON: an object containing `peripheral_type`, `instance`, `mcu_id`,
+      `configuration`, `data` (raw byte array), and `timestamp`.
+    * `application/octet-stream`: the raw frame packed by
+      `peripheralService.js`. The frame is validated (start/end bytes and
+      length byte) and the peripheral type is taken from its command code.
+      `mcu_id`, `instance` and `timestamp` are read from the query string.
+
+    Requests are rate limited per `mcu_id` and peripheral type (see
+    `api.peripherals.throttle`); over the limit, a 429 response with a
+    `Retry-After` header is returned.
 
     Args:
-        request (Request): The DRF request object. The request body should be a
-            JSON object containing `peripheral_type`, `instance`, `mcu_id`,
-            `configuration`, `data` (raw byte array), and `timestamp`.
+        request (Request): The DRF request object.
 
     Returns:
         Response: A DRF response object indicating success or failure.
     """
+    peripheral_type = 'unknown'
     try:
         data = request.data
-        peripheral_type = data.get('peripheral_type', 'unknown').upper()
-        instance = data.get('instance', 'unknown')
-        mcu_id = data.get('mcu_id', 'unknown')
-        configuration = data.get('configuration', {})
-        raw_data = data.get('data', [])
-        
-        # Store the data globally for viewing
-        global last_peripheral_data, peripheral_data_history
-        timestamp = json.dumps(data.get('timestamp', 'unknown'))
-        
-        peripheral_data = {
-            'peripheral_type': peripheral_type,
-            'instance': instance,
-            'mcu_id': mcu_id,
-            'configuration': configuration,
-            'raw_data': raw_data,
-            'hex_data': ' '.join([f'{byte:02X}' for byte in raw_data]) if raw_data else 'No raw data',
-            'timestamp': timestamp,
-            'data_length': len(raw_data) if raw_data else 0
-        }
-        
-        last_peripheral_data = peripheral_data
-        peripheral_data_history.append(peripheral_data)
-        
-        # Keep only last 50 communications to prevent memory issues
-        if len(peripheral_data_history) > 50:
-            peripheral_data_history = peripheral_data_history[-50:]
-        
-        # Log the received data for debugging
-        print("\n" + "="*80)
-        print(f"🔧 {peripheral_type} PERIPHERAL CONFIGURATION RECEIVED")
-        print("="*80)
-        print(f"📱 MCU: {mcu_id}")
-        print(f"🔌 Peripheral: {peripheral_type}")
-        print(f"🏷️  Instance: {instance}")
-        print(f"📏 Data length: {len(raw_data)} bytes")
-        print(f"📦 Raw data: {raw_data}")
-        print(f"🔢 Hex data: {peripheral_data['hex_data']}")
-        
-        # Log configuration details
-        print(f"⚙️  Configuration:")
-        for key, value in configuration.items():
-            print(f"   {key}: {value}")
-        
-        # Parse frame structure for better understanding (if raw data exists)
-        if raw_data and len(raw_data) >= 4:
-            start_byte = raw_data[0]
-            command = raw_data[1] 
-            length = raw_data[2]
-            data_section = raw_data[3:-1] if len(raw_data) > 4 else []
-            end_byte = raw_data[-1] if len(raw_data) > 0 else None
-            
-            print(f"📋 Frame Structure:")
-            print(f"   Start: 0x{start_byte:02X} ({start_byte})")
-            print(f"   Command: 0x{command:02X} ({command})")
-            print(f"   Length: 0x{length:02X} ({length})")
-            print(f"   Data: {data_section}")
-            print(f"   End: 0x{end_byte:02X} ({end_byte})" if end_byte is not None else "   End: N/A")
-        
-        print("="*80)
-        
-        # Here you would typically:
-        # 1. Validate the data format based on peripheral type
-        # 2. Send it to the actual hardware via appropriate communication method
-        # 3. Return success/failure status
-        
-        # For now, we'll just simulate success
-        response_data = {
-            'status': 'success',
-            'message': f'{peripheral_type} configuration sent to {mcu_id}',
-            'peripheral_type': peripheral_type,
-            'instance': instance,
-            'mcu_id': mcu_id,
-            'data_length': len(raw_data) if raw_data else 0,
-            'timestamp': timestamp
-        }
-        
-        return Response(response_data, status=status.HTTP_200_OK)
+        if isinstance(data, bytes):
+            frame = parse_frame(data)
+            peripheral_type = frame.peripheral_type
+            params = request.query_params
+            peripheral_data, repeated = ingest_frame(
+                peripheral_type,
+                params.get('instance', 'unknown'),
+                params.get('mcu_id', 'unknown'),
+                {},
+                frame.raw,
+                params.get('timestamp', 'unknown'),
+            )
+        else:
+            peripheral_type = data.get('peripheral_type', 'unknown').upper()
+            peripheral_data, repeated = ingest_frame(
+                peripheral_type,
+                data.get('instance', 'unknown'),
+                data.get('mcu_id', 'unknown'),
+                data.get('configuration', {}),
+                bytes(data.get('data') or ()),
+                data.get('timestamp', 'unknown'),
+            )
+
+        # ingest_frame has queued the frame for the device; delivery happens
+        # in the background, so success means the frame was accepted
+        return Response(frame_response(peripheral_data, repeated), status=status.HTTP_200_OK)
         
     except Exception as e:
-        print(f"Error processing {peripheral_type} data: {str(e)}")
+        logger.warning('Error processing %s data: %s', peripheral_type, e)
         return Response(
             {'status': 'error', 'message': str(e)}, 
             status=status.HTTP_400_BAD_REQUEST
         )
 
+@api_view(['POST'])
+@permission_classes([AllowAny])
+@parser_classes([JSONParser, OctetStreamParser])
+def peripheral_send_batch(request):
+    """
+    Handles many peripheral frames, for any number of instances and MCUs, in one request.
+
+    Every frame goes through the same ingestion path as `peripheral_send`,
+    but the request is parsed and the response rendered only once. Frames are
+    processed in order and each one gets its own result, so a bad frame does
+    not reject the rest of the batch. Each frame takes a token from its
+    device's rate limit bucket; frames over the limit are reported as
+    `throttled`, and the response carries `Retry-After` (with a 429 status if
+    every frame was throttled).
+
+    Two request formats are accepted:
+
+    * JSON: a list of frame objects (or an object with a `frames` list), each
+      shaped like a `peripheral_send` request. `data` may be either a byte
+      array or a hex string such as ``"AA0103...55"``.
+    * `application/octet-stream`: a stream of length-prefixed records as
+      described in `api.peripherals.frames`. The whole stream is rendered to
+      hex once and sliced per frame.
+
+    Args:
+        request (Request): The DRF request object.
+
+    Returns:
+        Response: A DRF response object with a `results` list holding one
+                  entry per frame, plus accepted/rejected counts.
+    """
+    data = request.data
+    results = []
+
+    if isinstance(data, bytes):
+        timestamp = request.query_params.get('timestamp', 'unknown')
+        stream_hex = hex_bytes(data)
+        try:
+            for index, record in enumerate(iter_frame_records(data)):
+                if record.error is not None:
+                    results.append({'index': index, 'status': 'error', 'message': str(record.error)})
+                    continue
+                frame = record.frame
+                retry_after = _throttle_frame(record.mcu_id, frame.peripheral_type)
+                if retry_after:
+                    results.append(_throttled_result(index, retry_after))
+                    continue
+                hex_start = record.offset * 3
+                hex_end = hex_start + len(frame.raw) * 3 - 1
+                peripheral_data, repeated = ingest_frame(
+                    frame.peripheral_type,
+                    record.instance,
+                    record.mcu_id,
+                    {},
+                    frame.raw,
+                    timestamp,
+                    hex_data=stream_hex[hex_start:hex_end],
+                )
+                results.append({'index': index, **frame_response(peripheral_data, repeated)})
+        except FrameError as e:
+            results.append({'index': len(results), 'status': 'error', 'message': str(e)})
+    else:
+        frames = data.get('frames') if isinstance(data, dict) else data
+        if not isinstance(frames, list) or not frames:
+            return Response({
+                'status': 'error',
+                'message': 'No frames provided'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        for index, item in enumerate(frames):
+            try:
+                raw = item.get('data') or ()
+                raw_bytes = bytes.fromhex(raw) if isinstance(raw, str) else bytes(raw)
+                peripheral_type = item.get('peripheral_type', 'unknown').upper()
+                mcu_id = item.get('mcu_id', 'unknown')
+                retry_after = _throttle_frame(mcu_id, peripheral_type)
+                if retry_after:
+                    results.append(_throttled_result(index, retry_after))
+                    continue
+                peripheral_data, repeated = ingest_frame(
+                    peripheral_type,
+                    item.get('instance', 'unknown'),
+                    mcu_id,
+                    item.get('configuration', {}),
+                    raw_bytes,
+                    item.get('timestamp', 'unknown'),
+                )
+                results.append({'index': index, **frame_response(peripheral_data, repeated)})
+            except Exception as e:
+                results.append({'index': index, 'status': 'error', 'message': str(e)})
+
+    accepted = sum(1 for result in results if result['status'] == 'success')
+    rejected = len(results) - accepted
+    waits = [result['retry_after'] for result in results if result['status'] == 'throttled']
+    response = Response({
+        'status': 'success' if not rejected else ('partial' if accepted else 'error'),
+        'message': f'Batch processed. {accepted} frames accepted, {rejected} rejected.',
+        'accepted': accepted,
+        'rejected': rejected,
+        'throttled': len(waits),
+        'results': results
+    }, status=status.HTTP_429_TOO_MANY_REQUESTS if waits and len(waits) == len(results) else status.HTTP_200_OK)
+    if waits:
+        response['Retry-After'] = str(math.ceil(min(waits)))
+    return response
+
+
+def _throttle_frame(mcu_id, peripheral_type):
+    """
+    Takes a token for one frame of a batch.
+
+    Returns:
+        float: 0 if the frame may be ingested, otherwise the seconds to wait.
+    """
+    if peripheral_limiter is None:
+        return 0.0
+    return peripheral_limiter.acquire((mcu_id, peripheral_type))
+
+
+def _throttled_result(index, retry_after):
+    return {
+        'index': index,
+        'status': 'throttled',
+        'message': f'Rate limit exceeded, retry in {retry_after:.2f}s',
+        'retry_after': round(retry_after, 3)
+    }
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def peripheral_stats(request):
+    """
+    Reports the ingestion rate limiter's and device dispatcher's counters.
+
+    Lists how many frames were accepted and throttled, and which devices are
+    throttled the most, to spot a board or client that floods the endpoints,
+    along with the connection state and queue of every routed device.
+
+    Args:
+        request (Request): The DRF request object.
+
+    Returns:
+        Response: A DRF response object containing the limiter statistics
+                  (None when rate limiting is off) and the device channels.
+    """
+    return Response({
+        'status': 'success',
+        'rate_limit': peripheral_limiter.stats() if peripheral_limiter is not None else None,
+        'devices': device_dispatcher.stats() if device_dispatcher is not None else []
+    }, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def response_cache_stats(request):
+    """
+    Reports the response cache's hit and miss counters.
+
+    Counters are kept per model of the cached endpoints and per process, to
+    confirm that repeated page views are served without querying the database.
+
+    Args:
+        request (Request): The DRF request object.
+
+    Returns:
+        Response: A DRF response object containing the cache alias and the
+                  counters (None when the response cache is off).
+    """
+    return Response({
+        'status': 'success',
+        'cache': response_cache.alias if response_cache is not None else None,
+        'endpoints': response_cache.stats() if response_cache is not None else None
+    }, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def search(request):
+    """
+    Searches the tutorials, resources and case studies.
+
+    The words of the `q` query parameter must all appear in a title or body,
+    the last one possibly as a prefix, so results can follow a query as it is
+    typed. `type` restricts the search to some comma-separated types
+    (`tutorial`, `resource`, `casestudy`) and `limit` caps the number of
+    results (20 by default, at most `SEARCH_MAX_RESULTS`). Results are ranked
+    by BM25 from the full-text index maintained by `api.search`, titles
+    weighing more than bodies.
+
+    Args:
+        request (Request): The DRF request object.
+
+    Returns:
+        Response: A DRF response object with the query and its results, best
+                  first, each with its type, id, highlighted title, snippet
+                  and score.
+    """
+    if not search_supported():
+        return Response({
+            'status': 'error',
+            'message': 'Full-text search requires the SQLite database.'
+        }, status=status.HTTP_501_NOT_IMPLEMENTED)
+
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({
+            'status': 'error',
+            'message': 'q is required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    types = [name for name in request.query_params.get('type', '').split(',') if name]
+    unknown = [name for name in types if name not in SEARCH_TYPES]
+    if unknown:
+        return Response({
+            'status': 'error',
+            'message': f"Unknown type(s): {', '.join(unknown)}. Expected any of: {', '.join(SEARCH_TYPES)}."
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    max_results = getattr(settings, 'SEARCH_MAX_RESULTS', 50)
+    try:
+        limit = min(max(int(request.query_params.get('limit', 20)), 1), max_results)
+    except ValueError:
+        return Response({
+            'status': 'error',
+            'message': 'limit must be an integer'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        'status': 'success',
+        'query': query,
+        'results': search_documents(query, types=types or None, limit=limit)
+    }, status=status.HTTP_200_OK)
+
+@api_view(['POST'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def issue_auth_token(request):
+    """
+    Issues an API token for a username (or email) and password.
+
+    The token is sent back as ``Authorization: Bearer <token>`` and is valid
+    for `AUTH_TOKEN_MAX_AGE` seconds or until it is revoked; see
+    `api.authentication`.
+
+    Args:
+        request (Request): The DRF request object. The request body should
+            contain `username` or `email`, and `password`.
+
+    Returns:
+        Response: A DRF response object containing the token, its expiry time
+                  and the user, or an error (401 for wrong credentials).
+    """
+    username = request.data.get('username')
+    email = request.data.get('email')
+    password = request.data.get('password')
+    if not (username or email) or not password:
+        return Response({
+            'status': 'error',
+            'message': 'username (or email) and password are required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if not username:
+        match = User.objects.filter(email__iexact=email).values_list('username', flat=True).first()
+        username = match or ''
+    user = authenticate(request._request, username=username, password=password)
+    if user is None:
+        return Response({
+            'status': 'error',
+            'message': 'Invalid credentials'
+        }, status=status.HTTP_401_UNAUTHORIZED)
+
+    return _token_response(user, status.HTTP_200_OK)
+
+@api_view(['POST'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def register_user(request):
+    """
+    Creates an account and issues an API token for it (sign up).
+
+    The email address doubles as the username, so the account can sign in
+    through `issue_auth_token` with either. The password must pass
+    `AUTH_PASSWORD_VALIDATORS`.
+
+    Args:
+        request (Request): The DRF request object. The request body should
+            contain `email` and `password`, and optionally `name`.
+
+    Returns:
+        Response: A DRF response object containing the token, its expiry time
+                  and the new user (201), or an error (400 for missing or
+                  invalid fields or an email address already registered).
+    """
+    email = str(request.data.get('email') or '').strip()
+    password = str(request.data.get('password') or '')
+    name = str(request.data.get('name') or '').strip()
+    if not email or not password:
+        return Response({
+            'status': 'error',
+            'message': 'email and password are required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        validate_email(email)
+    except ValidationError:
+        return Response({
+            'status': 'error',
+            'message': 'Enter a valid email address'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if User.objects.filter(Q(email__iexact=email) | Q(username__iexact=email)).exists():
+        return Response({
+            'status': 'error',
+            'message': 'An account with this email already exists'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    user = User(username=email, email=email, first_name=name[:150])
+    try:
+        validate_password(password, user)
+    except ValidationError as e:
+        return Response({
+            'status': 'error',
+            'message': ' '.join(e.messages)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    user.set_password(password)
+    try:
+        user.save()
+    except IntegrityError:
+        # Registered by a concurrent request in the meantime
+        return Response({
+            'status': 'error',
+            'message': 'An account with this email already exists'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    return _token_response(user, status.HTTP_201_CREATED)
+
+def _token_response(user, status_code):
+    token, expires_at = issue_token(user)
+    return Response({
+        'status': 'success',
+        'token': token,
+        'expires_at': expires_at.isoformat(),
+        'user': {'id': user.pk, 'username': user.username, 'email': user.email}
+    }, status=status_code)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def revoke_auth_token(request):
+    """
+    Revokes the API token the request is authenticated with (sign out).
+
+    Args:
+        request (Request): The DRF request object, authenticated with a token.
+
+    Returns:
+        Response: A DRF response object confirming the revocation.
+    """
+    if not isinstance(request.auth, SignedToken):
+        return Response({
+            'status': 'error',
+            'message': 'The request is not authenticated with an API token'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    revoked_tokens.revoke(request.auth)
+    return Response({
+        'status': 'success',
+        'message': 'Token revoked'
+    }, status=status.HTTP_200_OK)
+
+def _reservation_data(reservation):
+    board = reservation.microcontroller
+    return {
+        'id': reservation.pk,
+        'status': reservation.status,
+        'type': reservation.microcontroller_type,
+        'microcontroller': {'id': str(board.pk), 'name': board.name} if board is not None else None,
+        'lease_expires_at': reservation.lease_expires_at,
+        'queue_position': reservations.queue_position(reservation),
+    }
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def create_reservation(request):
+    """
+    Reserves a microcontroller of a type for the authenticated user.
+
+    A free board is taken at once; otherwise the reservation waits in the
+    type's queue and gets the next board released. Either way it lapses
+    unless renewed through its heartbeat endpoint (see `api.reservations`).
+    A user asking again for a type they already reserved gets the same
+    reservation back.
+
+    Args:
+        request (Request): The DRF request object. The request body should
+            contain a JSON object with a `type` key, one of the
+            microcontroller types.
+
+    Returns:
+        Response: A DRF response object with the reservation: 201 when it
+                  holds a board, 202 when it waits for one.
+    """
+    mcu_type = request.data.get('type')
+    if mcu_type not in dict(Microcontroller.MICROCONTROLLER_TYPES):
+        return Response({
+            'status': 'error',
+            'message': 'type must be one of: ' + ', '.join(dict(Microcontroller.MICROCONTROLLER_TYPES))
+        }, status=status.HTTP_400_BAD_REQUEST)
+    reservation = reservations.reserve(request.user, mcu_type)
+    active = reservation.status == Reservation.ACTIVE
+    return Response({
+        'status': 'success',
+        'message': 'Microcontroller reserved' if active else 'Waiting for a microcontroller',
+        'reservation': _reservation_data(reservation)
+    }, status=status.HTTP_201_CREATED if active else status.HTTP_202_ACCEPTED)
+
+def _own_reservation(request, pk):
+    return Reservation.objects.select_related('microcontroller').filter(pk=pk, user=request.user).first()
+
+def _reservation_not_found():
+    return Response({
+        'status': 'error',
+        'message': 'Reservation not found'
+    }, status=status.HTTP_404_NOT_FOUND)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def reservation_detail(request, pk):
+    """
+    Retrieves one of the authenticated user's reservations.
+
+    Args:
+        request (Request): The DRF request object.
+        pk (int): The reservation's id.
+
+    Returns:
+        Response: A DRF response object with the reservation, including its
+                  position in the queue while it waits.
+    """
+    reservation = _own_reservation(request, pk)
+    if reservation is None:
+        return _reservation_not_found()
+    return Response({
+        'status': 'success',
+        'reservation': _reservation_data(reservation)
+    }, status=status.HTTP_200_OK)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def reservation_heartbeat(request, pk):
+    """
+    Renews the lease of one of the authenticated user's reservations.
+
+    Clients holding or waiting for a board call this well within
+    `RESERVATION_LEASE_SECONDS`; a waiting reservation may get its board
+    in the response.
+
+    Args:
+        request (Request): The DRF request object.
+        pk (int): The reservation's id.
+
+    Returns:
+        Response: A DRF response object with the renewed reservation, or a
+                  409 error if it had already ended.
+    """
+    reservation = _own_reservation(request, pk)
+    if reservation is None:
+        return _reservation_not_found()
+    reservation = reservations.renew(reservation)
+    if reservation.status not in reservations.OPEN_STATUSES:
+        return Response({
+            'status': 'error',
+            'message': 'Reservation has ended',
+            'reservation': _reservation_data(reservation)
+        }, status=status.HTTP_409_CONFLICT)
+    return Response({
+        'status': 'success',
+        'reservation': _reservation_data(reservation)
+    }, status=status.HTTP_200_OK)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def reservation_release(request, pk):
+    """
+    Ends one of the authenticated user's reservations, freeing its board
+    for the next user waiting for one.
+
+    Args:
+        request (Request): The DRF request object.
+        pk (int): The reservation's id.
+
+    Returns:
+        Response: A DRF response object with the ended reservation.
+    """
+    reservation = _own_reservation(request, pk)
+    if reservation is None:
+        return _reservation_not_found()
+    reservation = reservations.release(reservation)
+    return Response({
+        'status': 'success',
+        'message': 'Reservation ended',
+        'reservation': _reservation_data(reservation)
+    }, status=status.HTTP_200_OK)
+
 # Peripheral Data Viewer Endpoints
 @api_view(['GET'])
 @permission_classes([AllowAny])
@@ -316,7 +768,7 @@ def peripheral_view(request):
         Response: A DRF response object containing the last peripheral data
                   or a 'no data' message.
     """
-    global last_peripheral_data
+    last_peripheral_data = peripheral_store.latest()
     
     if last_peripheral_data is None:
         return Response({
@@ -331,6 +783,71 @@ def peripheral_view(request):
         'data': last_peripheral_data
     })
 
+def _parse_history_time(value):
+    """
+    Parses a `since`/`until` history bound.
+
+    Args:
+        value (str | None): An ISO 8601 datetime or seconds since the epoch.
+
+    Returns:
+        float | None: The bound in seconds since the epoch.
+
+    Raises:
+        ValueError: If the value is neither format.
+    """
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(f"'{value}' is not a datetime or a timestamp")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, dt_timezone.utc)
+    return parsed.timestamp()
+
+def _parse_history_page(params):
+    """
+    Parses the `after_seq` and `limit` parameters of the in-memory history.
+
+    Returns:
+        tuple: `(after_seq, limit)`, each None when not given.
+
+    Raises:
+        ValueError: If either is not a valid number.
+    """
+    after_seq = params.get('after_seq')
+    limit = params.get('limit')
+    after_seq = int(after_seq) if after_seq not in (None, '') else None
+    limit = int(limit) if limit not in (None, '') else None
+    if after_seq is not None and after_seq < 0:
+        raise ValueError('after_seq must not be negative')
+    if limit is not None and limit < 1:
+        raise ValueError('limit must be at least 1')
+    return after_seq, limit
+
+
+def _history_etag():
+    """
+    Returns the ETag of the in-memory history and its latest `seq`.
+
+    The tag changes whenever an entry is stored or the store is cleared.
+    """
+    floor_seq, last_seq = peripheral_store.sequence_bounds()
+    return f'"{floor_seq}-{last_seq}"', last_seq
+
+
+def _etag_matches(request, etag):
+    if_none_match = request.headers.get('If-None-Match')
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in tags or etag in tags or f'W/{etag}' in tags
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def peripheral_history(request):
@@ -339,7 +856,21 @@ def peripheral_history(request):
 
     This view returns a list of all peripheral data objects that have been
     received by the `peripheral_send` endpoint during the server's current
-    session. The history is capped at the last 50 entries.
+    session. The history is capped at `PERIPHERAL_HISTORY_CAPACITY` entries
+    (50 by default). When an `mcu_id` query parameter is given, only that
+    microcontroller's traffic is returned (optionally narrowed further with
+    `peripheral_type`).
+
+    Every entry carries a `seq` number. Polling clients pass the `seq` of the
+    last entry they have as `after_seq` to only receive newer entries (at
+    most `limit`, oldest first); without `after_seq`, `limit` keeps the most
+    recent entries. The response has an `ETag` derived from the latest
+    `seq`, and a request whose `If-None-Match` matches it gets an empty 304.
+
+    When `since` and/or `until` are given (ISO 8601 datetimes or seconds since
+    the epoch), the durable on-disk history is queried instead, optionally
+    filtered by `mcu_id` and capped by `limit`. Those entries survive restarts
+    but only carry the receive time, MCU, command and raw bytes.
 
     Args:
         request (Request): The DRF request object.
@@ -348,8 +879,66 @@ def peripheral_history(request):
         Response: A DRF response object containing the list of historical
                   peripheral data.
     """
-    global peripheral_data_history
-    
+    params = request.query_params
+    mcu_id = params.get('mcu_id')
+    if 'since' in params or 'until' in params:
+        if peripheral_history_log is None:
+            return Response({
+                'status': 'error',
+                'message': 'Durable peripheral history is disabled (PERIPHERAL_HISTORY_DIR is not set).'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            since = _parse_history_time(params.get('since'))
+            until = _parse_history_time(params.get('until'))
+            max_limit = getattr(settings, 'PERIPHERAL_HISTORY_QUERY_LIMIT', 1000)
+            limit = min(int(params.get('limit', max_limit)), max_limit)
+            if limit < 1:
+                raise ValueError('limit must be at least 1')
+        except ValueError as e:
+            return Response({
+                'status': 'error',
+                'message': f'Invalid history query: {str(e)}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        records = peripheral_history_log.query(since=since, until=until, mcu_id=mcu_id, limit=limit)
+        peripheral_data_history = [
+            {
+                'peripheral_type': COMMAND_NAMES.get(command, 'UNKNOWN'),
+                'mcu_id': record_mcu_id,
+                'command': command,
+                'raw_data': list(raw_bytes),
+                'hex_data': hex_bytes(raw_bytes) if raw_bytes else 'No raw data',
+                'decoded': decode_frame(raw_bytes) if raw_bytes else None,
+                'received_at': datetime.fromtimestamp(timestamp_us / 1_000_000, tz=dt_timezone.utc).isoformat(),
+                'data_length': len(raw_bytes)
+            }
+            for timestamp_us, record_mcu_id, command, raw_bytes in records
+        ]
+    else:
+        try:
+            after_seq, limit = _parse_history_page(params)
+        except ValueError as e:
+            return Response({
+                'status': 'error',
+                'message': f'Invalid history query: {str(e)}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        etag, last_seq = _history_etag()
+        if _etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        if mcu_id is not None:
+            peripheral_data_history = peripheral_store.for_device(
+                mcu_id, params.get('peripheral_type'), after_seq=after_seq, limit=limit
+            )
+        else:
+            peripheral_data_history = peripheral_store.history(after_seq=after_seq, limit=limit)
+        return Response({
+            'status': 'success',
+            'message': f'Peripheral communication history ({len(peripheral_data_history)} entries)',
+            'data': peripheral_data_history,
+            'count': len(peripheral_data_history),
+            'last_seq': last_seq
+        }, headers={'ETag': etag})
+
     return Response({
         'status': 'success',
         'message': f'Peripheral communication history ({len(peripheral_data_history)} entries)',
@@ -363,8 +952,10 @@ def peripheral_view_by_type(request, peripheral_type):
     """
     Retrieves peripheral communication data filtered by a specific type.
 
-    This view filters the communication history to return only the entries
-    that match the provided `peripheral_type`.
+    This view reads the store's per-type index, so its cost depends only on
+    the number of entries of the requested type. Like `peripheral_history`,
+    it accepts `after_seq` and `limit` and answers conditional requests with
+    a 304 when nothing was stored since the `ETag` was issued.
 
     Args:
         request (Request): The DRF request object.
@@ -374,19 +965,97 @@ def peripheral_view_by_type(request, peripheral_type):
         Response: A DRF response object containing the filtered list of
                   peripheral data.
     """
-    global peripheral_data_history
-    
-    filtered_data = [
-        data for data in peripheral_data_history 
-        if data['peripheral_type'].upper() == peripheral_type.upper()
-    ]
+    try:
+        after_seq, limit = _parse_history_page(request.query_params)
+    except ValueError as e:
+        return Response({
+            'status': 'error',
+            'message': f'Invalid history query: {str(e)}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    etag, last_seq = _history_etag()
+    if _etag_matches(request, etag):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+    filtered_data = peripheral_store.by_type(peripheral_type, after_seq=after_seq, limit=limit)
     
     return Response({
         'status': 'success',
         'message': f'{peripheral_type.upper()} peripheral data ({len(filtered_data)} entries)',
         'data': filtered_data,
-        'count': len(filtered_data)
-    })
+        'count': len(filtered_data),
+        'last_seq': last_seq
+    }, headers={'ETag': etag})
+
+async def peripheral_stream(request):
+    """
+    Streams accepted peripheral frames to the client as Server-Sent Events.
+
+    Each frame accepted by `peripheral_send` or `peripheral_send_batch` is
+    pushed as a `frame` event whose data is the same JSON object returned by
+    `peripheral_history`. The stream can be narrowed with the `mcu_id` and
+    `peripheral_type` query parameters. Every connection has a bounded queue
+    (`PERIPHERAL_STREAM_QUEUE_SIZE`); a client that falls behind loses the
+    oldest queued frames. A comment line is sent every
+    `PERIPHERAL_STREAM_KEEPALIVE` seconds while idle.
+
+    The stream needs an ASGI server (see `backend/asgi.py`); under WSGI the
+    endpoint answers 501.
+
+    Args:
+        request (HttpRequest): The Django request object.
+
+    Returns:
+        StreamingHttpResponse: A `text/event-stream` response.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Peripheral streaming requires the ASGI application (backend.asgi).'
+        }, status=status.HTTP_501_NOT_IMPLEMENTED)
+
+    mcu_id = request.GET.get('mcu_id')
+    peripheral_type = request.GET.get('peripheral_type')
+    maxsize = getattr(settings, 'PERIPHERAL_STREAM_QUEUE_SIZE', 100)
+    keepalive = getattr(settings, 'PERIPHERAL_STREAM_KEEPALIVE', 15)
+
+    async def events():
+        subscription = peripheral_hub.subscribe(mcu_id, peripheral_type, maxsize)
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                try:
+                    payloads = await asyncio.wait_for(subscription.drain(), keepalive)
+                except asyncio.TimeoutError:
+                    yield ': keep-alive\n\n'
+                    continue
+                for payload in payloads:
+                    yield f'event: frame\ndata: {payload}\n\n'
+        finally:
+            peripheral_hub.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+def _delete_microcontrollers(ids):
+    """
+    Deletes microcontrollers along with what their relations' `on_delete`
+    rules take with them.
+
+    The per-board delete signals are batched (`batched_signals`), so the
+    versions and cached responses of each model are updated once. The rows
+    the deletion collector updates or deletes without signals (``SET_NULL``,
+    fast deletes) belong to the models referencing `Microcontroller`, which
+    are recorded as changed as well.
+
+    Args:
+        ids (list): The primary keys of the microcontrollers to delete.
+    """
+    with transaction.atomic(savepoint=False), batched_signals() as batch:
+        Microcontroller.objects.filter(id__in=ids).delete()
+        for relation in Microcontroller._meta.related_objects:
+            batch.changed(relation.related_model)
 
 # Bulk Delete Microcontrollers Endpoint
 @api_view(['POST'])
@@ -397,7 +1066,12 @@ def bulk_delete_microcontrollers(request):
 
     This endpoint accepts a list of microcontroller IDs and attempts to delete
     each one. It only deletes microcontrollers that are marked as deletable
-    (`is_deletable=True`).
+    (`is_deletable=True`). IDs that are malformed, repeated, unknown or not
+    deletable are reported in `invalid_ids`, in request order.
+
+    All boards are looked up with a single query and the deletable ones are
+    deleted together in one transaction, so the number of queries does not
+    grow with the number of IDs.
 
     Args:
         request (Request): The DRF request object. The request body should
@@ -418,55 +1092,53 @@ def bulk_delete_microcontrollers(request):
                 'message': 'No microcontroller IDs provided'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Validate that all IDs are valid UUIDs
-        valid_ids = []
-        invalid_ids = []
-        
+        # Parse every ID up front, so malformed ones never reach the query
+        requested = []
+        malformed = {}
+        seen = set()
+        pk_field = Microcontroller._meta.pk
         for mcu_id in microcontroller_ids:
             try:
-                # Try to find the microcontroller
-                mcu = Microcontroller.objects.get(id=mcu_id)
-                if mcu.is_deletable:
-                    valid_ids.append(mcu_id)
-                else:
+                pk = pk_field.to_python(mcu_id)
+            except Exception as e:
+                malformed[len(requested)] = f'Invalid ID format: {str(e)}'
+                pk = None
+            else:
+                if pk in seen:
+                    malformed[len(requested)] = 'Duplicate ID'
+                seen.add(pk)
+            requested.append((mcu_id, pk))
+        
+        invalid_ids = []
+        deleted_microcontrollers = []
+        
+        with transaction.atomic():
+            # One query for every board, and one statement per table to delete them
+            found = {
+                row['id']: row for row in Microcontroller.objects.select_for_update()
+                .filter(id__in=seen).order_by().values('id', 'name', 'type', 'is_deletable')
+            }
+            for index, (mcu_id, pk) in enumerate(requested):
+                if index in malformed:
+                    invalid_ids.append({'id': mcu_id, 'name': 'Unknown', 'reason': malformed[index]})
+                elif pk not in found:
+                    invalid_ids.append({'id': mcu_id, 'name': 'Unknown', 'reason': 'Microcontroller not found'})
+                elif not found[pk]['is_deletable']:
                     invalid_ids.append({
                         'id': mcu_id,
-                        'name': mcu.name,
+                        'name': found[pk]['name'],
                         'reason': 'Not deletable (is_deletable=False)'
                     })
-            except Microcontroller.DoesNotExist:
-                invalid_ids.append({
-                    'id': mcu_id,
-                    'name': 'Unknown',
-                    'reason': 'Microcontroller not found'
-                })
-            except Exception as e:
-                invalid_ids.append({
-                    'id': mcu_id,
-                    'name': 'Unknown',
-                    'reason': f'Invalid ID format: {str(e)}'
-                })
-        
-        # Delete valid microcontrollers
-        deleted_count = 0
-        deleted_microcontrollers = []
+                else:
+                    deleted_microcontrollers.append({
+                        'id': str(pk),
+                        'name': found[pk]['name'],
+                        'type': found[pk]['type']
+                    })
+            if deleted_microcontrollers:
+                _delete_microcontrollers([row['id'] for row in deleted_microcontrollers])
         
-        for mcu_id in valid_ids:
-            try:
-                mcu = Microcontroller.objects.get(id=mcu_id)
-                deleted_microcontrollers.append({
-                    'id': str(mcu.id),
-                    'name': mcu.name,
-                    'type': mcu.type
-                })
-                mcu.delete()
-                deleted_count += 1
-            except Exception as e:
-                invalid_ids.append({
-                    'id': mcu_id,
-                    'name': 'Unknown',
-                    'reason': f'Deletion failed: {str(e)}'
-                })
+        deleted_count = len(deleted_microcontrollers)
         
         response_data = {
             'status': 'success',
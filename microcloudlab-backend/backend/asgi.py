@@ -3,6 +3,11 @@ ASGI config for backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve the project through this module (e.g. ``uvicorn backend.asgi:application``
+or ``daphne backend.asgi:application``) to enable the long-lived
+``api/peripheral/stream/`` Server-Sent Events endpoint, which pushes accepted
+peripheral frames to the dashboard instead of having it poll the history.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 """
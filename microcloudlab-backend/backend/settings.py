@@ -83,6 +83,13 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Transactions take the write lock up front and wait for it: deferred
+        # ones that read before writing (e.g. reservations) fail right away
+        # with "database is locked" when another writer holds it
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
@@ -128,4 +135,211 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-CORS_ALLOW_ALL_ORIGINS = True
\ No newline at end of file
+CORS_ALLOW_ALL_ORIGINS = True
+
+# Let the frontend read the pagination links of list responses, and tell a
+# rejected token (challenged with WWW-Authenticate: Bearer) from other 401s
+CORS_EXPOSE_HEADERS = ['Link', 'WWW-Authenticate']
+
+
+# Django REST framework
+# List endpoints are paginated with opaque keyset cursors (api.pagination);
+# bodies stay plain lists and the next/previous pages are in the Link header.
+
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'api.authentication.SignedTokenAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.KeysetPagination',
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
+# Rows per page of a list endpoint, and the most a client may ask for with ?page_size=
+API_PAGE_SIZE = 100
+
+API_MAX_PAGE_SIZE = 1000
+
+# Caches
+# `api_responses` holds the rendered responses of the read-mostly endpoints
+# (api.response_cache), evicting the least recently used past MAX_ENTRIES and
+# anything older than TIMEOUT seconds. A local-memory cache only serves (and
+# is only invalidated in) its own process; with several workers, use a
+# shared backend such as
+#   'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+#   'LOCATION': BASE_DIR / 'var' / 'response-cache',
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'api_responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'api-responses',
+        'TIMEOUT': 600,
+        'OPTIONS': {'MAX_ENTRIES': 2000},
+    },
+    # Token revocations (AUTH_TOKEN_CACHE) must reach every worker, so this
+    # one is shared by the processes of a host; use a network cache (Redis,
+    # Memcached) when the API runs on several hosts
+    'auth_tokens': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'var' / 'auth-tokens',
+        'TIMEOUT': None,
+    },
+}
+
+# The cache alias holding rendered API responses; None renders every response
+API_RESPONSE_CACHE = 'api_responses'
+
+# Apps whose writes never show up in API responses, and so do not change the
+# validators (ETag, Last-Modified) of conditional GETs
+MODEL_VERSION_IGNORED_APPS = ['admin', 'sessions']
+
+# Maximum number of results returned by search/?q=
+SEARCH_MAX_RESULTS = 50
+
+# Rows validated and upserted together by the catalog endpoints' import/
+# action (overridable per request with ?batch_size=, up to the maximum), and
+# the number of rejected rows whose errors are reported
+BULK_IMPORT_BATCH_SIZE = 500
+BULK_IMPORT_MAX_BATCH_SIZE = 5000
+BULK_IMPORT_MAX_ERRORS = 100
+
+# Signed API tokens (api.authentication): seconds a token stays valid, the
+# cache carrying revocations to every process (it must be shared by all the
+# workers: a revocation is only seen by processes reading the same cache),
+# and the in-process cache of authenticated users, which are refetched after
+# AUTH_USER_CACHE_TTL seconds
+AUTH_TOKEN_MAX_AGE = 24 * 60 * 60
+AUTH_TOKEN_CACHE = 'auth_tokens'
+AUTH_USER_CACHE_SIZE = 1024
+AUTH_USER_CACHE_TTL = 300
+
+# Microcontroller reservations (api.reservations): seconds a reservation lasts
+# without a heartbeat, and the number of free boards a claim picks from at
+# random, so concurrent claims rarely race for the same board
+RESERVATION_LEASE_SECONDS = 60
+RESERVATION_CLAIM_CANDIDATES = 8
+
+
+# Peripheral communication
+# Capacity of the in-process ring buffers holding received peripheral traffic.
+
+PERIPHERAL_HISTORY_CAPACITY = 50
+
+PERIPHERAL_STREAM_CAPACITY = 50
+
+PERIPHERAL_MAX_STREAMS = 1024
+
+# Set to a file path (e.g. '/dev/shm/microcloudlab-peripherals') to share the
+# peripheral history between all worker processes through a memory-mapped ring
+# buffer. None keeps it in process memory, which is enough for runserver.
+PERIPHERAL_SHARED_STORE_PATH = None
+
+PERIPHERAL_SHARED_STORE_SLOTS = 1024
+
+PERIPHERAL_SHARED_STORE_SLOT_SIZE = 4096
+
+# Record a frame identical to the previous one for the same MCU and instance
+# as a repeat of that entry instead of storing, logging and publishing it again
+PERIPHERAL_DEDUPLICATE = True
+
+PERIPHERAL_DEDUP_MAX_KEYS = 4096
+
+# Token bucket applied per (mcu_id, peripheral type) on peripheral/send/,
+# uart/send/ and each frame of peripheral/send-batch/. A device may send `burst`
+# frames back to back, then `refill_rate` frames per second; excess frames get
+# a 429 with Retry-After. Set to None to disable.
+PERIPHERAL_RATE_LIMIT = {
+    'burst': 20,
+    'refill_rate': 10.0,
+}
+
+PERIPHERAL_RATE_LIMIT_MAX_KEYS = 10000
+
+# Where accepted frames are delivered, by mcu_id ('*' matches any other
+# device): 'tcp://host:port', 'serial:///dev/ttyUSB0?baudrate=115200' or
+# 'loopback://'. Devices without a route only have their frames recorded.
+PERIPHERAL_DEVICE_ROUTES = {}
+
+# Frames queued per device before the oldest is dropped
+PERIPHERAL_DISPATCH_QUEUE_SIZE = 1000
+
+# Longest wait, in seconds, between attempts to reconnect to a device
+PERIPHERAL_DISPATCH_MAX_BACKOFF = 30.0
+
+# Number of decoded frames kept in the typed frame decoder's LRU cache
+PERIPHERAL_DECODER_CACHE_SIZE = 1024
+
+# Durable, segmented on-disk history queried by peripheral/history/?since=&until=
+# Set PERIPHERAL_HISTORY_DIR to None to keep history in memory only.
+
+PERIPHERAL_HISTORY_DIR = BASE_DIR / 'var' / 'peripheral_history'
+
+PERIPHERAL_HISTORY_SEGMENT_BYTES = 8 * 1024 * 1024
+
+PERIPHERAL_HISTORY_SEGMENT_SECONDS = 60 * 60
+
+PERIPHERAL_HISTORY_RETENTION_BYTES = 1024 * 1024 * 1024
+
+PERIPHERAL_HISTORY_RETENTION_SECONDS = 7 * 24 * 60 * 60
+
+PERIPHERAL_HISTORY_INDEX_INTERVAL = 4096
+
+# Frames waiting for the history's writer thread before ingestion blocks
+PERIPHERAL_HISTORY_QUEUE_SIZE = 10000
+
+# Maximum number of records returned by a time-range history query
+PERIPHERAL_HISTORY_QUERY_LIMIT = 1000
+
+# Frames buffered per peripheral/stream/ subscriber before the oldest is dropped
+PERIPHERAL_STREAM_QUEUE_SIZE = 100
+
+# Seconds between keep-alive comments on an idle peripheral/stream/ connection
+PERIPHERAL_STREAM_KEEPALIVE = 15
+
+# Log 1 in N received frames per MCU (1 logs every frame)
+PERIPHERAL_LOG_SAMPLE_RATE = 1
+
+# Minimum log level per peripheral type, e.g. {'GPIO': 'WARNING'}
+PERIPHERAL_LOG_LEVELS = {}
+
+
+# Logging
+# https://docs.djangoproject.com/en/5.0/topics/logging/
+# Peripheral traffic is written as JSON lines by a background thread, so the
+# ingestion endpoints never block on stdout.
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'peripheral_sampler': {
+            '()': 'api.peripherals.logpipe.FrameSampler',
+            'rate': PERIPHERAL_LOG_SAMPLE_RATE,
+        },
+        'peripheral_levels': {
+            '()': 'api.peripherals.logpipe.PeripheralLevelFilter',
+            'levels': PERIPHERAL_LOG_LEVELS,
+        },
+    },
+    'handlers': {
+        'peripheral_queue': {
+            '()': 'api.peripherals.logpipe.BackgroundQueueHandler',
+            'filters': ['peripheral_levels', 'peripheral_sampler'],
+            'maxsize': 10000,
+            'json_output': True,
+        },
+    },
+    'loggers': {
+        'api.peripherals': {
+            'handlers': ['peripheral_queue'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
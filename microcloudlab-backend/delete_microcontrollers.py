@@ -93,11 +93,17 @@ def verify_deletion():
     print("\n🔍 Verifying deletion...")
     
     try:
-        # Get all microcontrollers
-        response = requests.get(f"{API_BASE_URL}/microcontrollers/")
+        # Get all microcontrollers, following the pages of the list
+        remaining_mcus = []
+        url = f"{API_BASE_URL}/microcontrollers/"
+        while url:
+            response = requests.get(url)
+            if response.status_code != 200:
+                break
+            remaining_mcus.extend(response.json())
+            url = response.links.get('next', {}).get('url')
         
         if response.status_code == 200:
-            remaining_mcus = response.json()
             print(f"📊 Remaining microcontrollers: {len(remaining_mcus)}")
             
             # Check if any of our target IDs still exist
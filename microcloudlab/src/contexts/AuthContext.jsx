@@ -1,4 +1,5 @@
 import React, { createContext, useContext, useEffect, useMemo, useState } from 'react';
+import { authAPI, clearStoredSession, SESSION_ENDED_EVENT, SESSION_KEYS } from '../services/api';
 
 const AuthContext = createContext(undefined);
 
@@ -41,6 +42,14 @@ export const AuthProvider = ({ children }) => {
   useEffect(() => {
     const storedToken = localStorage.getItem('auth_token');
     const storedUser = localStorage.getItem('auth_user');
+    const expiresAt = Date.parse(localStorage.getItem('auth_expires_at'));
+    // Placeholder sessions from before the backend issued tokens, and expired
+    // tokens, are rejected by it
+    if (storedToken?.startsWith('demo-token-') || expiresAt <= Date.now()) {
+      SESSION_KEYS.forEach((key) => localStorage.removeItem(key));
+      setIsLoading(false);
+      return;
+    }
     if (storedToken) setToken(storedToken);
     if (storedUser) {
       try {
@@ -52,30 +61,33 @@ export const AuthProvider = ({ children }) => {
     setIsLoading(false);
   }, []);
 
-  const signIn = async ({ email, password }) => {
-    // Placeholder: simulate auth. Replace with backend call when available.
-    await new Promise((r) => setTimeout(r, 500));
-    const fakeToken = `demo-token-${Date.now()}`;
-    const fakeUser = { id: 'demo-user', email };
+  // The API client drops a token the server no longer accepts
+  useEffect(() => {
+    const onSessionEnded = () => {
+      setToken(null);
+      setUser(null);
+    };
+    window.addEventListener(SESSION_ENDED_EVENT, onSessionEnded);
+    return () => window.removeEventListener(SESSION_ENDED_EVENT, onSessionEnded);
+  }, []);
 
-    setToken(fakeToken);
-    setUser(fakeUser);
-    localStorage.setItem('auth_token', fakeToken);
-    localStorage.setItem('auth_user', JSON.stringify(fakeUser));
-    return { user: fakeUser };
+  const startSession = ({ token: issuedToken, expires_at: expiresAt, user: signedInUser }) => {
+    setToken(issuedToken);
+    setUser(signedInUser);
+    localStorage.setItem('auth_token', issuedToken);
+    localStorage.setItem('auth_user', JSON.stringify(signedInUser));
+    localStorage.setItem('auth_expires_at', expiresAt);
+    return { user: signedInUser };
   };
 
-  const signUp = async ({ name, email, password }) => {
-    // Placeholder: simulate registration
-    await new Promise((r) => setTimeout(r, 600));
-    return signIn({ email, password });
-  };
+  const signIn = async ({ email, password }) => startSession(await authAPI.issueToken({ email, password }));
+
+  const signUp = async ({ name, email, password }) => startSession(await authAPI.register({ name, email, password }));
 
   const signOut = () => {
-    setToken(null);
-    setUser(null);
-    localStorage.removeItem('auth_token');
-    localStorage.removeItem('auth_user');
+    // Best effort: the token expires by itself if the request fails
+    if (token) authAPI.revokeToken().catch(() => {});
+    clearStoredSession();
   };
 
   const value = useMemo(() => ({
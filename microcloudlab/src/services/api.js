@@ -1,4 +1,4 @@
-const API_BASE_URL = 'http://localhost:8000/api';
+export const API_BASE_URL = 'http://localhost:8000/api';
 
 /**
  * @module api
@@ -6,32 +6,82 @@ const API_BASE_URL = 'http://localhost:8000/api';
  * It abstracts the details of HTTP requests and provides a clean interface for each API resource.
  */
 
+/** The localStorage keys of the signed-in session. */
+export const SESSION_KEYS = ['auth_token', 'auth_user', 'auth_expires_at'];
+
+/** The window event sent when the stored session is dropped (see `AuthContext`). */
+export const SESSION_ENDED_EVENT = 'auth:session-ended';
+
 /**
- * A generic function for making API requests. It handles adding the base URL,
- * setting common headers (including the auth token), and processing the response.
+ * Forgets the stored session and tells the app it ended.
+ */
+export const clearStoredSession = () => {
+  SESSION_KEYS.forEach((key) => localStorage.removeItem(key));
+  window.dispatchEvent(new Event(SESSION_ENDED_EVENT));
+};
+
+/**
+ * Returns the stored auth token, or null if there is none or it has expired.
  *
- * @param {string} endpoint - The API endpoint to request (e.g., '/microcontrollers/').
+ * @returns {string|null} The token.
+ */
+const storedToken = () => {
+  const token = localStorage.getItem('auth_token');
+  const expiresAt = Date.parse(localStorage.getItem('auth_expires_at'));
+  if (token && expiresAt <= Date.now()) {
+    clearStoredSession();
+    return null;
+  }
+  return token;
+};
+
+/**
+ * Sends a request with the common headers (including the auth token).
+ * A token the server rejects (expired or revoked) ends the session, and the
+ * request is sent again without it.
+ *
+ * @param {string} url - The absolute URL to request.
  * @param {object} [options={}] - The options for the fetch request (e.g., method, body).
- * @returns {Promise<any>} A promise that resolves with the JSON response from the API.
+ * @returns {Promise<Response>} A promise that resolves with the successful response.
  * @throws {Error} If the network request fails or the response status is not ok.
  */
-export const apiRequest = async (endpoint, options = {}) => {
-  const url = `${API_BASE_URL}${endpoint}`;
-  const token = localStorage.getItem('auth_token');
+const sendRequest = async (url, options = {}) => {
+  const token = storedToken();
+  const { headers, ...fetchOptions } = options;
   const config = {
     headers: {
       'Content-Type': 'application/json',
       ...(token ? { Authorization: `Bearer ${token}` } : {}),
+      ...headers,
     },
     credentials: 'include',
-    ...options,
+    ...fetchOptions,
   };
 
+  const response = await fetch(url, config);
+  // Only a rejected token is challenged with Bearer; a wrong password is not
+  if (response.status === 401 && token && response.headers.get('WWW-Authenticate')?.startsWith('Bearer')) {
+    clearStoredSession();
+    return sendRequest(url, options);
+  }
+  if (!response.ok) {
+    throw new Error(`HTTP error! status: ${response.status}`);
+  }
+  return response;
+};
+
+/**
+ * A generic function for making API requests. It handles adding the base URL,
+ * setting common headers (including the auth token), and processing the response.
+ *
+ * @param {string} endpoint - The API endpoint to request (e.g., '/microcontrollers/').
+ * @param {object} [options={}] - The options for the fetch request (e.g., method, body).
+ * @returns {Promise<any>} A promise that resolves with the JSON response from the API.
+ * @throws {Error} If the network request fails or the response status is not ok.
+ */
+export const apiRequest = async (endpoint, options = {}) => {
   try {
-    const response = await fetch(url, config);
-    if (!response.ok) {
-      throw new Error(`HTTP error! status: ${response.status}`);
-    }
+    const response = await sendRequest(`${API_BASE_URL}${endpoint}`, options);
     return await response.json();
   } catch (error) {
     console.error('API request failed:', error);
@@ -39,6 +89,59 @@ export const apiRequest = async (endpoint, options = {}) => {
   }
 };
 
+/**
+ * Extracts the `next` and `prev` page URLs from a `Link` response header.
+ *
+ * @param {string|null} header - The `Link` header value.
+ * @returns {{next: string|null, prev: string|null}} The page URLs.
+ */
+const parseLinkHeader = (header) => {
+  const links = { next: null, prev: null };
+  for (const match of (header || '').matchAll(/<([^>]+)>;\s*rel="(next|prev)"/g)) {
+    links[match[2]] = match[1];
+  }
+  return links;
+};
+
+/**
+ * Fetches one page of a list endpoint. List endpoints are paginated with
+ * opaque cursors; follow the returned `next`/`prev` URLs to move between pages.
+ *
+ * @param {string} endpointOrUrl - The API endpoint (e.g., '/projects/?page_size=20'),
+ *   or a `next`/`prev` URL returned by a previous call.
+ * @returns {Promise<{results: any[], next: string|null, prev: string|null}>} The page.
+ * @throws {Error} If the network request fails or the response status is not ok.
+ */
+export const apiRequestPage = async (endpointOrUrl) => {
+  const url = endpointOrUrl.startsWith('http') ? endpointOrUrl : `${API_BASE_URL}${endpointOrUrl}`;
+  try {
+    const response = await sendRequest(url);
+    const results = await response.json();
+    return { results, ...parseLinkHeader(response.headers.get('Link')) };
+  } catch (error) {
+    console.error('API request failed:', error);
+    throw error;
+  }
+};
+
+/**
+ * Fetches every row of a list endpoint by following its pages.
+ *
+ * @param {string} endpoint - The API endpoint to request (e.g., '/projects/').
+ * @returns {Promise<any[]>} A promise that resolves with all the rows.
+ * @throws {Error} If the network request fails or the response status is not ok.
+ */
+export const apiRequestAll = async (endpoint) => {
+  const rows = [];
+  let next = endpoint;
+  while (next) {
+    const page = await apiRequestPage(next);
+    rows.push(...page.results);
+    next = page.next;
+  }
+  return rows;
+};
+
 /**
  * An object containing a set of functions for interacting with the Microcontroller API endpoints.
  * @type {object}
@@ -48,7 +151,7 @@ export const microcontrollerAPI = {
    * Fetches all microcontrollers.
    * @returns {Promise<any>} A promise that resolves with the list of microcontrollers.
    */
-  getAll: () => apiRequest('/microcontrollers/'),
+  getAll: () => apiRequestAll('/microcontrollers/'),
   /**
    * Fetches a single microcontroller by its ID.
    * @param {string} id - The ID of the microcontroller to fetch.
@@ -89,7 +192,7 @@ export const microcontrollerAPI = {
  * @type {object}
  */
 export const projectAPI = {
-  getAll: () => apiRequest('/projects/'),
+  getAll: () => apiRequestAll('/projects/'),
   getById: (id) => apiRequest(`/projects/${id}/`),
   create: (data) => apiRequest('/projects/', {
     method: 'POST',
@@ -109,7 +212,7 @@ export const projectAPI = {
  * @type {object}
  */
 export const codeExecutionAPI = {
-  getAll: () => apiRequest('/codeexecutions/'),
+  getAll: () => apiRequestAll('/codeexecutions/'),
   getById: (id) => apiRequest(`/codeexecutions/${id}/`),
   create: (data) => apiRequest('/codeexecutions/', {
     method: 'POST',
@@ -124,12 +227,23 @@ export const codeExecutionAPI = {
   }),
 };
 
+/**
+ * Builds the query string filtering a tagged endpoint by tags.
+ * @param {string[]} tags - The tags to filter by (case-insensitive).
+ * @param {'all'|'any'} [match='all'] - Whether objects need every tag or any of them.
+ * @returns {string} The query string, including the leading '?'.
+ */
+const tagQuery = (tags, match = 'all') =>
+  `?${new URLSearchParams({ tags: tags.join(','), match })}`;
+
 /**
  * An object containing a set of functions for interacting with the Tutorial API endpoints.
  * @type {object}
  */
 export const tutorialAPI = {
-  getAll: () => apiRequest('/tutorials/'),
+  getAll: () => apiRequestAll('/tutorials/'),
+  getByTags: (tags, match) => apiRequestAll(`/tutorials/${tagQuery(tags, match)}`),
+  getTagCounts: (tags = [], match) => apiRequest(`/tutorials/tags/${tags.length ? tagQuery(tags, match) : ''}`),
   getById: (id) => apiRequest(`/tutorials/${id}/`),
   create: (data) => apiRequest('/tutorials/', {
     method: 'POST',
@@ -149,7 +263,7 @@ export const tutorialAPI = {
  * @type {object}
  */
 export const tutorialProgressAPI = {
-  getAll: () => apiRequest('/tutorialprogress/'),
+  getAll: () => apiRequestAll('/tutorialprogress/'),
   getById: (id) => apiRequest(`/tutorialprogress/${id}/`),
   create: (data) => apiRequest('/tutorialprogress/', {
     method: 'POST',
@@ -169,7 +283,9 @@ export const tutorialProgressAPI = {
  * @type {object}
  */
 export const caseStudyAPI = {
-  getAll: () => apiRequest('/casestudies/'),
+  getAll: () => apiRequestAll('/casestudies/'),
+  getByTags: (tags, match) => apiRequestAll(`/casestudies/${tagQuery(tags, match)}`),
+  getTagCounts: (tags = [], match) => apiRequest(`/casestudies/tags/${tags.length ? tagQuery(tags, match) : ''}`),
   getById: (id) => apiRequest(`/casestudies/${id}/`),
   create: (data) => apiRequest('/casestudies/', {
     method: 'POST',
@@ -189,7 +305,7 @@ export const caseStudyAPI = {
  * @type {object}
  */
 export const contactAPI = {
-  getAll: () => apiRequest('/contactinquiries/'),
+  getAll: () => apiRequestAll('/contactinquiries/'),
   getById: (id) => apiRequest(`/contactinquiries/${id}/`),
   create: (data) => apiRequest('/contactinquiries/', {
     method: 'POST',
@@ -209,7 +325,7 @@ export const contactAPI = {
  * @type {object}
  */
 export const platformStatsAPI = {
-  getAll: () => apiRequest('/platformstats/'),
+  getAll: () => apiRequestAll('/platformstats/'),
   getById: (id) => apiRequest(`/platformstats/${id}/`),
   create: (data) => apiRequest('/platformstats/', {
     method: 'POST',
@@ -229,7 +345,7 @@ export const platformStatsAPI = {
  * @type {object}
  */
 export const teamMemberAPI = {
-  getAll: () => apiRequest('/teammembers/'),
+  getAll: () => apiRequestAll('/teammembers/'),
   getById: (id) => apiRequest(`/teammembers/${id}/`),
   create: (data) => apiRequest('/teammembers/', {
     method: 'POST',
@@ -249,7 +365,9 @@ export const teamMemberAPI = {
  * @type {object}
  */
 export const resourceAPI = {
-  getAll: () => apiRequest('/resources/'),
+  getAll: () => apiRequestAll('/resources/'),
+  getByTags: (tags, match) => apiRequestAll(`/resources/${tagQuery(tags, match)}`),
+  getTagCounts: (tags = [], match) => apiRequest(`/resources/tags/${tags.length ? tagQuery(tags, match) : ''}`),
   getById: (id) => apiRequest(`/resources/${id}/`),
   create: (data) => apiRequest('/resources/', {
     method: 'POST',
@@ -269,7 +387,7 @@ export const resourceAPI = {
  * @type {object}
  */
 export const userProfileAPI = {
-  getAll: () => apiRequest('/userprofiles/'),
+  getAll: () => apiRequestAll('/userprofiles/'),
   getById: (id) => apiRequest(`/userprofiles/${id}/`),
   create: (data) => apiRequest('/userprofiles/', {
     method: 'POST',
@@ -284,6 +402,100 @@ export const userProfileAPI = {
   }),
 };
 
+/**
+ * An object containing a set of functions for the API token endpoints.
+ * @type {object}
+ */
+export const authAPI = {
+  /**
+   * Exchanges credentials for a signed API token.
+   * @param {{email: string, password: string}} credentials - The user's email (or `username`) and password.
+   * @returns {Promise<any>} A promise that resolves with the `token`, its `expires_at` and the `user`.
+   */
+  issueToken: (credentials) => apiRequest('/auth/token/', {
+    method: 'POST',
+    body: JSON.stringify(credentials),
+  }),
+  /**
+   * Creates an account and signs it in.
+   * @param {{name: string, email: string, password: string}} details - The new account's details.
+   * @returns {Promise<any>} A promise that resolves with the `token`, its `expires_at` and the `user`.
+   */
+  register: (details) => apiRequest('/auth/register/', {
+    method: 'POST',
+    body: JSON.stringify(details),
+  }),
+  /**
+   * Revokes the token the requests are currently sent with.
+   * @returns {Promise<any>} A promise that resolves once the token is revoked.
+   */
+  revokeToken: () => apiRequest('/auth/token/revoke/', {
+    method: 'POST',
+  }),
+};
+
+/**
+ * An object containing a set of functions for reserving microcontrollers.
+ * A reservation lapses unless renewed: call `heartbeat` well within the
+ * server's lease (60 seconds by default) while holding or waiting for a board.
+ * @type {object}
+ */
+export const reservationAPI = {
+  /**
+   * Reserves a microcontroller of a type, or joins the queue for one.
+   * @param {string} type - The microcontroller type, e.g. 'ESP32'.
+   * @returns {Promise<any>} A promise that resolves with the `reservation`: `ACTIVE` with its
+   * `microcontroller`, or `WAITING` with its `queue_position`.
+   */
+  reserve: (type) => apiRequest('/reservations/', {
+    method: 'POST',
+    body: JSON.stringify({ type }),
+  }),
+  /**
+   * Fetches one of the user's reservations.
+   * @param {number} id - The reservation's id.
+   * @returns {Promise<any>} A promise that resolves with the `reservation`.
+   */
+  get: (id) => apiRequest(`/reservations/${id}/`),
+  /**
+   * Renews a reservation's lease; a waiting reservation may get its board.
+   * @param {number} id - The reservation's id.
+   * @returns {Promise<any>} A promise that resolves with the `reservation`, and rejects
+   * once it has ended.
+   */
+  heartbeat: (id) => apiRequest(`/reservations/${id}/heartbeat/`, {
+    method: 'POST',
+  }),
+  /**
+   * Ends a reservation, freeing its board or leaving the queue.
+   * @param {number} id - The reservation's id.
+   * @returns {Promise<any>} A promise that resolves with the ended `reservation`.
+   */
+  release: (id) => apiRequest(`/reservations/${id}/release/`, {
+    method: 'POST',
+  }),
+};
+
+/**
+ * An object containing a set of functions for the full-text search endpoint.
+ * @type {object}
+ */
+export const searchAPI = {
+  /**
+   * Searches tutorials, resources and case studies, best matches first.
+   * @param {string} query - The words to search for; the last one also matches as a prefix.
+   * @param {object} [options] - Optional `types` (e.g. ['tutorial', 'resource']) and `limit`.
+   * @returns {Promise<any>} A promise that resolves with the results, whose `title` and
+   * `snippet` are HTML with the matched words in `<mark>` elements.
+   */
+  search: (query, { types = [], limit } = {}) => {
+    const params = new URLSearchParams({ q: query });
+    if (types.length) params.set('type', types.join(','));
+    if (limit) params.set('limit', limit);
+    return apiRequest(`/search/?${params}`).then((data) => data.results);
+  },
+};
+
 /**
  * A custom hook that provides a convenient way to access all API service objects.
  *
@@ -301,4 +513,7 @@ export const useAPI = () => ({
   teamMembers: teamMemberAPI,
   resources: resourceAPI,
   userProfiles: userProfileAPI,
+  search: searchAPI,
+  auth: authAPI,
+  reservations: reservationAPI,
 });
\ No newline at end of file
@@ -1,6 +1,6 @@
 // peripheralService.js - Generic peripheral communication service
 
-import { apiRequest } from './api';
+import { API_BASE_URL, apiRequest } from './api';
 
 /**
  * @module peripheralService
@@ -383,6 +383,72 @@ export async function sendPeripheralConfiguration(peripheralType, instance, mcuI
   }
 }
 
+/**
+ * Sends a packed peripheral configuration to the backend as a raw binary frame.
+ * The frame is posted as `application/octet-stream` instead of a JSON array of
+ * numbers; the backend derives the peripheral type from the command byte.
+ * @param {string} peripheralType - The type of peripheral.
+ * @param {string} instance - The specific instance of the peripheral.
+ * @param {string} mcuId - The identifier of the target microcontroller.
+ * @param {object} config - The configuration object to pack and send.
+ * @returns {Promise<any>} A promise that resolves with the API response.
+ * @throws {Error} If the API request fails.
+ */
+export async function sendPeripheralFrame(peripheralType, instance, mcuId, config) {
+  try {
+    const packedData = packPeripheralConfiguration(peripheralType, config);
+    const params = new URLSearchParams({
+      instance: instance,
+      mcu_id: mcuId,
+      timestamp: new Date().toISOString()
+    });
+
+    const response = await apiRequest(`/peripheral/send/?${params}`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/octet-stream' },
+      body: packedData
+    });
+
+    return response;
+  } catch (error) {
+    console.error(`Failed to send ${peripheralType} frame:`, error);
+    throw error;
+  }
+}
+
+/**
+ * Sends many peripheral configurations, for any instances and MCUs, in a single request.
+ * Each frame is packed locally and sent as a compact hex string; the backend
+ * returns one result per frame in the same order.
+ * @param {Array<{peripheralType: string, instance: string, mcuId: string, config: object}>} items -
+ *   The configurations to send.
+ * @returns {Promise<any>} A promise that resolves with the batch response.
+ * @throws {Error} If the API request fails.
+ */
+export async function sendPeripheralBatch(items) {
+  try {
+    const timestamp = new Date().toISOString();
+    const frames = items.map(({ peripheralType, instance, mcuId, config }) => ({
+      peripheral_type: peripheralType,
+      instance: instance,
+      mcu_id: mcuId,
+      configuration: config,
+      data: bytesToHex(packPeripheralConfiguration(peripheralType, config)).replace(/ /g, ''),
+      timestamp: timestamp
+    }));
+
+    const response = await apiRequest('/peripheral/send-batch/', {
+      method: 'POST',
+      body: JSON.stringify({ frames })
+    });
+
+    return response;
+  } catch (error) {
+    console.error('Failed to send peripheral batch:', error);
+    throw error;
+  }
+}
+
 /**
  * Fetches the last received peripheral data from the backend.
  * @returns {Promise<any>} A promise that resolves with the last peripheral data.
@@ -398,14 +464,32 @@ export async function getLastPeripheralData() {
   }
 }
 
+/**
+ * Builds the `after_seq`/`limit` query string of the history endpoints.
+ * @param {object} [options]
+ * @param {number} [options.afterSeq] - Only fetch entries newer than this `seq`.
+ * @param {number} [options.limit] - The maximum number of entries fetched.
+ * @returns {string} The query string, including the leading `?`, or an empty string.
+ */
+function historyQuery({ afterSeq, limit } = {}) {
+  const params = new URLSearchParams();
+  if (afterSeq !== undefined && afterSeq !== null) params.set('after_seq', afterSeq);
+  if (limit) params.set('limit', limit);
+  const query = params.toString();
+  return query ? `?${query}` : '';
+}
+
 /**
  * Fetches the history of all peripheral communications from the backend.
+ * Pass the `seq` of the newest entry already shown as `afterSeq` to only
+ * fetch the entries received since.
+ * @param {object} [options] - See `historyQuery`.
  * @returns {Promise<any>} A promise that resolves with the communication history.
  * @throws {Error} If the API request fails.
  */
-export async function getPeripheralHistory() {
+export async function getPeripheralHistory(options) {
   try {
-    const response = await apiRequest('/peripheral/history/');
+    const response = await apiRequest(`/peripheral/history/${historyQuery(options)}`);
     return response;
   } catch (error) {
     console.error('Failed to get peripheral history:', error);
@@ -416,12 +500,13 @@ export async function getPeripheralHistory() {
 /**
  * Fetches peripheral data filtered by a specific type from the backend.
  * @param {string} peripheralType - The type of peripheral to filter by.
+ * @param {object} [options] - See `historyQuery`.
  * @returns {Promise<any>} A promise that resolves with the filtered data.
  * @throws {Error} If the API request fails.
  */
-export async function getPeripheralDataByType(peripheralType) {
+export async function getPeripheralDataByType(peripheralType, options) {
   try {
-    const response = await apiRequest(`/peripheral/view/${peripheralType}/`);
+    const response = await apiRequest(`/peripheral/view/${peripheralType}/${historyQuery(options)}`);
     return response;
   } catch (error) {
     console.error(`Failed to get ${peripheralType} data:`, error);
@@ -429,6 +514,25 @@ export async function getPeripheralDataByType(peripheralType) {
   }
 }
 
+/**
+ * Subscribes to the live stream of peripheral frames accepted by the backend.
+ * Frames are pushed as Server-Sent Events instead of being polled from the history.
+ * @param {function(object): void} onFrame - Called with each received frame.
+ * @param {object} [filters={}] - Optional `mcuId` and `peripheralType` filters.
+ * @returns {function(): void} A function that closes the subscription.
+ */
+export function subscribeToPeripheralStream(onFrame, { mcuId, peripheralType } = {}) {
+  const params = new URLSearchParams();
+  if (mcuId) params.set('mcu_id', mcuId);
+  if (peripheralType) params.set('peripheral_type', peripheralType);
+
+  const source = new EventSource(`${API_BASE_URL}/peripheral/stream/?${params}`);
+  source.addEventListener('frame', (event) => onFrame(JSON.parse(event.data)));
+  source.onerror = (error) => console.error('Peripheral stream error:', error);
+
+  return () => source.close();
+}
+
 /**
  * An object containing all peripheral-related service functions.
  * @type {object}
@@ -436,8 +540,11 @@ export async function getPeripheralDataByType(peripheralType) {
 export const peripheralService = {
   packPeripheralConfiguration,
   sendPeripheralConfiguration,
+  sendPeripheralFrame,
+  sendPeripheralBatch,
   getLastPeripheralData,
   getPeripheralHistory,
   getPeripheralDataByType,
+  subscribeToPeripheralStream,
   formatFrame
 };
\ No newline at end of file